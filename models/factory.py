@@ -0,0 +1,81 @@
+"""
+Model factory: build any configured architecture from the `model` section of a training config.
+Keyed on `model.name` (custom_cnn, xception) and, for transfer models, `model.base`.
+"""
+from .custom_cnn import build_custom_cnn
+from .transfer_model import build_transfer_model
+from .xception_model import build_xception
+
+
+def model_kind(model_cfg: dict) -> str:
+    """'custom_cnn', 'xception' or 'transfer'."""
+    name = str(model_cfg.get("name", "")).lower()
+    base = str(model_cfg.get("base", "")).lower()
+    if name == "custom_cnn":
+        return "custom_cnn"
+    if name == "xception" or base == "xception":
+        return "xception"
+    return "transfer"
+
+
+def model_input_size(model_cfg: dict) -> tuple:
+    """(height, width) the model expects; used to size the input pipeline."""
+    default = (299, 299, 3) if model_kind(model_cfg) == "xception" else (224, 224, 3)
+    shape = model_cfg.get("input_shape", default)
+    return int(shape[0]), int(shape[1])
+
+
+def build_model(model_cfg: dict, input_shape=None):
+    """Build the model described by model_cfg (input_shape overrides model.input_shape)."""
+    kind = model_kind(model_cfg)
+    shape = tuple(input_shape or model_cfg.get("input_shape") or (*model_input_size(model_cfg), 3))
+    num_classes = model_cfg.get("num_classes", 4)
+    if kind == "custom_cnn":
+        return build_custom_cnn(
+            input_shape=shape,
+            num_classes=num_classes,
+            filters=tuple(model_cfg.get("filters", (32, 64, 128, 256))),
+            dense_units=tuple(model_cfg.get("dense_units", (256, 128))),
+            dropout=model_cfg.get("dropout", 0.5),
+            width_multiplier=model_cfg.get("width_multiplier", 1.0),
+            separable=model_cfg.get("separable", False),
+        )
+    if kind == "xception":
+        return build_xception(
+            input_shape=shape,
+            num_classes=num_classes,
+            trainable_layers=model_cfg.get("trainable_layers", 30),
+            dropout=model_cfg.get("dropout", 0.5),
+            pooling=model_cfg.get("pooling", "avg"),
+            weights=model_cfg.get("weights", "imagenet"),
+        )
+    return build_transfer_model(
+        base_name=model_cfg.get("base", "EfficientNetB0"),
+        input_shape=shape,
+        num_classes=num_classes,
+        trainable_layers=model_cfg.get("trainable_layers", 20),
+        dropout=model_cfg.get("dropout", 0.4),
+        pooling=model_cfg.get("pooling", "avg"),
+        weights=model_cfg.get("weights", "imagenet"),
+    )
+
+
+def _leaf_layers(model):
+    for layer in model.layers:
+        if hasattr(layer, "layers"):
+            yield from _leaf_layers(layer)
+        else:
+            yield layer
+
+
+def copy_weights(src, dst) -> None:
+    """
+    Copy weights layer by layer between two builds of the same architecture (e.g. at different input
+    resolutions or unfreezing depths); works because pooled heads make weight shapes size-independent.
+    """
+    src_layers, dst_layers = list(_leaf_layers(src)), list(_leaf_layers(dst))
+    if len(src_layers) != len(dst_layers):
+        raise ValueError(f"Architectures differ: {len(src_layers)} vs {len(dst_layers)} layers")
+    for s, d in zip(src_layers, dst_layers):
+        if s.weights:
+            d.set_weights(s.get_weights())
@@ -0,0 +1,114 @@
+"""
+Pruning for the custom CNN.
+
+Structured: drop whole conv filters with the smallest L1 norm (Li et al., "Pruning Filters for Efficient
+ConvNets") and rebuild a narrower build_custom_cnn with the surviving weights, so the saving shows up as
+real CPU latency. Magnitude: zero the smallest weights in place; the model keeps its shape (smaller when
+compressed, not faster on dense kernels), and MagnitudeMask keeps the zeros during fine-tuning.
+"""
+import numpy as np
+from tensorflow import keras
+
+from .custom_cnn import build_custom_cnn
+
+
+def custom_cnn_spec(model) -> dict:
+    """build_custom_cnn kwargs (filters, dense units, dropout, separable) recovered from a built model."""
+    convs = sorted((l for l in model.layers if l.name.startswith("conv_")), key=lambda l: int(l.name.split("_")[1]))
+    dense = sorted((l for l in model.layers if l.name.startswith("dense_")), key=lambda l: int(l.name.split("_")[1]))
+    drop = [l for l in model.layers if l.name.startswith("drop_dense_")]
+    return {
+        "input_shape": tuple(model.input_shape[1:]),
+        "num_classes": model.get_layer("output").units,
+        "filters": tuple(l.filters for l in convs),
+        "dense_units": tuple(l.units for l in dense),
+        "dropout": drop[0].rate if drop else 0.5,
+        "separable": any(isinstance(l, keras.layers.SeparableConv2D) for l in convs),
+        "name": model.name,
+    }
+
+
+def _filter_scores(layer) -> np.ndarray:
+    """L1 norm of each output filter (the pointwise kernel for separable convs)."""
+    kernel = layer.get_weights()[1 if isinstance(layer, keras.layers.SeparableConv2D) else 0]
+    return np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0)
+
+
+def prune_filters(model, ratio: float, min_filters: int = 4):
+    """
+    Structured pruning of a build_custom_cnn model: keep the (1 - ratio) highest-L1 filters of every
+    conv block and return a new, narrower model carrying the surviving weights (uncompiled).
+    """
+    spec = custom_cnn_spec(model)
+    keep = []
+    for i, f in enumerate(spec["filters"]):
+        scores = _filter_scores(model.get_layer(f"conv_{i}"))
+        n = min(max(int(round(f * (1.0 - ratio))), min_filters), f)
+        keep.append(np.sort(np.argsort(scores)[::-1][:n]))
+    pruned = build_custom_cnn(**dict(spec, filters=tuple(len(k) for k in keep)))
+
+    prev = np.arange(spec["input_shape"][-1])
+    for i, out in enumerate(keep):
+        src = model.get_layer(f"conv_{i}")
+        if isinstance(src, keras.layers.SeparableConv2D):
+            depthwise, pointwise, *bias = src.get_weights()
+            weights = [depthwise[:, :, prev, :], pointwise[:, :, prev, :][..., out]] + [b[out] for b in bias]
+        else:
+            kernel, *bias = src.get_weights()
+            weights = [kernel[:, :, prev, :][..., out]] + [b[out] for b in bias]
+        pruned.get_layer(f"conv_{i}").set_weights(weights)
+        pruned.get_layer(f"bn_{i}").set_weights([w[out] for w in model.get_layer(f"bn_{i}").get_weights()])
+        prev = out
+
+    first_dense = True
+    for layer in model.layers:
+        if not layer.weights or layer.name.startswith(("conv_", "bn_")):
+            continue
+        weights = layer.get_weights()
+        if first_dense:
+            # The first dense layer after global pooling sees only the kept channels of the last block
+            weights[0] = weights[0][prev]
+            first_dense = False
+        pruned.get_layer(layer.name).set_weights(weights)
+    return pruned
+
+
+def _kernels(model):
+    """Conv / dense kernels (every trainable weight with 2+ dims; biases and BN vectors excluded)."""
+    return [v for v in model.trainable_weights if len(v.shape) >= 2]
+
+
+def magnitude_masks(model, sparsity: float) -> dict:
+    """
+    Zero the smallest-magnitude fraction `sparsity` of every conv / dense kernel in place.
+    Returns {variable path: 0/1 mask} for MagnitudeMask.
+    """
+    masks = {}
+    for var in _kernels(model):
+        value = np.asarray(var.numpy())
+        threshold = np.quantile(np.abs(value), sparsity)
+        mask = (np.abs(value) > threshold).astype(value.dtype)
+        var.assign(value * mask)
+        masks[var.path] = mask
+    return masks
+
+
+class MagnitudeMask(keras.callbacks.Callback):
+    """Re-apply magnitude-pruning masks after every training batch so pruned weights stay zero."""
+
+    def __init__(self, masks: dict):
+        super().__init__()
+        self.masks = masks
+
+    def on_train_batch_end(self, batch, logs=None):
+        for var in self.model.trainable_weights:
+            mask = self.masks.get(var.path)
+            if mask is not None:
+                var.assign(var * mask)
+
+
+def sparsity(model) -> float:
+    """Fraction of exactly-zero weights over all conv / dense kernels."""
+    kernels = [np.asarray(v.numpy()) for v in _kernels(model)]
+    total = sum(k.size for k in kernels)
+    return sum(int((k == 0).sum()) for k in kernels) / total if total else 0.0
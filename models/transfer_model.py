@@ -4,7 +4,23 @@ Challenge 2: Target ≥99% accuracy (e.g. EfficientNetB0, ResNet50, DenseNet121)
 """
 import tensorflow as tf
 from tensorflow import keras
-from tensorflow.keras.applications import EfficientNetB0
+
+# Supported backbones: config `model.base` -> keras.applications constructor name
+TRANSFER_BASES = {
+    "EfficientNetB0": "EfficientNetB0",
+    "EfficientNetB1": "EfficientNetB1",
+    "EfficientNetB2": "EfficientNetB2",
+    "EfficientNetB3": "EfficientNetB3",
+    "EfficientNetV2B0": "EfficientNetV2B0",
+    "ResNet50": "ResNet50",
+    "ResNet50V2": "ResNet50V2",
+    "DenseNet121": "DenseNet121",
+    "DenseNet169": "DenseNet169",
+    "MobileNetV2": "MobileNetV2",
+    "MobileNetV3Small": "MobileNetV3Small",
+    "MobileNetV3Large": "MobileNetV3Large",
+    "InceptionV3": "InceptionV3",
+}
 
 
 def build_transfer_model(
@@ -14,13 +30,14 @@ def build_transfer_model(
     trainable_layers=20,
     dropout=0.4,
     pooling="avg",
+    weights="imagenet",
     name="transfer_brain",
 ):
     """Build a transfer model with pre-trained base and custom head."""
-    if base_name == "EfficientNetB0":
-        base = EfficientNetB0(include_top=False, weights="imagenet", input_shape=input_shape, pooling=pooling)
-    else:
-        raise ValueError(f"Unsupported base: {base_name}")
+    if base_name not in TRANSFER_BASES:
+        raise ValueError(f"Unsupported base: {base_name}. Choose one of {sorted(TRANSFER_BASES)}")
+    base_cls = getattr(keras.applications, TRANSFER_BASES[base_name])
+    base = base_cls(include_top=False, weights=weights, input_shape=input_shape, pooling=pooling)
 
     base.trainable = True
     n = len(base.layers)
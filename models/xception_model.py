@@ -12,10 +12,11 @@ def build_xception(
     trainable_layers=30,
     dropout=0.5,
     pooling="avg",
+    weights="imagenet",
     name="xception_brain",
 ):
     """Build Xception with optional unfreezing and custom head."""
-    base = XceptionBase(include_top=False, weights="imagenet", input_shape=input_shape, pooling=pooling)
+    base = XceptionBase(include_top=False, weights=weights, input_shape=input_shape, pooling=pooling)
     if trainable_layers == 0:
         base.trainable = False
     else:
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compare input-pipeline throughput with and without the tf.data augmentation stage.
+Run from project root: python scripts/benchmark_augmentation.py [--batches 50] [--synthetic]
+--synthetic uses random in-memory images (no dataset needed) to isolate the augmentation cost.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _synthetic_dataset(data_config: dict, num_batches: int):
+    import tensorflow as tf
+
+    h, w = data_config.get("image", {}).get("target_size", [224, 224])
+    batch_size = data_config.get("batch_size", 32)
+    num_classes = len(data_config.get("classes", [])) or 4
+    images = tf.random.uniform([batch_size, h, w, 3])
+    labels = tf.one_hot(tf.zeros([batch_size], tf.int32), num_classes)
+    return tf.data.Dataset.from_tensors((images, labels)).repeat(num_batches)
+
+
+def _throughput(ds, num_batches: int) -> float:
+    """Images per second over num_batches (after one warm-up batch)."""
+    it = iter(ds)
+    next(it)
+    n, start = 0, time.perf_counter()
+    for _ in range(num_batches):
+        try:
+            x, _ = next(it)
+        except StopIteration:
+            break
+        n += int(x.shape[0])
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed > 0 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--synthetic", action="store_true", help="Random images instead of data/raw")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        data_config = yaml.safe_load(f)
+
+    import tensorflow as tf
+    from src.data.augmentation import apply_augmentation
+    from src.data.dataset import get_dataset
+
+    rows = []
+    for augment in (False, True):
+        if args.synthetic:
+            ds = _synthetic_dataset(data_config, args.batches + 1)
+            if augment:
+                ds = apply_augmentation(ds, data_config)
+            ds = ds.prefetch(tf.data.AUTOTUNE)
+        else:
+            ds = get_dataset(data_config, "train", augment=augment)
+        rows.append(("with augmentation" if augment else "no augmentation", _throughput(ds, args.batches)))
+
+    print(f"{'pipeline':20}  images/s")
+    for name, ips in rows:
+        print(f"{name:20}  {ips:8.1f}")
+    base, aug = rows[0][1], rows[1][1]
+    if base > 0:
+        print(f"Augmentation overhead: {(1 - aug / base) * 100:.1f}% of baseline throughput")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
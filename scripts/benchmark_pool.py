@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Throughput and per-process memory of the multi-process inference pool (src/inference/pool.py) on the
+ONNX exports of the served models. Requests of --batch-size random images are sent from --clients threads.
+Memory is reported per worker as RSS, USS (private) and PSS (shared pages split between processes):
+with the shared-weights layout the weights count once per node, not once per worker.
+Run from project root: python scripts/benchmark_pool.py [--models custom_cnn] [--workers 4] [--requests 64]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=None, help="Default: models_for_inference in configs/app.yaml")
+    parser.add_argument("--workers", type=int, default=None, help="Default: inference.pool.workers")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per model")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads")
+    args = parser.parse_args()
+
+    from src.inference.pool import DEFAULT_POOL, InferencePool, shared_layout_for
+    from src.inference.predict import get_model_path, onnx_path_for
+
+    with open(ROOT / "configs" / "app.yaml") as f:
+        app_config = yaml.safe_load(f) or {}
+    settings = {**DEFAULT_POOL, **((app_config.get("inference") or {}).get("pool") or {})}
+    if args.workers:
+        settings["workers"] = args.workers
+
+    exports = {}
+    for name in args.models or app_config.get("models_for_inference", ["custom_cnn"]):
+        path = get_model_path(name, ROOT)
+        onnx = onnx_path_for(path) if path is not None else None
+        if onnx is None:
+            print(f"{name}: no up-to-date ONNX export (python scripts/export_onnx.py --share-weights), skipped")
+            continue
+        shared = shared_layout_for(onnx) is not None
+        print(f"{name}: {onnx.name}, {'shared weights' if shared else 'no shared-weights layout: private copy per worker'}")
+        exports[name] = onnx
+    if not exports:
+        return 1
+
+    with InferencePool(**settings) as pool:
+        clients = {name: pool.client(onnx) for name, onnx in exports.items()}
+        for name, client in clients.items():
+            batch = np.random.default_rng(0).random((args.batch_size, *client.input_shape[1:]), dtype=np.float32)
+            with ThreadPoolExecutor(settings["workers"]) as warm:  # every worker attaches the model
+                list(warm.map(lambda _: client.predict_on_batch(batch), range(2 * settings["workers"])))
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as executor:
+                list(executor.map(lambda _: client.predict_on_batch(batch), range(args.requests)))
+            elapsed = time.perf_counter() - started
+            print(
+                f"{name}: {args.requests} requests of {args.batch_size} in {elapsed:.2f}s "
+                f"({args.requests * args.batch_size / elapsed:.1f} img/s, {settings['workers']} workers)"
+            )
+        memory = pool.memory()
+    print(f"{'process':>10}  {'rss MB':>8}  {'uss MB':>8}  {'pss MB':>8}")
+    for pid, m in memory.items():
+        print(f"{pid:>10}  {m['rss_mb']:8.1f}  {m['uss_mb']:8.1f}  {m['pss_mb']:8.1f}")
+    workers = [m for pid, m in memory.items() if pid != "parent"]
+    print(f"workers total: pss {sum(m['pss_mb'] for m in workers):.1f} MB, rss {sum(m['rss_mb'] for m in workers):.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
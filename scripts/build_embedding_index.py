@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Embed the archived scans with a trained model and build the similar-cases index
+(data/processed/embeddings/<model>.npz, used by the dashboard and the AI report).
+Run from project root: python scripts/build_embedding_index.py [--model custom_cnn] [--benchmark 100000]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="custom_cnn", help="Saved model whose embeddings are indexed")
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--splits", nargs="+", default=["train", "validation"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default ~sqrt(N))")
+    parser.add_argument("--pq-sub-dim", type=int, default=16, help="Dimensions per PQ byte (0 = no PQ codes)")
+    parser.add_argument("--exact-only", action="store_true", help="Skip the IVF cells and PQ codes (exact search only)")
+    parser.add_argument(
+        "--benchmark", type=int, default=0, metavar="N",
+        help="Also time exact vs approximate lookups on N synthetic vectors near the real ones (e.g. 100000)",
+    )
+    args = parser.parse_args()
+
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+
+    from src.inference.predict import load_model
+    from src.inference.retrieval import EmbeddingIndex, benchmark_index, build_index, index_path
+
+    model = load_model(args.model, ROOT)
+    if model is None:
+        print(f"No saved model for {args.model}; train it first.")
+        return 1
+    index = build_index(
+        model,
+        data_config,
+        splits=args.splits,
+        batch_size=args.batch_size,
+        nlist=args.nlist,
+        pq_sub_dim=None if args.exact_only else args.pq_sub_dim or None,
+        ivf=not args.exact_only,
+    )
+    path = index_path(args.model, ROOT)
+    index.save(path)
+    print(f"Indexed {len(index)} scans ({index.embeddings.shape[1]}-d float16, {index.embeddings.nbytes / 1e6:.1f} MB) -> {path}")
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        base = index.embeddings.astype(np.float32)
+        rows = base[rng.integers(len(base), size=args.benchmark)]
+        noisy = rows + 0.05 * rng.standard_normal(rows.shape).astype(np.float32)
+        noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+        scaled = EmbeddingIndex(noisy, np.arange(args.benchmark).astype(str), np.zeros(args.benchmark, dtype=np.int32))
+        if args.pq_sub_dim:
+            scaled.build_pq(args.pq_sub_dim)
+        scaled.build_ivf(args.nlist)
+        queries = base[rng.integers(len(base), size=50)]
+        print(benchmark_index(scaled, queries))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Find duplicate and near-duplicate scans in data/raw (pHash + dHash, BK-tree) and write the exclusion list
+that the split index honours (`dataset.exclude` in configs/data.yaml).
+Run from project root: python scripts/dedup_dataset.py [--dry-run] [--phash-distance 4] [--dhash-distance 6]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--phash-distance", type=int, default=4, help="Max pHash Hamming distance (bits of 64)")
+    parser.add_argument("--dhash-distance", type=int, default=6, help="Max dHash Hamming distance (bits of 64)")
+    parser.add_argument("--workers", type=int, default=None, help="Decode threads (default: Python's default)")
+    parser.add_argument("--output", type=str, default=None, help="Report / exclusion list (default: dataset.exclude)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the summary without writing the exclusion list")
+    args = parser.parse_args()
+
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+
+    from src.data.dedup import DEFAULT_EXCLUDE, save_report, scan_dataset
+
+    report = scan_dataset(data_config, args.phash_distance, args.dhash_distance, workers=args.workers)
+    print(f"Scanned {report['num_files']} files ({len(report['unreadable'])} unreadable)")
+    print(f"Duplicate groups: {report['num_groups']} ({report['cross_split_groups']} spanning train and validation)")
+    print(f"Groups with conflicting labels (all members excluded): {len(report['label_conflicts'])}")
+    print(f"Files to exclude: {len(report['exclude'])}")
+    for group in report["groups"][:10]:
+        print("  " + " | ".join(f"{m['split']}:{m['path']}" for m in group))
+
+    if args.dry_run:
+        return 0
+    output = Path(args.output or data_config.get("dataset", {}).get("exclude") or DEFAULT_EXCLUDE)
+    output = output if output.is_absolute() else ROOT / output
+    save_report(report, output)
+    print(f"Wrote {output}")
+    if not data_config.get("dataset", {}).get("exclude"):
+        print("Set dataset.exclude in the data config to this file to apply it to the splits.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_RAW = ROOT / "data" / "raw"
+sys.path.insert(0, str(ROOT))
 
 # Class folder names as they appear in the dataset (Training/Testing subdirs)
 DATASET_CLASSES = ("glioma", "meningioma", "pituitary", "notumor")
@@ -19,6 +20,7 @@ DATASET_CLASSES = ("glioma", "meningioma", "pituitary", "notumor")
 
 def main():
     import kagglehub
+    from src.data.ingest import DEFAULT_MANIFEST, ingest, validate
 
     path = kagglehub.dataset_download("masoudnickparvar/brain-tumor-mri-dataset")
     print("Path to dataset files:", path)
@@ -55,19 +57,13 @@ def main():
                     shutil.rmtree(existing)
                 else:
                     existing.unlink()
-        # Merge train + test into data/raw/<Class>/
-        for class_name in DATASET_CLASSES:
-            dest_dir = DATA_RAW / class_name
-            dest_dir.mkdir(parents=True, exist_ok=True)
-            for split_dir in (train_dir, test_dir):
-                src = split_dir / class_name
-                if not src.is_dir():
-                    continue
-                for f in src.iterdir():
-                    if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png", ".bmp"):
-                        shutil.copy2(f, dest_dir / f.name)
-            count = len(list(dest_dir.glob("*.*")))
-            print("Merged", class_name, "->", dest_dir, "(", count, "images)")
+        # Merge train + test into data/raw/<Class>/ (parallel; unchanged files are skipped on re-run)
+        counts = ingest([train_dir, test_dir], DATA_RAW, classes=DATASET_CLASSES)
+        print("Merged", DATASET_CLASSES, "->", DATA_RAW, counts)
+        report = validate(DATA_RAW, ROOT / DEFAULT_MANIFEST, classes=DATASET_CLASSES)
+        print("Images per class:", report["classes"])
+        if report["corrupt"]:
+            print(f"{len(report['corrupt'])} corrupt file(s); run python scripts/ingest_data.py --quarantine", file=sys.stderr)
     else:
         # Fallback: assume path has class folders (or one subdir with them)
         dirs = [d for d in path.iterdir() if d.is_dir() and not d.name.startswith(".")]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Export trained models to ONNX for the ONNX Runtime backend (`inference.backend` in configs/app.yaml).
+Registry models export every routed version (production and candidate; --all-versions: every published
+version) to models/registry/<name>/exports/<version>.onnx, since version directories are immutable; models
+without registry versions export next to the served .keras file (same name, .onnx). Up-to-date exports are
+skipped unless --force. An export replaces a previous one only if the Keras and ONNX outputs match on
+validation scans (random images when the dataset is missing).
+--share-weights also writes the shared-weights layout (src.inference.pool.share_weights) used by the ONNX and
+pool backends to map one copy of the weights into every process; run it on each serving node.
+Run from project root: python scripts/export_onnx.py [--models custom_cnn xception transfer] [--atol 1e-4] [--share-weights]
+  [--all-versions] [--force]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def validation_batch(data_config: dict, input_size: tuple, n: int):
+    """Up to n preprocessed validation scans at input_size, or None if the dataset is not available."""
+    from src.data.dataset import get_split_files, load_image_from_bytes
+
+    try:
+        paths, _ = get_split_files(data_config, "validation")
+    except FileNotFoundError:
+        return None
+    if not len(paths) or n <= 0:
+        return None
+    step = max(len(paths) // n, 1)
+    return np.concatenate([
+        load_image_from_bytes(Path(p).read_bytes(), target_size=input_size, normalize=True) for p in paths[::step][:n]
+    ])
+
+
+def model_paths(name: str, all_versions: bool) -> list:
+    """(label, .keras path) to export for a model: its routed (or all) registry versions, else the served file."""
+    from src.inference.predict import get_model_path
+    from src.inference.registry import ModelRegistry
+
+    registry = ModelRegistry(ROOT)
+    versions = registry.versions(name) if all_versions else registry.routed_versions(name)
+    if versions:
+        return [(f"{name} {v}", registry.model_path(name, v)) for v in versions]
+    path = get_model_path(name, ROOT)
+    return [(name, path)] if path is not None else []
+
+
+def export_one(label: str, path: Path, data_config: dict, args) -> bool:
+    """Export one .keras file to onnx_export_path(path); False if it fails the equivalence check."""
+    from tensorflow import keras
+
+    from src.inference.export import DEFAULT_OPSET, check_equivalence, export_onnx
+    from src.inference.predict import onnx_export_path
+
+    model = keras.models.load_model(str(path), compile=False)
+    target = onnx_export_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    candidate = export_onnx(model, target.with_name(f"{target.stem}.candidate.onnx"), opset=args.opset or DEFAULT_OPSET)
+    batch = validation_batch(data_config, tuple(model.input_shape[1:3]), args.check_images)
+    check = check_equivalence(model, candidate, batch, atol=args.atol)
+    emb = check["max_abs_diff_embedding"]
+    print(
+        f"{label}: max |dp| {check['max_abs_diff_probs']:.2e}, max |d embedding| "
+        f"{'n/a' if emb is None else f'{emb:.2e}'}, argmax agreement {check['argmax_agreement']:.1%} "
+        f"on {'validation' if batch is not None else 'random'} images"
+    )
+    if not check["passed"]:
+        candidate.unlink()
+        print(f"{label}: FAILED the equivalence check (atol {args.atol}); previous export kept")
+        return False
+    os.replace(candidate, target)
+    print(f"{label}: wrote {target} ({target.stat().st_size / 1e6:.1f} MB)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=["custom_cnn", "xception", "transfer"])
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--opset", type=int, default=None, help="ONNX opset (default: src.inference.export.DEFAULT_OPSET)")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Max allowed |p_keras - p_onnx|")
+    parser.add_argument("--check-images", type=int, default=32, help="Validation scans used for the equivalence check")
+    parser.add_argument("--share-weights", action="store_true", help="Also write <model>.shared.onnx + <model>.weights")
+    parser.add_argument("--all-versions", action="store_true", help="Export every registry version, not only routed ones")
+    parser.add_argument("--force", action="store_true", help="Re-export even if the export is up to date")
+    args = parser.parse_args()
+
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+
+    from src.inference.pool import share_weights, shared_layout_for
+    from src.inference.predict import onnx_path_for
+
+    failed = 0
+    for name in args.models:
+        paths = model_paths(name, args.all_versions)
+        if not paths:
+            print(f"{name}: no saved model, skipped")
+        for label, path in paths:
+            onnx = None if args.force else onnx_path_for(path)
+            if onnx is not None:
+                print(f"{label}: {onnx} is up to date, kept (--force to re-export)")
+            elif export_one(label, path, data_config, args):
+                onnx = onnx_path_for(path)
+            else:
+                failed += 1
+                continue
+            if args.share_weights and shared_layout_for(onnx) is None:
+                graph = share_weights(onnx)
+                print(f"{label}: wrote {graph} and its weights file for shared-memory serving")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Ingest images into data/raw/<class>/ (parallel copy or hard-link) and verify the raw dataset incrementally:
+every new or changed image is fully decoded and recorded (size, shape, SHA-256) in data/processed/manifest.json.
+Run from project root:
+  python scripts/ingest_data.py --source /path/to/Training --source /path/to/Testing [--link]
+  python scripts/ingest_data.py                  # verify data/raw only
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", action="append", default=[], help="Folder with <class>/ image subfolders (repeatable)")
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--link", action="store_true", help="Hard-link instead of copying (falls back to copy across filesystems)")
+    parser.add_argument("--workers", type=int, default=None, help="Thread pool size (default: Python's default)")
+    parser.add_argument("--manifest", type=str, default=None, help="Manifest path (default: dataset.manifest in the data config)")
+    parser.add_argument("--full", action="store_true", help="Re-verify every file, not only new or changed ones")
+    parser.add_argument("--quarantine", action="store_true", help="Move corrupt files to data/processed/quarantine/")
+    args = parser.parse_args()
+
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+
+    from src.data.dataset import _resolve_raw_dir
+    from src.data.ingest import DEFAULT_MANIFEST, ingest, quarantine, validate
+
+    raw_dir = _resolve_raw_dir(data_config)
+    classes = data_config.get("classes")
+    if args.source:
+        t0 = time.perf_counter()
+        counts = ingest(args.source, raw_dir, classes=classes, link=args.link, workers=args.workers)
+        print(f"Ingested into {raw_dir} in {time.perf_counter() - t0:.1f}s: {counts}")
+    if not raw_dir.exists():
+        print(f"Data directory not found: {raw_dir}")
+        return 1
+
+    manifest = Path(args.manifest or data_config.get("dataset", {}).get("manifest") or DEFAULT_MANIFEST)
+    manifest = manifest if manifest.is_absolute() else ROOT / manifest
+    t0 = time.perf_counter()
+    report = validate(raw_dir, manifest, classes=classes, workers=args.workers, full=args.full)
+    print(
+        f"Verified {report['checked']} new/changed of {report['total']} files "
+        f"({report['unchanged']} unchanged, {report['removed']} removed) in {time.perf_counter() - t0:.1f}s"
+    )
+    print("Per class:", report["classes"])
+    if not report["corrupt"]:
+        print("No corrupt files.")
+        return 0
+    print(f"{len(report['corrupt'])} corrupt file(s):")
+    for key in report["corrupt"]:
+        print("  ", key)
+    if args.quarantine:
+        moved = quarantine(raw_dir, report["corrupt"], ROOT / "data" / "processed" / "quarantine", manifest_path=manifest)
+        print(f"Moved {moved} file(s) to data/processed/quarantine/")
+        return 0
+    print("Rerun with --quarantine to move them out of the dataset.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
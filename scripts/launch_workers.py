@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Launch N local training workers (MultiWorkerMirroredStrategy) on this machine, one process per worker.
+For real clusters run `python scripts/train.py --distributed ...` on every node with its own TF_CONFIG
+(see src/training/distributed.make_tf_config).
+Run from project root: python scripts/launch_workers.py --workers 2 --config configs/xception.yaml [--pin]
+Extra arguments after the known ones are passed through to scripts/train.py.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _free_ports(n: int) -> list:
+    socks = [socket.socket() for _ in range(n)]
+    for s in socks:
+        s.bind(("localhost", 0))
+    ports = [s.getsockname()[1] for s in socks]
+    for s in socks:
+        s.close()
+    return ports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--config", type=str, action="append", required=True)
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own disjoint set of cores")
+    args, passthrough = parser.parse_known_args()
+
+    from src.training.distributed import make_tf_config
+
+    hosts = [f"localhost:{p}" for p in _free_ports(args.workers)]
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    per_worker = max(len(cores) // args.workers, 1)
+    threads = args.threads or per_worker
+    cmd = [sys.executable, str(ROOT / "scripts" / "train.py"), "--distributed"]
+    for config in args.config:
+        cmd += ["--config", config]
+    cmd += passthrough
+
+    procs = []
+    for i in range(args.workers):
+        env = dict(os.environ, TF_CONFIG=make_tf_config(hosts, i), TF_NUM_INTRAOP_THREADS=str(threads))
+        if args.pin:
+            # Applied by src.runtime.configure in the worker before TensorFlow starts its thread pools
+            worker_cores = cores[i * per_worker:(i + 1) * per_worker] or cores[-per_worker:]
+            env.update(RUNTIME_CPU_AFFINITY=",".join(map(str, worker_cores)), RUNTIME_INTRA_OP_THREADS=str(threads))
+        procs.append(subprocess.Popen(cmd, env=env, cwd=str(ROOT)))
+    codes = [p.wait() for p in procs]
+    for i, code in enumerate(codes):
+        print(f"worker {i}: exit code {code}")
+    return max(codes, key=abs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Manage versioned models in models/registry (src/inference/registry.py). A running app picks up routing
+changes within a few seconds: new versions are loaded and warmed in the background, then swapped in.
+Run from project root:
+  python scripts/models_registry.py list [custom_cnn]
+  python scripts/models_registry.py publish custom_cnn models/saved/custom_cnn_best.keras [--promote]
+  python scripts/models_registry.py candidate custom_cnn v002 --percent 10 [--mode shadow]
+  python scripts/models_registry.py promote custom_cnn v002
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="Versions, metrics and routing")
+    p_list.add_argument("name", nargs="?", default=None)
+    p_pub = sub.add_parser("publish", help="Store a saved model as a new immutable version")
+    p_pub.add_argument("name")
+    p_pub.add_argument("model_path")
+    p_pub.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"), help="Class order")
+    p_pub.add_argument("--metrics", type=str, default=None, help='JSON, e.g. \'{"val_accuracy": 0.93}\'')
+    p_pub.add_argument("--promote", action="store_true", help="Serve the new version to all traffic")
+    p_cand = sub.add_parser("candidate", help="Route a share of traffic to a candidate version")
+    p_cand.add_argument("name")
+    p_cand.add_argument("version", help="Version id, or 'none' to stop the comparison")
+    p_cand.add_argument("--percent", type=int, default=10, help="Share of uploads routed to the candidate (0-100)")
+    p_cand.add_argument("--mode", choices=["ab", "shadow"], default="ab",
+                        help="ab: the candidate answers its share; shadow: it only runs alongside production")
+    p_prom = sub.add_parser("promote", help="Serve a version to all traffic (rollback = promote an older one)")
+    p_prom.add_argument("name")
+    p_prom.add_argument("version")
+    args = parser.parse_args()
+
+    from src.inference.registry import ModelRegistry, shadow_summary
+
+    registry = ModelRegistry(ROOT)
+    if args.command == "publish":
+        with open(args.data_config) as f:
+            class_names = yaml.safe_load(f).get("classes")
+        metrics = json.loads(args.metrics) if args.metrics else None
+        version = registry.publish(args.name, args.model_path, metrics=metrics, class_names=class_names)
+        print(f"Published {args.name} {version}")
+        if args.promote or registry.routing(args.name)["production"] is None:
+            registry.promote(args.name, version)
+            print(f"{args.name}: production = {version}")
+        return 0
+    if args.command == "candidate":
+        version = None if args.version.lower() == "none" else args.version
+        routing = registry.set_routing(
+            args.name, candidate=version, candidate_percent=args.percent if version else 0, mode=args.mode,
+        )
+        print(f"{args.name}: {json.dumps(routing)}")
+        return 0
+    if args.command == "promote":
+        print(f"{args.name}: {json.dumps(registry.promote(args.name, args.version))}")
+        return 0
+
+    names = [args.name] if args.name else sorted(d.name for d in registry.root.iterdir() if d.is_dir()) if registry.root.is_dir() else []
+    for name in names:
+        routing = registry.routing(name)
+        print(f"{name}: production={routing['production']} candidate={routing['candidate']} "
+              f"({routing['candidate_percent']}% {routing['mode']})")
+        for version in registry.versions(name):
+            meta = registry.metadata(name, version)
+            metrics = ", ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in meta["metrics"].items())
+            print(f"  {version}  {meta['created']}  sha256={meta['sha256'][:12]}  input={meta['input_size']}  {metrics}")
+        for version, stats in shadow_summary(name, ROOT).items():
+            print(f"  shadow {version}: {stats['requests']} requests, agreement {stats['agreement']:.1%}, "
+                  f"mean max |dp| {stats['mean_abs_diff']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Search slim custom CNN variants (width, separable convs, input size) and prune the ones that reach
+the accuracy target; prints a Pareto table of validation accuracy vs. CPU latency vs. parameters.
+Run from project root: python scripts/search_custom_cnn.py [--config configs/compress.yaml]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=str(ROOT / "configs" / "compress.yaml"))
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--cache", type=str, default=None, help="Dataset cache: memory or a directory")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        search_config = yaml.safe_load(f)
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+    if args.cache:
+        data_config.setdefault("dataset", {})["cache"] = args.cache
+
+    from src.training.compress import run_search
+
+    run_search(search_config, data_config, ROOT)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
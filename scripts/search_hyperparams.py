@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter search over a training config: TPE / random sampling, successive-halving or Hyperband
+early stopping, trials in a process pool over one shared cached dataset.
+Run from project root: python scripts/search_hyperparams.py [--config configs/hpo.yaml] [--workers 4]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=str(ROOT / "configs" / "hpo.yaml"))
+    parser.add_argument("--data-config", type=str, default=str(ROOT / "configs" / "data.yaml"))
+    parser.add_argument("--workers", type=int, default=None, help="Parallel trials (overrides config)")
+    parser.add_argument("--trials", type=int, default=None, help="Trials per bracket (overrides config)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        hpo_config = yaml.safe_load(f)
+    with open(args.data_config) as f:
+        data_config = yaml.safe_load(f)
+    if args.workers:
+        hpo_config["workers"] = args.workers
+    if args.trials:
+        hpo_config["trials"] = args.trials
+
+    from src.training.hpo import run_search
+
+    run_search(hpo_config, data_config, ROOT)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Train one or more models from YAML configs (model chosen by model.name / model.base).
+Run from project root:
+  python scripts/train.py --config configs/custom_cnn.yaml
+  python scripts/train.py --config configs/xception.yaml --config configs/transfer.yaml --cache memory
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+if __name__ == "__main__":
+    from src.training.train import main
+
+    sys.exit(main())
@@ -1,50 +1,17 @@
 #!/usr/bin/env python3
-"""Train the Xception model."""
-import argparse
+"""Train the Xception model. Thin wrapper over the unified trainer (scripts/train.py)."""
 import sys
 from pathlib import Path
 
-import yaml
-
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 
 def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--config", type=str, default=str(ROOT / "configs" / "xception.yaml"))
-    args = parser.parse_args()
-
-    with open(args.config) as f:
-        config = yaml.safe_load(f)
-
-    paths = config.setdefault("paths", {})
-    for key in ("save_best", "save_final", "checkpoint_dir"):
-        if paths.get(key) and not Path(paths[key]).is_absolute():
-            paths[key] = str(ROOT / paths[key])
-
-    data_path = ROOT / "configs" / "data.yaml"
-    with open(data_path) as f:
-        data_config = yaml.safe_load(f)
-    # Ensure data loader matches Xception input size (299x299)
-    data_config.setdefault("image", {})["target_size"] = [299, 299]
-
-    from src.data.dataset import get_dataset
-    from src.training.train import run_training
-    from models.xception_model import build_xception
-
-    train_ds = get_dataset(data_config, "train")
-    val_ds = get_dataset(data_config, "validation")
+    from src.training.train import main as train_main
 
-    model = build_xception(
-        input_shape=tuple(config["model"]["input_shape"]),
-        num_classes=config["model"]["num_classes"],
-        trainable_layers=config["model"]["trainable_layers"],
-        dropout=config["model"]["dropout"],
-        pooling=config["model"]["pooling"],
-    )
-    run_training(model, train_ds, val_ds, config)
+    return train_main(default_config=str(ROOT / "configs" / "xception.yaml"))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark TensorFlow thread / oneDNN configurations for each served model and persist the fastest one
+to configs/runtime_tuned.yaml (used by src/runtime.py for `runtime` keys left null in configs/app.yaml).
+Each configuration runs in a fresh process, since thread pools are fixed once TensorFlow starts.
+Run from project root:
+  python scripts/tune_runtime.py [--models custom_cnn xception] [--batch-size 1] [--cpus 0-3]
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def run_trial(spec: dict) -> dict:
+    """Child process: apply the settings, load the model and time predict_on_batch."""
+    from src.runtime import configure
+    from src.inference.benchmark import measure_latency
+    from src.inference.predict import load_model
+
+    configure(spec["settings"])
+    model = load_model(spec["model"], ROOT)
+    if model is None:
+        return {"error": "model not found"}
+    return measure_latency(model, model.input_shape[1:3], batch_size=spec["batch_size"], runs=spec["runs"])
+
+
+def _trial(model_name: str, settings: dict, batch_size: int, runs: int) -> dict:
+    spec = json.dumps({"model": model_name, "settings": settings, "batch_size": batch_size, "runs": runs})
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")
+    for key in list(env):
+        if key.startswith("RUNTIME_"):
+            del env[key]  # the trial's own settings must win
+    out = subprocess.run(
+        [sys.executable, __file__, "--trial", spec], env=env, cwd=str(ROOT), capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _thread_counts(n: int) -> list:
+    counts = {n}
+    c = 1
+    while c < n:
+        counts.add(c)
+        c *= 2
+    return sorted(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=None, help="Default: models_for_inference in configs/app.yaml")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--cpus", type=str, default=None, help="Core set to tune for, e.g. 0-3 (default: all available)")
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help="Intra-op thread counts (default: 1, 2, 4, ... cores)")
+    parser.add_argument("--inter", type=int, nargs="+", default=[1, 2], help="Inter-op thread counts")
+    parser.add_argument("--onednn", choices=["both", "on", "off"], default="both")
+    parser.add_argument("--dry-run", action="store_true", help="Print results without writing configs/runtime_tuned.yaml")
+    parser.add_argument("--trial", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        print(json.dumps(run_trial(json.loads(args.trial))))
+        return 0
+
+    from src.runtime import TUNED_PATH, load_tuned, parse_cpus
+
+    with open(ROOT / "configs" / "app.yaml") as f:
+        app_config = yaml.safe_load(f) or {}
+    models = args.models or app_config.get("models_for_inference", ["custom_cnn"])
+    cpus = parse_cpus(args.cpus) or (sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None)
+    n_cpus = len(cpus) if cpus else (os.cpu_count() or 1)
+    onednn = {"both": [True, False], "on": [True], "off": [False]}[args.onednn]
+    grid = list(itertools.product(args.threads or _thread_counts(n_cpus), args.inter, onednn))
+
+    tuned = load_tuned(ROOT)
+    for model_name in models:
+        print(f"=== {model_name} (batch {args.batch_size}, {n_cpus} cores, {len(grid)} configurations) ===")
+        results = []
+        for intra, inter, use_onednn in grid:
+            settings = {
+                "intra_op_threads": intra, "inter_op_threads": inter, "onednn": use_onednn,
+                "xla": False, "cpu_affinity": cpus,
+            }
+            result = _trial(model_name, settings, args.batch_size, args.runs)
+            if "error" in result:
+                print(f"  intra={intra:<3} inter={inter:<2} onednn={use_onednn!s:<5}  {result['error']}")
+                if result["error"] == "model not found":
+                    break
+                continue
+            print(f"  intra={intra:<3} inter={inter:<2} onednn={use_onednn!s:<5}  "
+                  f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  {result['images_per_s']:8.1f} img/s")
+            results.append((result["p50_ms"], settings, result))
+        if not results:
+            continue
+        _, best, result = min(results, key=lambda r: r[0])
+        print(f"  best: intra={best['intra_op_threads']} inter={best['inter_op_threads']} onednn={best['onednn']}")
+        tuned[model_name] = {
+            "intra_op_threads": best["intra_op_threads"],
+            "inter_op_threads": best["inter_op_threads"],
+            "onednn": best["onednn"],
+            "batch_size": args.batch_size,
+            "cores": n_cpus,
+            "p50_ms": round(result["p50_ms"], 3),
+            "images_per_s": round(result["images_per_s"], 2),
+            "tuned": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    if args.dry_run:
+        return 0
+    path = ROOT / TUNED_PATH
+    with open(path, "w") as f:
+        f.write("# Written by scripts/tune_runtime.py: fastest thread / oneDNN settings per model on this machine\n")
+        yaml.safe_dump(tuned, f, sort_keys=True)
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
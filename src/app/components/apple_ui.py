@@ -250,6 +250,9 @@ def inject_apple_css(dark: bool = False):
         }}
         .findings-card:hover, .similar-cases-card:hover {{ transform: translateY(-1px); box-shadow: 0 8px 28px rgba(0,0,0,0.08); }}
         .findings-card h4, .similar-cases-card h4 {{ margin: 0 0 0.75rem 0; font-size: 1rem; font-weight: 600; color: {text}; }}
+        .similar-case-grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(96px, 1fr)); gap: 0.75rem; }}
+        .similar-case {{ margin: 0; text-align: center; font-size: 0.8rem; color: {text_muted}; }}
+        .similar-case img {{ width: 100%; border-radius: 10px; border: 1px solid {border}; }}
         .finding-row {{
             display: flex;
             align-items: center;
@@ -394,3 +397,16 @@ def recommendations_card_html(title: str, items: list[str]) -> str:
 def similar_cases_card_html(title: str, body_html: str) -> str:
     """Similar cases / reference card (chart or text inside)."""
     return f'<div class="similar-cases-card"><h4>{title}</h4><div>{body_html}</div></div>'
+
+
+def similar_case_tiles_html(cases: list[dict]) -> str:
+    """Grid of retrieved cases: [{"label", "score", "thumbnail" (PNG bytes or None)}, ...]."""
+    import base64
+
+    tiles = []
+    for case in cases:
+        img = ""
+        if case.get("thumbnail"):
+            img = f'<img src="data:image/png;base64,{base64.b64encode(case["thumbnail"]).decode()}" alt="{case["label"]}"/>'
+        tiles.append(f'<figure class="similar-case">{img}<figcaption>{case["label"]} · {case["score"]:.2f}</figcaption></figure>')
+    return f'<div class="similar-case-grid">{"".join(tiles)}</div>'
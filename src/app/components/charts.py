@@ -0,0 +1,114 @@
+"""
+Lightweight chart rendering for the report dashboard (no matplotlib).
+Saliency maps are colormapped with a NumPy lookup table and alpha-blended over the scan with PIL;
+class probabilities are emitted as a Vega-Lite spec rendered natively by st.vega_lite_chart.
+"""
+import io
+
+import numpy as np
+
+# Anchor points of the classic "jet" colormap: (position, value) per channel
+_JET_ANCHORS = {
+    "r": ((0.0, 0.0), (0.35, 0.0), (0.66, 1.0), (0.89, 1.0), (1.0, 0.5)),
+    "g": ((0.0, 0.0), (0.125, 0.0), (0.375, 1.0), (0.64, 1.0), (0.91, 0.0), (1.0, 0.0)),
+    "b": ((0.0, 0.5), (0.11, 1.0), (0.34, 1.0), (0.65, 0.0), (1.0, 0.0)),
+}
+
+HIGHLIGHT_COLOR = "#0d9488"
+MUTED_COLOR = "#cbd5e1"
+
+
+def _build_lut(anchors: dict, size: int = 256) -> np.ndarray:
+    x = np.linspace(0.0, 1.0, size)
+    channels = []
+    for c in ("r", "g", "b"):
+        pos, val = zip(*anchors[c])
+        channels.append(np.interp(x, pos, val))
+    return np.round(np.stack(channels, axis=-1) * 255).astype(np.uint8)
+
+
+JET_LUT = _build_lut(_JET_ANCHORS)
+
+
+def colorize(saliency: np.ndarray, lut: np.ndarray = JET_LUT) -> np.ndarray:
+    """Map a (H, W) array in [0, 1] to (H, W, 3) uint8 RGB via a 256-entry LUT."""
+    idx = np.clip(np.nan_to_num(saliency) * (len(lut) - 1), 0, len(lut) - 1).astype(np.intp)
+    return lut[idx]
+
+
+def blend_saliency(scan: np.ndarray, saliency: np.ndarray, alpha: float = 0.6) -> np.ndarray:
+    """
+    Blend the colormapped saliency over an (H, W, 3) scan with values in [0, 255] at the saliency resolution.
+    Blend weight is alpha * saliency per pixel, so unimportant regions keep the original scan.
+    Returns (H, W, 3) uint8.
+    """
+    heat = colorize(saliency).astype(np.float32)
+    weight = (alpha * np.clip(saliency, 0.0, 1.0))[..., None]
+    return (scan.astype(np.float32) * (1.0 - weight) + heat * weight).astype(np.uint8)
+
+
+def scan_rgb(image_bytes: bytes, size=None) -> np.ndarray:
+    """Decode an uploaded scan (JPEG/PNG or DICOM, first frame) to (H, W, 3) uint8, optionally resized to (w, h)."""
+    from PIL import Image
+    from src.data import dicom
+
+    if dicom.is_dicom(image_bytes):
+        frame = dicom.decode_frames(image_bytes, frames=[0])
+        if size is None:
+            size = frame.shape[2], frame.shape[1]
+        return (dicom.to_model_input(frame, size)[0] * 255.0).astype(np.uint8)
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    if size is not None:
+        img = img.resize(tuple(size))
+    return np.asarray(img)
+
+
+def saliency_overlay(image_bytes: bytes, saliency: np.ndarray, alpha: float = 0.6) -> np.ndarray:
+    """Saliency blended over the scan resized to the saliency resolution; (H, W, 3) uint8."""
+    h, w = saliency.shape[:2]
+    return blend_saliency(scan_rgb(image_bytes, (w, h)), saliency, alpha=alpha)
+
+
+def to_png(rgb: np.ndarray) -> bytes:
+    """Encode an (H, W, 3) uint8 array as PNG bytes."""
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format="PNG", optimize=False, compress_level=1)
+    return buf.getvalue()
+
+
+def saliency_overlay_png(image_bytes: bytes, saliency: np.ndarray, alpha: float = 0.6) -> bytes:
+    """Saliency overlay encoded as PNG bytes (ready for st.image)."""
+    from src.tracing import span
+
+    with span("render", artifact="saliency_png"):
+        return to_png(saliency_overlay(image_bytes, saliency, alpha=alpha))
+
+
+def probability_chart_spec(labels: list, probs: list, highlight_idx: int = -1) -> dict:
+    """Vega-Lite horizontal bar chart of class probabilities (for st.vega_lite_chart)."""
+    values = [
+        {"label": label, "probability": float(p), "color": HIGHLIGHT_COLOR if i == highlight_idx else MUTED_COLOR}
+        for i, (label, p) in enumerate(zip(labels, probs))
+    ]
+    return {
+        "data": {"values": values},
+        "mark": {"type": "bar", "cornerRadiusEnd": 4},
+        "encoding": {
+            "y": {"field": "label", "type": "nominal", "sort": None, "title": None},
+            "x": {
+                "field": "probability",
+                "type": "quantitative",
+                "scale": {"domain": [0, 1]},
+                "axis": {"format": ".0%"},
+                "title": "Probability",
+            },
+            "color": {"field": "color", "type": "nominal", "scale": None, "legend": None},
+            "tooltip": [
+                {"field": "label", "type": "nominal", "title": "Class"},
+                {"field": "probability", "type": "quantitative", "format": ".1%"},
+            ],
+        },
+        "height": 24 * max(len(values), 1),
+    }
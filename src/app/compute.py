@@ -0,0 +1,367 @@
+"""
+Compute layer for the dashboard: every artifact derived from an upload is keyed by the upload digest.
+Streamlit reruns the page on each widget interaction (theme toggle, LLM select, buttons); process-level
+caches (models, predictions, saliency, chart PNGs/specs, export HTML) and a per-session artifact store make
+those reruns reuse results instead of repeating inference.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import streamlit as st
+
+from src.data.dataset import load_image_from_bytes
+from src.data.study import decode_slices, expand_uploads
+from src.inference.study import aggregate_study, predict_study
+from src.app.report_helpers import build_export_html
+from src.tracing import span
+from src.app.components.charts import blend_saliency, probability_chart_spec, saliency_overlay_png, scan_rgb, to_png
+
+
+def upload_digest(uploaded) -> tuple[str, bytes]:
+    """
+    Return (sha256 digest, bytes) for a Streamlit UploadedFile.
+    Each distinct upload is hashed once per session (keyed by Streamlit's file_id).
+    """
+    with span("upload.read"):
+        data = uploaded.getvalue()
+        digests = st.session_state.setdefault("_upload_digests", {})
+        file_key = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+        if file_key not in digests:
+            digests[file_key] = hashlib.sha256(data).hexdigest()
+    return digests[file_key], data
+
+
+def uploads_digest(uploaded_files) -> tuple[str, list[tuple[str, bytes]]]:
+    """Combined digest and (name, bytes) list for several uploads (independent of upload order)."""
+    combined = hashlib.sha256()
+    named = []
+    for uploaded in sorted(uploaded_files, key=lambda f: f.name):
+        digest, data = upload_digest(uploaded)
+        combined.update(digest.encode())
+        named.append((uploaded.name, data))
+    return combined.hexdigest(), named
+
+
+def session_artifacts(digest: str) -> dict:
+    """
+    Per-session store for artifacts that are not worth sharing across users (e.g. generated AI text).
+    Reset whenever a different scan is uploaded.
+    """
+    store = st.session_state.get("_scan_artifacts")
+    if store is None or store.get("digest") != digest:
+        store = {"digest": digest}
+        st.session_state["_scan_artifacts"] = store
+    return store
+
+
+@st.cache_resource(show_spinner=False)
+def model_server(root: str):
+    """
+    Process-wide ModelServer (src.inference.registry): versioned models, background loads and swaps.
+    Every loaded version is warmed at the batch sizes of the `warmup` / `study` / `tta` sections of configs/app.yaml
+    and served by the `inference.backend` set there (keras, onnx, pool or auto; pool starts the worker processes of
+    src.inference.pool with the `inference.pool` settings).
+    TensorFlow's threads / oneDNN / XLA / CPU affinity are configured here, before the server first imports it
+    (`runtime` section, tuned for the first model in models_for_inference; see src.runtime).
+    """
+    from src.app.utils import load_app_config
+    from src.runtime import configure, runtime_settings
+    from src.inference.registry import ModelServer
+    from src.inference.warmup import warmup_settings
+
+    app_config = load_app_config()
+    primary = (app_config.get("models_for_inference") or [None])[0]
+    configure(runtime_settings(app_config, model_name=primary, root=Path(root)))
+    inference = app_config.get("inference") or {}
+    backend = inference.get("backend", "keras")
+    if backend == "pool":
+        from src.inference.pool import default_pool
+
+        default_pool(inference.get("pool"))
+    return ModelServer(Path(root), warmup=warmup_settings(app_config), backend=backend)
+
+
+@st.cache_resource(show_spinner=False)
+def service_warmup(root: str, model_names: tuple):
+    """Warm-up of every model in models_for_inference, started once per process; `.ready` once it has finished."""
+    from src.inference.warmup import Warmup
+
+    return Warmup(model_server(root), model_names).start()
+
+
+@st.cache_resource(show_spinner=False)
+def tracing_setup(root: str):
+    """
+    Process-wide tracer (src.tracing) configured from the `tracing` section of configs/app.yaml:
+    the trace log path is resolved against the project root, and /metrics is served if a port is set.
+    """
+    from src.app.utils import load_app_config
+    from src.tracing import tracer
+
+    settings = dict(load_app_config().get("tracing") or {})
+    if settings.get("log") and not Path(settings["log"]).is_absolute():
+        settings["log"] = str(Path(root) / settings["log"])
+    return tracer.configure(settings)
+
+
+def served_version(model_name: str, root: str, key: Optional[str] = None) -> Optional[dict]:
+    """{"version", "role", "shadow"} serving the request keyed by `key` (the upload digest); None if not trained yet."""
+    return model_server(root).route(model_name, key)
+
+
+def cached_model(model_name: str, root: str, version: Optional[str] = None):
+    """Loaded model (the served production version by default); None if not trained yet."""
+    if version is None:
+        routed = served_version(model_name, root)
+        if routed is None:
+            return None
+        version = routed["version"]
+    return model_server(root).entry(model_name, version)["model"]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_batch(digest: str, _image_bytes: bytes, size: tuple) -> np.ndarray:
+    """Decoded, resized and normalized (1, H, W, 3) batch for one input size."""
+    return load_image_from_bytes(_image_bytes, target_size=size, normalize=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_display_image(digest: str, _image_bytes: bytes) -> bytes:
+    """Bytes safe for st.image and the LLM: JPEG/PNG pass through, DICOM is windowed and encoded to PNG."""
+    from src.data.dicom import is_dicom
+
+    if not is_dicom(_image_bytes):
+        return _image_bytes
+    return to_png(scan_rgb(_image_bytes))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_forward(digest: str, _image_bytes: bytes, model_name: str, root: str, version: str) -> dict:
+    """
+    The single forward pass of one model version, shared by classification, similar cases and Grad-CAM:
+    {"probs" (1, C), "embedding" (1, D), "gradcam" (1, H, W), "version"}.
+    """
+    from src.inference.heads import run_heads
+
+    entry = model_server(root).entry(model_name, version)
+    batch = cached_batch(digest, _image_bytes, entry["input_size"])
+    if entry["heads"] is not None:
+        forward = run_heads(entry["heads"], batch)
+    elif entry["backend"] in ("onnx", "pool"):
+        forward = entry["model"].forward(batch)  # probabilities and embedding; no Grad-CAM
+    else:
+        forward = {"probs": np.asarray(entry["model"](batch, training=False)), "embedding": None, "gradcam": None}
+    return {**forward, "version": version}
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_shadow_run(digest: str, _image_bytes: bytes, model_name: str, root: str, version: str, shadow: str) -> None:
+    """Run the shadow version on the upload's batch in the background, once per upload (see record_shadow)."""
+    forward = cached_forward(digest, _image_bytes, model_name, root, version)
+    batch = cached_batch(digest, _image_bytes, model_server(root).entry(model_name, version)["input_size"])
+    model_server(root).record_shadow(model_name, digest, version, forward["probs"], shadow, batch)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_prediction(
+    digest: str,
+    _image_bytes: bytes,
+    model_name: str,
+    class_names: tuple,
+    root: str,
+    version: str,
+    tta: Optional[dict] = None,
+) -> dict:
+    """{"label", "confidence", "probs", "tta", "version"} of one model version, from cached_forward."""
+    from src.inference.tta import predict_with_tta
+
+    forward = cached_forward(digest, _image_bytes, model_name, root, version)
+    probs, used = forward["probs"], [False]
+    if tta and tta.get("enabled"):
+        entry = model_server(root).entry(model_name, version)
+        batch = cached_batch(digest, _image_bytes, entry["input_size"])
+        probs, used = predict_with_tta(entry["model"], batch, tta, probs=probs)
+    idx = int(np.argmax(probs[0]))
+    return {
+        "label": class_names[idx] if class_names else str(idx),
+        "confidence": float(probs[0][idx]),
+        "probs": probs[0],
+        "tta": bool(used[0]),
+        "version": version,
+    }
+
+
+def cached_predictions(
+    digest: str,
+    _image_bytes: bytes,
+    model_names: tuple,
+    class_names: tuple,
+    root: str,
+    tta: Optional[dict] = None,
+) -> dict:
+    """
+    {model_name: {"label", "confidence", "probs", "tta", "version", "role"}} for every available model.
+    Each model's version is routed per upload (production or A/B candidate), so a hot-swapped version
+    gets fresh cache entries. With tta enabled, a model whose confidence is below tta.threshold is
+    re-scored with test-time augmentation ("tta": True in its entry). A shadow candidate routed to the
+    upload runs in the background on the same batch.
+    """
+    results = {}
+    for model_name in model_names:
+        routed = served_version(model_name, root, digest)
+        if routed is None:
+            continue
+        prediction = cached_prediction(digest, _image_bytes, model_name, class_names, root, routed["version"], tta=tta)
+        if routed["shadow"]:
+            cached_shadow_run(digest, _image_bytes, model_name, root, routed["version"], routed["shadow"])
+        results[model_name] = {**prediction, "role": routed["role"]}
+    return results
+
+
+@st.cache_resource(show_spinner=False)
+def cached_index(model_name: str, root: str):
+    """Similar-cases index for a model, loaded once per process (None until scripts/build_embedding_index.py has run)."""
+    from src.inference.retrieval import load_index
+
+    return load_index(model_name, Path(root))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_similar_cases(
+    digest: str, _image_bytes: bytes, model_name: str, root: str, version: str, k: int = 4, nprobe: int = 8
+) -> list:
+    """
+    Top-k archived scans most similar to the upload: [{"path", "label", "score", "id", "thumbnail"}].
+    version: the model version that served the upload. Empty when the model or its index is missing.
+    """
+    from src.inference.retrieval import thumbnail
+
+    index = cached_index(model_name, root)
+    forward = cached_forward(digest, _image_bytes, model_name, root, version)
+    if index is None or forward["embedding"] is None:
+        return []
+    cases = index.search(forward["embedding"][0], k=k, nprobe=nprobe)
+    return [{**case, "thumbnail": thumbnail(case["path"])} for case in cases]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_saliency(digest: str, _image_bytes: bytes, model_name: str, root: str, version: str) -> Optional[np.ndarray]:
+    """(H, W) Grad-CAM map of one model version (from cached_forward), or None if the model has no conv feature map."""
+    gradcam = cached_forward(digest, _image_bytes, model_name, root, version)["gradcam"]
+    return None if gradcam is None else gradcam[0]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_saliency_png(
+    digest: str, _image_bytes: bytes, model_name: str, root: str, version: str, alpha: float = 0.6
+) -> Optional[bytes]:
+    """Grad-CAM overlay (NumPy LUT colormap blended over the scan) encoded once to PNG bytes."""
+    saliency = cached_saliency(digest, _image_bytes, model_name, root, version)
+    if saliency is None:
+        return None
+    return saliency_overlay_png(_image_bytes, saliency, alpha=alpha)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_probability_spec(digest: str, labels_display: tuple, probs: tuple, highlight_idx: int) -> dict:
+    """Vega-Lite spec for the class-probability bar chart."""
+    return probability_chart_spec(list(labels_display), list(probs), highlight_idx)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_export_html(
+    digest: str,
+    primary_label: str,
+    primary_conf: float,
+    findings_rows: tuple,
+    steps: tuple,
+    ai_content: str,
+) -> str:
+    """Downloadable HTML report; rebuilt only when the scan or the AI content changes."""
+    with span("export", artifact="html"):
+        return build_export_html(
+            primary_label=primary_label,
+            primary_conf=primary_conf,
+            findings_rows=list(findings_rows),
+            steps=list(steps),
+            ai_content=ai_content,
+        )
+
+
+STUDY_CACHE_ENTRIES = 8
+
+
+@st.cache_resource(show_spinner=False)
+def _study_cache() -> tuple[OrderedDict, threading.Lock]:
+    return OrderedDict(), threading.Lock()
+
+
+def study_results(
+    digest: str,
+    files: list[tuple[str, bytes]],
+    model_names: tuple,
+    class_names: tuple,
+    root: str,
+    batch_size: int = 16,
+    top_k: int = 3,
+    decode_workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Study-level results for a multi-slice upload (files may include ZIP archives), cached by digest.
+    Slices are decoded once in a thread pool, each model runs batched inference, and the first
+    available model's top-k most suspicious slices get Grad-CAM overlays.
+    on_progress(done, total) counts slice predictions across all models.
+    Each model runs the version routed to this upload; the cache is keyed by those versions.
+    Returns {"slice_names", "models": {name: {**aggregate_study(...), "version"}}, "saliency_pngs": {slice_idx: png}};
+    slice_names is empty (and models too) when the upload holds no readable slices.
+    """
+    routed = {name: served_version(name, root, digest) for name in model_names}
+    versions = {name: r["version"] for name, r in routed.items() if r is not None}
+    cache, lock = _study_cache()
+    key = (digest, tuple(versions.items()), class_names, batch_size, top_k)
+    with lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+    from src.inference.heads import run_heads
+
+    slices = expand_uploads(files)
+    if not slices:  # e.g. a ZIP of non-image files only
+        return {"slice_names": [], "models": {}, "saliency_pngs": {}}
+    names = [name for name, _ in slices]
+    entries = {name: model_server(root).entry(name, version) for name, version in versions.items()}
+    sizes = {name: entry["input_size"] for name, entry in entries.items()}
+    with span("decode", slices=len(slices)):
+        decoded = decode_slices(slices, sizes.values(), max_workers=decode_workers)
+
+    total = len(slices) * len(entries)
+    per_model = {}
+    for i, (name, entry) in enumerate(entries.items()):
+        offset = i * len(slices)
+        callback = (lambda done, _, offset=offset: on_progress(offset + done, total)) if on_progress else None
+        probs = predict_study(entry["model"], decoded[sizes[name]], batch_size=batch_size, on_batch=callback)
+        per_model[name] = {**aggregate_study(probs, list(class_names), names, top_k=top_k), "version": versions[name]}
+
+    saliency_pngs = {}
+    heads = entries[next(iter(per_model))]["heads"] if per_model else None
+    if heads is not None:
+        first = next(iter(per_model))
+        top_k = list(per_model[first]["top_k"])
+        # Grad-CAM for all top-k slices in one batched pass
+        cams = run_heads(heads, decoded[sizes[first]][top_k])["gradcam"] if top_k else []
+        for idx, cam in zip(top_k, cams):
+            scan = decoded[sizes[first]][idx] * 255.0
+            saliency_pngs[idx] = to_png(blend_saliency(scan, cam))
+
+    result = {"slice_names": names, "models": per_model, "saliency_pngs": saliency_pngs}
+    with lock:
+        cache[key] = result
+        while len(cache) > STUDY_CACHE_ENTRIES:
+            cache.popitem(last=False)
+    return result
@@ -10,14 +10,15 @@ if str(ROOT) not in sys.path:
 
 from src.app.utils import get_class_names, project_root
 from src.app.components.apple_ui import inject_apple_css, hero, card_header, apple_card_markdown
-from src.inference.predict import predict_from_bytes, get_model_path
+from src.app.compute import upload_digest, uploads_digest, cached_display_image, cached_predictions, study_results
+from src.inference.predict import get_model_path
 
 st.set_page_config(page_title="Model Comparison", page_icon="📊", layout="wide", initial_sidebar_state="expanded")
 inject_apple_css()
 
 hero(
     "Model Comparison",
-    "Upload one Brain MRI scan to compare predictions from Custom CNN, Xception, and Transfer model side-by-side.",
+    "Upload a Brain MRI scan (or several slices / a ZIP) to compare predictions from Custom CNN, Xception, and Transfer model side-by-side.",
     badge="Compare models",
 )
 
@@ -26,22 +27,55 @@ model_names = ["custom_cnn", "xception", "transfer"]
 model_labels = ["Custom CNN", "Xception", "Transfer model"]
 root = project_root()
 
-uploaded = st.file_uploader("Upload one Brain MRI scan", type=["jpg", "jpeg", "png"], label_visibility="collapsed")
-if uploaded:
-    image_bytes = uploaded.read()
+uploaded = st.file_uploader(
+    "Upload a Brain MRI scan, several slices, or a ZIP",
+    type=["jpg", "jpeg", "png", "dcm", "zip"],
+    accept_multiple_files=True,
+    label_visibility="collapsed",
+)
+if uploaded and (len(uploaded) > 1 or uploaded[0].name.lower().endswith(".zip")):
+    study_key, files = uploads_digest(uploaded)
+    progress = st.progress(0.0, text="Analysing slices…")
+    study = study_results(
+        study_key,
+        files,
+        tuple(model_names),
+        tuple(class_names),
+        str(root),
+        on_progress=lambda done, total: progress.progress(done / max(total, 1), text=f"Analysed {done}/{total} slice predictions"),
+    )
+    progress.empty()
+    st.caption(f"{len(study['slice_names'])} slices · study-level max / mean pooling")
+    cols = st.columns(3)
+    for col, name, label in zip(cols, model_names, model_labels):
+        with col:
+            apple_card_markdown(f"<p style='margin:0 0 0.5rem 0; font-weight:600; color:#1d1d1f;'>{label}</p>")
+            agg = study["models"].get(name)
+            if agg is None:
+                st.caption("Model not found. Train and save first.")
+                continue
+            st.markdown(
+                f'<span class="apple-pill"><strong>{agg["max_label"]}</strong> (max) · {agg["mean_label"]} (mean)</span>',
+                unsafe_allow_html=True,
+            )
+            st.bar_chart(dict(zip(class_names, agg["mean_probs"])))
+elif uploaded:
+    digest, image_bytes = upload_digest(uploaded[0])
+    results = cached_predictions(digest, image_bytes, tuple(model_names), tuple(class_names), str(root))
     cols = st.columns(3)
     for col, name, label in zip(cols, model_names, model_labels):
         with col:
             apple_card_markdown(f"<p style='margin:0 0 0.5rem 0; font-weight:600; color:#1d1d1f;'>{label}</p>")
-            st.image(image_bytes, use_container_width=True)
+            st.image(cached_display_image(digest, image_bytes), use_container_width=True)
             path = get_model_path(name, root)
             if path is None:
                 st.caption("Model not found. Train and save first.")
             else:
-                pred_label, confidence, probs = predict_from_bytes(name, image_bytes, class_names, root)
-                if pred_label is not None:
+                result = results.get(name)
+                if result is not None:
+                    probs = result["probs"]
                     st.markdown(
-                        f'<span class="apple-pill"><strong>{pred_label}</strong> · {confidence:.0%}</span>',
+                        f'<span class="apple-pill"><strong>{result["label"]}</strong> · {result["confidence"]:.0%}</span>',
                         unsafe_allow_html=True,
                     )
                     if probs is not None and len(probs) == len(class_names):
@@ -50,6 +84,6 @@ if uploaded:
                     st.caption("Prediction failed.")
 else:
     st.markdown(
-        '<p class="apple-caption" style="text-align:center;">Upload a brain MRI image to compare all three models.</p>',
+        '<p class="apple-caption" style="text-align:center;">Upload a brain MRI image (or a study) to compare all three models.</p>',
         unsafe_allow_html=True,
     )
\ No newline at end of file
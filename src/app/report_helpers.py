@@ -1,4 +1,5 @@
-"""Report logic for healthtech dashboard: status from prediction, recommended next steps."""
+"""Report logic for healthtech dashboard: status from prediction, recommended next steps, HTML export."""
+from datetime import datetime
 from typing import Any
 
 # Display labels for classes
@@ -93,3 +94,59 @@ def build_findings_rows(
         agree = "Yes" if len(set(labels)) == 1 else "No — review models"
         rows.append(("Model agreement", agree, "normal" if agree == "Yes" else "review"))
     return rows
+
+
+def escape_html(s: str) -> str:
+    return (s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") if s else "")
+
+
+def build_export_html(
+    primary_label: str,
+    primary_conf: float,
+    findings_rows: list[tuple[str, str, str]],
+    steps: list[str],
+    ai_content: str,
+) -> str:
+    """Build a self-contained HTML report for download (print to PDF)."""
+    rows_html = "".join(
+        f"<tr><td>{l}</td><td>{v}</td><td>{s}</td></tr>" for l, v, s in findings_rows
+    )
+    steps_html = "".join(f"<li>{escape_html(s)}</li>" for s in steps)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>Brain MRI Report</title>
+  <style>
+    body {{ font-family: system-ui, sans-serif; max-width: 700px; margin: 2rem auto; padding: 1rem; color: #1e293b; }}
+    h1 {{ font-size: 1.5rem; }}
+    .meta {{ color: #64748b; font-size: 0.9rem; margin-bottom: 1.5rem; }}
+    table {{ width: 100%; border-collapse: collapse; margin: 1rem 0; }}
+    th, td {{ padding: 0.5rem; text-align: left; border-bottom: 1px solid #e2e8f0; }}
+    th {{ font-weight: 600; color: #475569; }}
+    .section {{ margin-top: 1.5rem; }}
+    .section h2 {{ font-size: 1.1rem; margin-bottom: 0.5rem; }}
+    ul {{ padding-left: 1.25rem; }}
+    .ai-content {{ white-space: pre-wrap; background: #f8fafc; padding: 1rem; border-radius: 8px; margin-top: 0.5rem; }}
+  </style>
+</head>
+<body>
+  <h1>Brain MRI — Classification Report</h1>
+  <p class="meta">Generated {datetime.now().strftime('%B %d, %Y at %H:%M')}. AI-assisted; not a substitute for clinical judgment.</p>
+  <div class="section">
+    <h2>Findings</h2>
+    <table>
+      <thead><tr><th>Metric</th><th>Value</th><th>Status</th></tr></thead>
+      <tbody>{rows_html}</tbody>
+    </table>
+  </div>
+  <div class="section">
+    <h2>Recommended next steps</h2>
+    <ul>{steps_html}</ul>
+  </div>
+  <div class="section">
+    <h2>AI insights</h2>
+    <div class="ai-content">{escape_html(ai_content or "— Not generated —")}</div>
+  </div>
+</body>
+</html>"""
\ No newline at end of file
@@ -4,6 +4,7 @@ Upload Brain MRI → structured findings, saliency, similar cases, AI insights,
 Run from project root: streamlit run src/app/streamlit_app.py
 """
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -30,17 +31,32 @@ from src.app.components.apple_ui import (
     findings_card_html,
     recommendations_card_html,
     similar_cases_card_html,
+    similar_case_tiles_html,
 )
 from src.app.report_helpers import (
     build_findings_rows,
     recommended_next_steps,
     CLASS_DISPLAY,
 )
-
-import numpy as np
-from src.inference.predict import predict_from_bytes, load_model, MODEL_INPUT_SIZES
-from src.inference.saliency import generate_saliency_map
-from src.data.dataset import load_image_from_bytes
+from src.app.compute import (
+    upload_digest,
+    uploads_digest,
+    cached_display_image,
+    study_results,
+    session_artifacts,
+    cached_predictions,
+    cached_similar_cases,
+    served_version,
+    service_warmup,
+    tracing_setup,
+    cached_saliency_png,
+    cached_probability_spec,
+    cached_export_html,
+)
+from src.app.study_view import render_study_report
+from src.data.study import is_study
+from src.app.trace_panel import render_trace_panel
+from src.llm.orchestrator import AISectionRunner, build_ai_jobs
 
 st.set_page_config(
     page_title="Brain Tumor MRI — Clinical Report",
@@ -53,8 +69,21 @@ app_config = load_app_config()
 class_names = get_class_names()
 models_for_inference = app_config.get("models_for_inference", ["custom_cnn", "xception", "transfer"])
 llm_config = app_config.get("llm", {})
+retrieval_config = app_config.get("retrieval", {})
 providers = llm_config.get("providers", [{"id": "gemini", "name": "Google Gemini 1.5 Flash", "model_id": "gemini-1.5-flash"}])
 
+# Models load and warm up in the background from the first page view; inference waits for readiness
+warmup = service_warmup(str(project_root()), tuple(models_for_inference))
+tracer = tracing_setup(str(project_root()))
+
+
+def finish_request(request):
+    """End this run's trace (histograms, /traces, JSONL log) and show it in the sidebar debug panel if enabled."""
+    tracer.end_trace(request)
+    if request is not None and tracer.settings["debug_panel"]:
+        render_trace_panel(request, tracer.snapshot())
+
+
 if "dark_mode" not in st.session_state:
     st.session_state.dark_mode = False
 
@@ -81,44 +110,94 @@ with st.sidebar:
         label_visibility="collapsed",
     )
     llm_model_id = next((p.get("model_id") for p in providers if p["id"] == llm_provider), None)
+    st.markdown("---")
+    if warmup.ready:
+        st.caption(f"Models ready (warm-up {warmup.seconds:.1f}s)")
+    else:
+        st.caption("Models warming up…")
 
 inject_apple_css(dark=st.session_state.dark_mode)
 
 # ——— Landing: no image ———
 if "upload_key" not in st.session_state:
     st.session_state.upload_key = 0
+if "ai_runner" not in st.session_state:
+    st.session_state.ai_runner = AISectionRunner()
 uploaded = st.file_uploader(
-    "Upload a Brain MRI scan (JPEG or PNG)",
-    type=["jpg", "jpeg", "png"],
+    "Upload a Brain MRI scan (JPEG or PNG), several slices, or a ZIP of a study",
+    type=["jpg", "jpeg", "png", "dcm", "zip"],
+    accept_multiple_files=True,
     label_visibility="collapsed",
     key=f"mri_upload_{st.session_state.upload_key}",
 )
 
 if not uploaded:
+    st.session_state.ai_runner.cancel()
     hero(
         "Brain Tumor MRI",
         "AI-driven classification and explainability for brain MRI. Upload a scan to open the clinical report dashboard.",
         badge="AI-Powered HealthTech",
     )
     st.markdown(
-        '<p class="apple-caption" style="text-align:center;">Drag and drop or click to upload a brain MRI image.</p>',
+        '<p class="apple-caption" style="text-align:center;">Drag and drop or click to upload a brain MRI image, several slices, or a ZIP.</p>',
         unsafe_allow_html=True,
     )
     st.stop()
 
+# One trace per rerun with an upload: stage spans below (and in src/app/compute.py, src/inference) attach to it
+# Several files, a ZIP or a multi-frame DICOM (e.g. an enhanced-MR series) open the study view
+study_upload = is_study((f.name, f.getvalue()) for f in uploaded)
+request = tracer.start_trace("study" if study_upload else "report")
+
+if not warmup.ready:
+    with st.spinner("Loading and warming up models…"), tracer.span("warmup.wait"):
+        warmup.wait()
+
+# ——— Study view (several slices or a ZIP) ———
+if study_upload:
+    st.session_state.ai_runner.cancel()
+    study_key, files = uploads_digest(uploaded)
+    study_cfg = app_config.get("study", {})
+    report_topbar(title="MRI Study Report", show_search=True)
+    if st.button("New study", help="Upload a different study"):
+        st.session_state.upload_key = st.session_state.get("upload_key", 0) + 1
+        st.rerun()
+    progress = st.progress(0.0, text="Analysing slices…")
+    study = study_results(
+        study_key,
+        files,
+        tuple(models_for_inference),
+        tuple(class_names),
+        str(project_root()),
+        batch_size=study_cfg.get("batch_size", 16),
+        top_k=study_cfg.get("top_k", 3),
+        decode_workers=study_cfg.get("decode_workers"),
+        on_progress=lambda done, total: progress.progress(done / max(total, 1), text=f"Analysed {done}/{total} slice predictions"),
+    )
+    progress.empty()
+    with tracer.span("render"):
+        render_study_report(study, class_names)
+    finish_request(request)
+    st.stop()
+
 # ——— Report view (image uploaded) ———
-image_bytes = uploaded.read()
+uploaded = uploaded[0]
+scan_key, image_bytes = upload_digest(uploaded)
 root = project_root()
+# A different upload supersedes any AI generation still running for the previous scan
+st.session_state.ai_runner.cancel(scan_key=scan_key)
+artifacts = session_artifacts(scan_key)
+display_bytes = cached_display_image(scan_key, image_bytes)  # DICOM rendered to PNG for display / LLM
 
-# Run inference
-results = {}
-for model_name in models_for_inference:
-    label, conf, probs = predict_from_bytes(model_name, image_bytes, class_names, root)
-    if label is not None:
-        results[model_name] = {"label": label, "confidence": conf, "probs": probs}
+# Run inference (cached by upload digest: reruns from widget interactions reuse the results)
+with tracer.span("predictions"):
+    results = cached_predictions(
+        scan_key, image_bytes, tuple(models_for_inference), tuple(class_names), str(root), tta=app_config.get("tta"),
+    )
 
 if not results:
     st.info("Train models and save them to `models/saved/` to see the report. See README for training commands.")
+    finish_request(request)
     st.stop()
 
 first_model = list(results.keys())[0]
@@ -145,47 +224,34 @@ report_patient_card(
 # ——— MRI Findings card (structured, with status pills) ———
 findings_rows = build_findings_rows(primary_label, primary_conf, results, class_names)
 st.markdown(findings_card_html("MRI findings", findings_rows), unsafe_allow_html=True)
+if results[first_model].get("tta"):
+    st.caption("Low-confidence scan: prediction averaged over test-time augmented views (flips, rotations, crops).")
+if results[first_model].get("role") == "candidate":
+    st.caption(f"Served by candidate version **{results[first_model]['version']}** of {first_model} (A/B test).")
 
 # ——— Two columns: Image + Saliency | Similar cases ———
 col_left, col_right = st.columns([1, 1])
 with col_left:
     apple_card_markdown('<p style="margin:0; font-size:0.95rem; color:#6e6e73;">Scan</p>')
-    st.image(image_bytes, use_container_width=True)
+    st.image(display_bytes, use_container_width=True)
     # Saliency
-    size = MODEL_INPUT_SIZES.get(first_model, (224, 224))
-    batch = load_image_from_bytes(image_bytes, target_size=size, normalize=True)
-    model = load_model(first_model, root)
-    if model is not None:
-        try:
-            saliency = generate_saliency_map(model, batch)
+    try:
+        with tracer.span("saliency_png", model=first_model):
+            saliency_png = cached_saliency_png(scan_key, image_bytes, first_model, str(root), results[first_model]["version"])
+        if saliency_png is not None:
             card_header("Saliency map")
-            st.caption(f"Regions that influenced **{first_model}** prediction.")
-            import matplotlib.pyplot as plt
-            fig, ax = plt.subplots(1, 1, figsize=(4, 4))
-            ax.imshow(saliency, cmap="jet")
-            ax.axis("off")
-            fig.patch.set_facecolor("#f5f5f7")
-            ax.set_facecolor("#f5f5f7")
-            st.pyplot(fig)
-            plt.close(fig)
-        except Exception as e:
-            st.caption(f"Saliency unavailable: {e}")
+            st.caption(f"Grad-CAM: regions that influenced **{first_model}** prediction, overlaid on the scan.")
+            st.image(saliency_png, use_container_width=True)
+    except Exception as e:
+        st.caption(f"Saliency unavailable: {e}")
 
 with col_right:
     # Classification distribution (similar-cases style: how this scan compares)
     if probs is not None and len(probs) == len(class_names):
-        import matplotlib.pyplot as plt
-        labels_display = [CLASS_DISPLAY.get(c, c) for c in class_names]
-        vals = [float(probs[i]) for i in range(len(class_names))]
-        fig, ax = plt.subplots(figsize=(5, 3))
-        colors = ["#0d9488" if class_names[i] == primary_label else "#cbd5e1" for i in range(len(class_names))]
-        ax.barh(labels_display, vals, color=colors)
-        ax.set_xlim(0, 1)
-        ax.set_xlabel("Probability")
-        ax.set_facecolor("#fafbfc")
-        fig.patch.set_facecolor("#fafbfc")
-        st.pyplot(fig)
-        plt.close(fig)
+        labels_display = tuple(CLASS_DISPLAY.get(c, c) for c in class_names)
+        vals = tuple(float(probs[i]) for i in range(len(class_names)))
+        highlight = class_names.index(primary_label) if primary_label in class_names else -1
+        st.vega_lite_chart(cached_probability_spec(scan_key, labels_display, vals, highlight), use_container_width=True)
     st.markdown(
         similar_cases_card_html(
             "Classification distribution",
@@ -193,6 +259,27 @@ with col_right:
         ),
         unsafe_allow_html=True,
     )
+    # Nearest archived scans by embedding (index built by scripts/build_embedding_index.py)
+    retrieval_model = retrieval_config.get("model") or first_model
+    try:
+        retrieval_version = (results.get(retrieval_model) or served_version(retrieval_model, str(root), scan_key) or {}).get("version")
+        with tracer.span("similar_cases", model=retrieval_model):
+            similar = [] if retrieval_version is None else cached_similar_cases(
+                scan_key,
+                image_bytes,
+                retrieval_model,
+                str(root),
+                retrieval_version,
+                k=int(retrieval_config.get("top_k", 4)),
+                nprobe=int(retrieval_config.get("nprobe", 8)),
+            )
+    except Exception as e:
+        similar = []
+        st.caption(f"Similar cases unavailable: {e}")
+    if similar:
+        cases = [{**c, "label": CLASS_DISPLAY.get(c["label"], c["label"])} for c in similar]
+        st.markdown(similar_cases_card_html("Similar cases", similar_case_tiles_html(cases)), unsafe_allow_html=True)
+        st.caption(f"Most similar archived scans by **{retrieval_model}** embedding (cosine similarity).")
 
 # ——— Recommended next steps ———
 steps = recommended_next_steps(primary_label, primary_conf)
@@ -202,43 +289,73 @@ st.markdown(recommendations_card_html("Recommended next steps", steps), unsafe_a
 st.markdown('<div class="apple-divider"></div>', unsafe_allow_html=True)
 card_header("AI insights & report")
 st.caption("Generate explanation or full clinical-style report (requires GOOGLE_API_KEY in .env).")
-col_btn1, col_btn2, _ = st.columns([1, 1, 2])
+col_btn1, col_btn2, col_btn3, _ = st.columns([1, 1, 1, 1])
 with col_btn1:
     gen_expl = st.button("Generate explanation")
 with col_btn2:
     gen_report = st.button("Generate full report")
+with col_btn3:
+    gen_all = st.button("Generate all", help="Explanation and report in parallel")
 
-ai_content = ""
-if gen_expl:
-    try:
-        from src.llm.explanations import explain_image
-        pred_summary = "; ".join([f"{k}: {v['label']} ({v['confidence']:.0%})" for k, v in results.items()])
-        with st.spinner("Generating explanation…"):
-            ai_content = explain_image(image_bytes, pred_summary, provider=llm_provider, model_id=llm_model_id) or ""
-        st.markdown("---")
-        st.markdown(ai_content or "*No response.*")
-    except Exception as e:
-        st.error(f"Explanation failed (set GOOGLE_API_KEY in .env): {e}")
-if gen_report:
+# Generated AI text is kept per session for the current scan, so it survives reruns
+ai_outputs = artifacts.setdefault("ai_outputs", {})
+if gen_expl or gen_report or gen_all:
+    jobs = build_ai_jobs(
+        results,
+        primary_label,
+        primary_conf,
+        include_explanation=gen_expl or gen_all,
+        include_report=gen_report or gen_all,
+        per_model=gen_all and llm_config.get("per_model_explanations", False),
+        similar_cases=similar,
+    )
+    runner = st.session_state.ai_runner
     try:
-        from src.llm.report import build_report
-        with st.spinner("Generating report…"):
-            report = build_report(image_bytes, primary_label, primary_conf, provider=llm_provider, model_id=llm_model_id)
-        ai_content = report or ""
-        st.markdown("---")
-        st.markdown(ai_content or "*No response.*")
+        future = runner.submit(
+            scan_key,
+            display_bytes,
+            jobs,
+            provider=llm_provider,
+            model_id=llm_model_id,
+            max_concurrency=llm_config.get("max_concurrency", 3),
+            timeout=float(llm_config.get("request_timeout_s", 60)),
+        )
+        status = st.empty()
+        # Poll instead of blocking so Streamlit can interrupt this run (e.g. on a new upload)
+        # (LLM calls run in the runner's threads: their "llm" spans reach the histograms, this wait is on the trace)
+        with tracer.span("ai_sections", jobs=len(jobs)):
+            while not future.done():
+                status.caption(f"Generating… {len(runner.completed)}/{len(jobs)} done")
+                time.sleep(0.2)
+        status.empty()
+        for key, out in future.result().items():
+            title = key.replace("explanation:", "Explanation — ").capitalize()
+            if out["error"]:
+                st.error(f"{title} failed (set GOOGLE_API_KEY in .env): {out['error']}")
+            else:
+                ai_outputs[key] = (title, out["text"])
     except Exception as e:
-        st.error(f"Report failed (set GOOGLE_API_KEY in .env): {e}")
+        st.error(f"AI generation failed (set GOOGLE_API_KEY in .env): {e}")
+
+ai_content = ""
+if ai_outputs:
+    st.markdown("---")
+    for title, text in ai_outputs.values():
+        if len(ai_outputs) > 1:
+            st.markdown(f"**{title}**")
+        st.markdown(text or "*No response.*")
+    ai_content = "\n\n".join(text for _, text in ai_outputs.values())
 
 # ——— Export report (HTML for download / print to PDF) ———
 st.markdown("---")
 card_header("Export report")
-export_html = _build_export_html(
-    primary_label=primary_label,
-    primary_conf=primary_conf,
-    findings_rows=findings_rows,
-    steps=steps,
-    ai_content=ai_content,
+export_html = cached_export_html(
+    scan_key,
+    primary_label,
+    primary_conf,
+    tuple(findings_rows),
+    tuple(steps),
+    ai_content,
 )
 st.download_button(
     label="Download report (HTML)",
@@ -248,58 +365,4 @@ st.download_button(
 )
 st.caption("Open in browser and use Print → Save as PDF for a PDF copy.")
 
-
-def _escape_html(s: str) -> str:
-    return (s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") if s else "")
-
-
-def _build_export_html(
-    primary_label: str,
-    primary_conf: float,
-    findings_rows: list[tuple[str, str, str]],
-    steps: list[str],
-    ai_content: str,
-) -> str:
-    """Build a self-contained HTML report for download (print to PDF)."""
-    rows_html = "".join(
-        f"<tr><td>{l}</td><td>{v}</td><td>{s}</td></tr>" for l, v, s in findings_rows
-    )
-    steps_html = "".join(f"<li>{_escape_html(s)}</li>" for s in steps)
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8">
-  <title>Brain MRI Report</title>
-  <style>
-    body {{ font-family: system-ui, sans-serif; max-width: 700px; margin: 2rem auto; padding: 1rem; color: #1e293b; }}
-    h1 {{ font-size: 1.5rem; }}
-    .meta {{ color: #64748b; font-size: 0.9rem; margin-bottom: 1.5rem; }}
-    table {{ width: 100%; border-collapse: collapse; margin: 1rem 0; }}
-    th, td {{ padding: 0.5rem; text-align: left; border-bottom: 1px solid #e2e8f0; }}
-    th {{ font-weight: 600; color: #475569; }}
-    .section {{ margin-top: 1.5rem; }}
-    .section h2 {{ font-size: 1.1rem; margin-bottom: 0.5rem; }}
-    ul {{ padding-left: 1.25rem; }}
-    .ai-content {{ white-space: pre-wrap; background: #f8fafc; padding: 1rem; border-radius: 8px; margin-top: 0.5rem; }}
-  </style>
-</head>
-<body>
-  <h1>Brain MRI — Classification Report</h1>
-  <p class="meta">Generated {datetime.now().strftime('%B %d, %Y at %H:%M')}. AI-assisted; not a substitute for clinical judgment.</p>
-  <div class="section">
-    <h2>Findings</h2>
-    <table>
-      <thead><tr><th>Metric</th><th>Value</th><th>Status</th></tr></thead>
-      <tbody>{rows_html}</tbody>
-    </table>
-  </div>
-  <div class="section">
-    <h2>Recommended next steps</h2>
-    <ul>{steps_html}</ul>
-  </div>
-  <div class="section">
-    <h2>AI insights</h2>
-    <div class="ai-content">{_escape_html(ai_content or "— Not generated —")}</div>
-  </div>
-</body>
-</html>"""
\ No newline at end of file
+finish_request(request)
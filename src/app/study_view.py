@@ -0,0 +1,62 @@
+"""Study (multi-slice / ZIP) report view for the dashboard."""
+import streamlit as st
+
+from src.app.components.apple_ui import card_header, findings_card_html, recommendations_card_html
+from src.app.report_helpers import CLASS_DISPLAY, recommended_next_steps, status_from_prediction
+
+
+def _display(label: str) -> str:
+    return CLASS_DISPLAY.get(label, label)
+
+
+def render_study_report(study: dict, class_names: list):
+    """Render study-level findings, per-slice probabilities and the most suspicious slices."""
+    per_model = study["models"]
+    names = study["slice_names"]
+    if not names:
+        st.warning("No readable slices in this upload (supported: JPEG, PNG, DICOM, or a ZIP of them).")
+        return
+    if not per_model:
+        st.info("Train models and save them to `models/saved/` to see the report. See README for training commands.")
+        return
+
+    first = next(iter(per_model))
+    primary = per_model[first]
+    top_conf = float(primary["max_probs"][class_names.index(primary["max_label"])])
+
+    rows = [("Slices analysed", str(len(names)), "normal")]
+    for name, agg in per_model.items():
+        conf = float(agg["max_probs"][class_names.index(agg["max_label"])])
+        rows.append((
+            name,
+            f"{_display(agg['max_label'])} (max) · {_display(agg['mean_label'])} (mean)",
+            status_from_prediction(agg["max_label"], conf),
+        ))
+    if len(per_model) > 1:
+        agree = len({agg["max_label"] for agg in per_model.values()}) == 1
+        rows.append(("Model agreement", "Yes" if agree else "No — review models", "normal" if agree else "review"))
+    st.markdown(findings_card_html("Study findings", rows), unsafe_allow_html=True)
+
+    # Most suspicious slices with saliency overlays (first model)
+    if primary["top_k"]:
+        card_header("Most suspicious slices")
+        st.caption(f"Ranked by **{first}** tumor probability; saliency overlaid on each slice.")
+        cols = st.columns(len(primary["top_k"]))
+        for col, idx in zip(cols, primary["top_k"]):
+            with col:
+                png = study["saliency_pngs"].get(idx)
+                caption = f"{names[idx].rsplit('/', 1)[-1]} · {primary['suspicion'][idx]:.0%}"
+                if png is not None:
+                    st.image(png, caption=caption, use_container_width=True)
+                else:
+                    st.caption(caption)
+
+    # Per-slice probabilities
+    card_header("Per-slice probabilities")
+    table = {"slice": [n.rsplit("/", 1)[-1] for n in names], "prediction": [_display(l) for l in primary["labels"]]}
+    for j, c in enumerate(class_names):
+        table[_display(c)] = [round(float(p), 4) for p in primary["probs"][:, j]]
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    steps = recommended_next_steps(primary["max_label"], top_conf)
+    st.markdown(recommendations_card_html("Recommended next steps", steps), unsafe_allow_html=True)
@@ -0,0 +1,26 @@
+"""Sidebar debug panel: latency breakdown of the last request and per-stage p50 / p95 (src.tracing)."""
+import streamlit as st
+
+
+def render_trace_panel(trace: dict, snapshot: dict):
+    """Render one finished trace's spans (slowest first) and the process-wide stage percentiles."""
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown(f"**Latency** — {trace['name']} {trace['total_ms']:.0f} ms")
+        spans = sorted(trace["spans"], key=lambda s: s["ms"], reverse=True)
+        st.dataframe(
+            [
+                {"stage": s["stage"], "model": s.get("model", ""), "ms": round(s["ms"], 1), "start": round(s["start_ms"], 1)}
+                for s in spans
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.dataframe(
+            [
+                {"stage": stage, "n": s["count"], "p50": round(s["p50_ms"], 1), "p95": round(s["p95_ms"], 1)}
+                for stage, s in snapshot.items()
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
@@ -1,11 +1,18 @@
 """
 Data augmentation pipelines for training (config-driven).
+
+Training augmentation runs as a parallel tf.data map stage over whole batches (vectorized, on the
+input pipeline's CPU threads) rather than inside the model graph, so exported models carry no
+augmentation layers. Randomness is stateless and seeded, so a given seed reproduces the same stream.
 """
+import math
+from typing import Optional
+
 from tensorflow import keras
 
 
 def get_augmentation_layers(config: dict):
-    """Build a keras.Sequential of augmentation layers from config."""
+    """Build a keras.Sequential of augmentation layers from config (interactive use; training uses apply_augmentation)."""
     aug_cfg = config.get("augmentation", {}).get("train", {})
     layers = [
         keras.layers.RandomFlip("horizontal" if aug_cfg.get("horizontal_flip", True) else None),
@@ -13,3 +20,112 @@ def get_augmentation_layers(config: dict):
         keras.layers.RandomZoom(aug_cfg.get("zoom_range", 0.1)),
     ]
     return keras.Sequential(layers, name="augmentation")
+
+
+def augmentation_params(config: dict) -> dict:
+    """Normalized training augmentation settings from data config (`augmentation.train`)."""
+    aug_cfg = config.get("augmentation", {}).get("train", {}) or {}
+    brightness = aug_cfg.get("brightness_range") or [1.0, 1.0]
+    return {
+        "horizontal_flip": bool(aug_cfg.get("horizontal_flip", False)),
+        "vertical_flip": bool(aug_cfg.get("vertical_flip", False)),
+        "rotation_range": float(aug_cfg.get("rotation_range", 0.0)),  # degrees
+        "width_shift": float(aug_cfg.get("width_shift", 0.0)),  # fraction of width
+        "height_shift": float(aug_cfg.get("height_shift", 0.0)),  # fraction of height
+        "zoom_range": float(aug_cfg.get("zoom_range", 0.0)),
+        "brightness_range": (float(brightness[0]), float(brightness[1])),
+        "fill_mode": str(aug_cfg.get("fill_mode", "reflect")).upper(),
+    }
+
+
+def augmentation_enabled(config: dict) -> bool:
+    aug_cfg = config.get("augmentation", {}).get("train")
+    return bool(aug_cfg) and aug_cfg.get("enabled", True)
+
+
+def build_augment_fn(config: dict):
+    """
+    Return fn(images, labels, seed) -> (images, labels) augmenting a batch (B, H, W, C) in [0, 1].
+    seed: int64 tensor of shape [2] (stateless RNG seed for this batch).
+    """
+    import tensorflow as tf
+
+    p = augmentation_params(config)
+    max_angle = math.radians(p["rotation_range"])
+    lo_b, hi_b = p["brightness_range"]
+
+    def augment(images, labels, seed):
+        images = tf.cast(images, tf.float32)
+        shape = tf.shape(images)
+        b, h, w = shape[0], shape[1], shape[2]
+        hf, wf = tf.cast(h, tf.float32), tf.cast(w, tf.float32)
+        s = tf.random.experimental.stateless_split(seed, num=7)
+
+        def uniform(i, lo, hi):
+            return tf.random.stateless_uniform([b], seed=s[i], minval=lo, maxval=hi)
+
+        if p["horizontal_flip"]:
+            flip = uniform(0, 0.0, 1.0) < 0.5
+            images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+        if p["vertical_flip"]:
+            flip = uniform(1, 0.0, 1.0) < 0.5
+            images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[1]), images)
+
+        if max_angle or p["zoom_range"] or p["width_shift"] or p["height_shift"]:
+            angle = uniform(2, -max_angle, max_angle)
+            zoom = uniform(3, 1.0 - p["zoom_range"], 1.0 + p["zoom_range"])
+            tx = uniform(4, -p["width_shift"], p["width_shift"]) * wf
+            ty = uniform(5, -p["height_shift"], p["height_shift"]) * hf
+            # Output pixel -> input pixel: rotate and scale about the image centre, then shift
+            cx, cy = (wf - 1.0) / 2.0, (hf - 1.0) / 2.0
+            cos, sin = tf.cos(angle) * zoom, tf.sin(angle) * zoom
+            zeros = tf.zeros_like(angle)
+            transforms = tf.stack([
+                cos, -sin, cx - cos * cx + sin * cy + tx,
+                sin, cos, cy - sin * cx - cos * cy + ty,
+                zeros, zeros,
+            ], axis=1)
+            images = tf.raw_ops.ImageProjectiveTransformV3(
+                images=images,
+                transforms=transforms,
+                output_shape=tf.stack([h, w]),
+                fill_value=0.0,
+                interpolation="BILINEAR",
+                fill_mode=p["fill_mode"],
+            )
+
+        if (lo_b, hi_b) != (1.0, 1.0):
+            factor = uniform(6, lo_b, hi_b)
+            images = tf.clip_by_value(images * factor[:, None, None, None], 0.0, 1.0)
+        return images, labels
+
+    return augment
+
+
+def apply_augmentation(ds, config: dict, seed: Optional[int] = None, epoch=None):
+    """
+    Append the augmentation stage to a batched (images, labels) dataset with images in [0, 1].
+    Runs with num_parallel_calls=AUTOTUNE and deterministic ordering; each batch gets its own
+    stateless seed drawn from a seeded random stream (re-drawn every epoch where TF supports it).
+    epoch: optional int64 tf.Variable holding the current epoch; batch seeds then become
+    [seed + epoch, batch index], so any epoch's augmentations can be reproduced after a restart.
+    """
+    import tensorflow as tf
+
+    seed = config.get("splits", {}).get("seed", 42) if seed is None else seed
+    if epoch is not None:
+        seeds = tf.data.Dataset.from_tensors(0).flat_map(
+            lambda _: tf.data.Dataset.range(tf.int64.max).map(lambda i: tf.stack([seed + epoch, i]))
+        )
+    else:
+        try:
+            seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True)
+        except TypeError:  # TF < 2.13
+            seeds = tf.data.Dataset.random(seed=seed)
+        seeds = seeds.batch(2, drop_remainder=True)
+    augment = build_augment_fn(config)
+    return tf.data.Dataset.zip((ds, seeds)).map(
+        lambda batch, s: augment(batch[0], batch[1], s),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=True,
+    )
@@ -2,7 +2,9 @@
 Dataset loading and batching for brain MRI classification.
 TensorFlow/Keras imported only inside functions that need them (avoids protobuf errors at app startup).
 """
+import hashlib
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 
@@ -20,62 +22,187 @@ def _resolve_raw_dir(config: dict) -> Path:
     return path
 
 
-def get_dataset(config: dict, split: str):
+def _subset_args(split: str, val_ratio: float):
+    """(subset, validation_split) for image_dataset_from_directory; 'test' reuses the validation subset."""
+    if split == "train":
+        return "training", val_ratio
+    if split in ("validation", "val", "test"):
+        return "validation", val_ratio
+    return None, None
+
+
+def get_split_files(config: dict, split: str) -> tuple[list[str], np.ndarray]:
     """
-    Return a tf.data.Dataset for train/val/test.
-    Expects raw_dir to contain class subfolders (e.g. glioma/, meningioma/, ...).
-    Uses validation_split for train/validation; for 'test' returns validation subset.
+    File paths and integer labels for a split, without decoding any image.
+    Membership follows Keras' seeded validation_split over the shuffled file index (always shuffled
+    with splits.seed, so train and validation are disjoint); labels come from the class folder.
+    Files listed in `dataset.exclude` (see src.data.dedup) are dropped after the split, so the
+    remaining files keep their split.
     """
     from tensorflow import keras
+    from .dedup import excluded_files
 
     raw_dir = _resolve_raw_dir(config)
     if not raw_dir.exists():
         raise FileNotFoundError(f"Data directory not found: {raw_dir}. Download the dataset first (see data/README.md).")
 
-    image_config = config.get("image", {})
-    target_size = tuple(image_config.get("target_size", [224, 224]))
-    batch_size = config.get("batch_size", 32)
     seed = config.get("splits", {}).get("seed", 42)
-    classes = config.get("classes")
-    val_ratio = config.get("splits", {}).get("val_ratio", 0.15)
-    # Keras: validation_split is the fraction reserved for validation (e.g. 0.2 = 20% val)
-    validation_split = val_ratio
-
-    if split == "train":
-        subset = "training"
-    elif split in ("validation", "val"):
-        subset = "validation"
-    elif split == "test":
-        # Use same validation subset as test if no separate test split
-        subset = "validation"
-    else:
-        subset = None
-        validation_split = None
-
-    ds = keras.utils.image_dataset_from_directory(
+    subset, validation_split = _subset_args(split, config.get("splits", {}).get("val_ratio", 0.15))
+    index = keras.utils.image_dataset_from_directory(
         str(raw_dir),
         labels="inferred",
-        label_mode="categorical",
-        class_names=classes,
-        image_size=target_size,
-        batch_size=batch_size,
-        shuffle=(split == "train"),
+        label_mode="int",
+        class_names=config.get("classes"),
+        batch_size=None,
+        shuffle=True,
         seed=seed,
         subset=subset,
         validation_split=validation_split,
+        verbose=False,
     )
+    class_names = list(index.class_names)
+    paths = list(index.file_paths)
+    excluded = excluded_files(config)
+    if excluded:
+        paths = [p for p in paths if Path(p).relative_to(raw_dir).as_posix() not in excluded]
+    labels = np.array([class_names.index(Path(p).relative_to(raw_dir).parts[0]) for p in paths], dtype=np.int32)
+    return paths, labels
+
+
+def build_file_dataset(
+    config: dict,
+    paths,
+    labels,
+    split: str,
+    augment: Optional[bool] = None,
+    cache: Optional[str] = None,
+    shard: Optional[tuple[int, int]] = None,
+    batch_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    epoch=None,
+    soft_targets=None,
+    sampler=None,
+):
+    """
+    Batched (images, one-hot labels) dataset from file paths: shard -> shuffle (train) -> parallel
+    decode/resize/normalize -> batch -> [cache] -> [augment] -> prefetch.
+    shard: (num_shards, index) keeps every num_shards-th file, before any decoding (one shard per worker).
+    epoch: optional int64 tf.Variable set to the current epoch before each pass (see
+    training.callbacks.ResumableCheckpoint); the shuffle order and augmentation seeds are then a pure
+    function of (seed, epoch), so a resumed run sees exactly the data stream it would have seen.
+    soft_targets: optional (N, C) per-file array (e.g. teacher probabilities); targets then become
+    concat([one-hot, soft_targets]) of width 2C.
+    sampler: optional src.data.sampler.HardExampleSampler; the train stream then follows its weighted
+    per-epoch draw (whole batches, no cache) instead of a uniform shuffle.
+    """
+    import tensorflow as tf
+
+    image_config = config.get("image", {})
+    target_size = tuple(image_config.get("target_size", [224, 224]))
+    channels = image_config.get("channels", 3)
+    normalize = image_config.get("normalize", True)
+    batch_size = batch_size or config.get("batch_size", 32)
+    seed = config.get("splits", {}).get("seed", 42) if seed is None else seed
+    num_classes = len(config.get("classes") or []) or int(np.max(labels)) + 1
+    cache = config.get("dataset", {}).get("cache") if cache is None else cache
+    training = split == "train"
+
+    labels = np.asarray(labels, dtype=np.int32)
+    if sampler is not None:
+        # Files in the order drawn for this epoch (sampler.order is set in its on_epoch_begin)
+        files = tf.constant(list(paths))
+        ds = tf.data.Dataset.from_tensors(0).flat_map(lambda _: tf.data.Dataset.from_tensor_slices(sampler.order.value()))
+        ds = ds.apply(tf.data.experimental.assert_cardinality(sampler.draws))
+        ds = ds.map(lambda i: (tf.gather(files, i), tf.gather(labels, i)))
+        cache = None
+    elif soft_targets is None:
+        ds = tf.data.Dataset.from_tensor_slices((list(paths), labels))
+    else:
+        ds = tf.data.Dataset.from_tensor_slices((list(paths), labels, np.asarray(soft_targets, dtype=np.float32)))
+    if shard is not None:
+        ds = ds.shard(*shard)
+    if training and not cache and sampler is None:
+        ds = _shuffle_per_epoch(ds, len(paths), seed, epoch)
+
+    def load(path, label, soft=None):
+        img = tf.io.decode_image(tf.io.read_file(path), channels=channels, expand_animations=False)
+        img = tf.image.resize(img, target_size, method="bilinear")
+        img.set_shape((*target_size, channels))
+        if normalize:
+            img = img / 255.0
+        target = tf.one_hot(label, num_classes)
+        return img, target if soft is None else tf.concat([target, soft], axis=-1)
+
+    ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE).batch(batch_size, drop_remainder=sampler is not None)
+
+    if cache == "memory":
+        ds = ds.cache()
+    elif cache:
+        cache_dir = Path(cache) if Path(cache).is_absolute() else _project_root() / cache
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        h, w = target_size
+        suffix = f"_s{shard[1]}of{shard[0]}" if shard is not None else ""
+        # Keyed by the file list too, so excluding files (or adding data) never reuses a stale cache
+        files_key = hashlib.sha1("\n".join(map(str, paths)).encode()).hexdigest()[:8]
+        ds = ds.cache(str(cache_dir / f"{split}_{h}x{w}_b{batch_size}_{files_key}{suffix}"))
+    if cache and training:
+        # A cache freezes the first epoch's order; keep reshuffling at batch granularity
+        ds = _shuffle_per_epoch(ds, 64, seed, epoch)
+
+    from .augmentation import apply_augmentation, augmentation_enabled
+
+    if augment is None:
+        augment = training and augmentation_enabled(config)
+    if augment:
+        ds = apply_augmentation(ds, config, seed=seed, epoch=epoch)
+
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def _shuffle_per_epoch(ds, buffer_size: int, seed: int, epoch=None):
+    """Reshuffle every pass; with an epoch variable the order is seeded by (seed, epoch), read as each pass starts."""
+    import tensorflow as tf
+
+    if epoch is None:
+        return ds.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+    shuffled = tf.data.Dataset.from_tensors(0).flat_map(
+        lambda _: ds.shuffle(buffer_size, seed=seed * 1_000_003 + epoch, reshuffle_each_iteration=False)
+    )
+    return shuffled.apply(tf.data.experimental.assert_cardinality(ds.cardinality()))
 
-    # Normalize to [0, 1]
-    if image_config.get("normalize", True):
-        normalization = keras.layers.Rescaling(1.0 / 255.0)
-        ds = ds.map(lambda x, y: (normalization(x), y), num_parallel_calls=None)
 
-    return ds
+def get_dataset(
+    config: dict,
+    split: str,
+    augment: Optional[bool] = None,
+    cache: Optional[str] = None,
+    shard: Optional[tuple[int, int]] = None,
+    epoch=None,
+):
+    """
+    Return a tf.data.Dataset for train/val/test.
+    Expects raw_dir to contain class subfolders (e.g. glioma/, meningioma/, ...).
+    Uses validation_split for train/validation; for 'test' returns validation subset.
+    augment: apply `augmentation.train` as a parallel map stage; defaults to True for the train split
+    when augmentation is configured.
+    cache: "memory" or a directory to cache decoded, normalized batches (before augmentation);
+    defaults to `dataset.cache` in config (null = no cache).
+    shard: (num_shards, index) to read only this worker's share of the files.
+    epoch: int64 tf.Variable with the current epoch, for a resumable (epoch-seeded) train stream.
+    """
+    paths, labels = get_split_files(config, split)
+    return build_file_dataset(config, paths, labels, split, augment=augment, cache=cache, shard=shard, epoch=epoch)
 
 
 def load_image_for_inference(image_path: str, target_size=(224, 224), normalize: bool = True):
-    """Load and preprocess a single image from file path for inference."""
+    """Load and preprocess a single image from file path for inference (JPEG/PNG or DICOM)."""
     from PIL import Image
+    from .dicom import DICOM_EXTENSIONS, is_dicom, load_dicom_for_inference
+
+    with open(image_path, "rb") as f:
+        head = f.read(132)
+    if is_dicom(head) or Path(image_path).suffix.lower() in DICOM_EXTENSIONS:
+        return load_dicom_for_inference(image_path, target_size=target_size, normalize=normalize)
 
     img = Image.open(image_path).convert("RGB").resize(target_size)
     arr = np.asarray(img, dtype=np.float32)
@@ -86,11 +213,16 @@ def load_image_for_inference(image_path: str, target_size=(224, 224), normalize:
 
 
 def load_image_from_bytes(image_bytes: bytes, target_size=(224, 224), normalize: bool = True):
-    """Load and preprocess an image from bytes (e.g. Streamlit upload) for inference."""
+    """Load and preprocess an image from bytes (e.g. Streamlit upload) for inference (JPEG/PNG or DICOM)."""
     import io
     from PIL import Image
+    from src.tracing import span
+    from .dicom import is_dicom, load_dicom_for_inference
 
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB").resize(target_size)
+    with span("decode", size=list(target_size)):
+        if is_dicom(image_bytes):
+            return load_dicom_for_inference(image_bytes, target_size=target_size, normalize=normalize)
+        img = Image.open(io.BytesIO(image_bytes)).convert("RGB").resize(target_size)
     arr = np.asarray(img, dtype=np.float32)
     arr = np.expand_dims(arr, axis=0)
     if normalize:
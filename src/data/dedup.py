@@ -0,0 +1,221 @@
+"""
+Duplicate and near-duplicate scan detection with perceptual hashes.
+
+Images are decoded to small grayscale thumbnails in a thread pool (JPEG draft mode, so full-size
+decoding is skipped), then hashed in vectorized NumPy passes: pHash (sign of the low 8x8 DCT
+coefficients vs. their median) and dHash (sign of horizontal gradients on a 9x8 thumbnail).
+Pairs within `phash_distance` AND `dhash_distance` bits are found with a BK-tree and merged into groups.
+The exclusion list keeps one file per group (a validation file when the group spans splits, so
+validation numbers stay comparable) and drops every member of groups whose labels disagree.
+get_split_files leaves the excluded files out of every split (`dataset.exclude` in data config).
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+DEFAULT_EXCLUDE = "data/processed/duplicates.json"
+_HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _thumbnails(path: str) -> tuple:
+    """(32x32, 8x9) float32 grayscale thumbnails of one image, or None if it cannot be decoded."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (2 * _DCT_SIZE, 2 * _DCT_SIZE))
+            gray = img.convert("L")
+            big = np.asarray(gray.resize((_DCT_SIZE, _DCT_SIZE), Image.BILINEAR), dtype=np.float32)
+            small = np.asarray(gray.resize((_HASH_SIZE + 1, _HASH_SIZE), Image.BILINEAR), dtype=np.float32)
+    except OSError:
+        return None
+    return big, small
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) bool -> (N,) uint64."""
+    return np.packbits(bits.astype(np.uint8), axis=1).view(">u8")[:, 0].astype(np.uint64)
+
+
+def phash(images: np.ndarray) -> np.ndarray:
+    """64-bit pHash of (N, 32, 32) grayscale images."""
+    d = _dct_matrix(_DCT_SIZE)
+    coeffs = np.einsum("ij,njk,lk->nil", d, images, d)[:, :_HASH_SIZE, :_HASH_SIZE].reshape(len(images), -1)
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)  # DC term excluded
+    return _pack(coeffs > median)
+
+
+def dhash(images: np.ndarray) -> np.ndarray:
+    """64-bit dHash of (N, 8, 9) grayscale images."""
+    return _pack((images[:, :, 1:] > images[:, :, :-1]).reshape(len(images), -1))
+
+
+def compute_hashes(paths: Sequence[str], workers: Optional[int] = None) -> dict:
+    """
+    {"phash", "dhash": (N,) uint64, "ok": (N,) bool} for every path; decoding runs in `workers` threads.
+    Unreadable files get ok=False (and zero hashes).
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        thumbs = list(pool.map(_thumbnails, paths, chunksize=64))
+    ok = np.array([t is not None for t in thumbs], dtype=bool)
+    big = np.zeros((len(paths), _DCT_SIZE, _DCT_SIZE), dtype=np.float32)
+    small = np.zeros((len(paths), _HASH_SIZE, _HASH_SIZE + 1), dtype=np.float32)
+    for i, t in enumerate(thumbs):
+        if t is not None:
+            big[i], small[i] = t
+    return {"phash": np.where(ok, phash(big), 0), "dhash": np.where(ok, dhash(small), 0), "ok": ok}
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(int(a) ^ int(b)).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes (Hamming metric); each node holds every index with that hash."""
+
+    def __init__(self):
+        self.root = None  # [hash, [indices], {distance: child}]
+
+    def add(self, h: int, index: int) -> None:
+        h = int(h)
+        if self.root is None:
+            self.root = [h, [index], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(index)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [index], {}]
+                return
+            node = child
+
+    def query(self, h: int, radius: int) -> list:
+        """[(index, distance)] for every stored hash within `radius` bits of h."""
+        h = int(h)
+        found, stack = [], [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                found.extend((i, d) for i in node[1])
+            stack.extend(child for dist, child in node[2].items() if d - radius <= dist <= d + radius)
+        return found
+
+
+def find_duplicates(hashes: dict, phash_distance: int = 4, dhash_distance: int = 6) -> list:
+    """Near-duplicate pairs [(i, j, phash bits, dhash bits)] with i < j, found with a BK-tree on pHash."""
+    tree = BKTree()
+    pairs = []
+    for j in np.flatnonzero(hashes["ok"]):
+        for i, d in tree.query(hashes["phash"][j], phash_distance):
+            dd = hamming(hashes["dhash"][i], hashes["dhash"][j])
+            if dd <= dhash_distance:
+                pairs.append((int(i), int(j), d, dd))
+        tree.add(hashes["phash"][j], int(j))
+    return pairs
+
+
+def group_pairs(pairs: Sequence[tuple], n: int) -> list:
+    """Connected components (lists of indices, size >= 2) of the duplicate pairs (union-find)."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, *_ in pairs:
+        parent[find(i)] = find(j)
+    groups = {}
+    for i in {x for pair in pairs for x in pair[:2]}:
+        groups.setdefault(find(i), []).append(i)
+    return sorted((sorted(g) for g in groups.values()), key=lambda g: g[0])
+
+
+def exclusion_list(groups: Sequence[list], labels: np.ndarray, in_validation: np.ndarray) -> tuple:
+    """
+    (excluded indices, conflicting groups). One file per group is kept: a validation member if any,
+    else the first; groups whose members have different labels are excluded entirely.
+    """
+    excluded, conflicts = [], []
+    for group in groups:
+        if len({int(labels[i]) for i in group}) > 1:
+            conflicts.append(group)
+            excluded.extend(group)
+            continue
+        keep = next((i for i in group if in_validation[i]), group[0])
+        excluded.extend(i for i in group if i != keep)
+    return sorted(excluded), conflicts
+
+
+def scan_dataset(config: dict, phash_distance: int = 4, dhash_distance: int = 6, workers: Optional[int] = None) -> dict:
+    """
+    Hash every file in the raw dataset, group near-duplicates and build the exclusion list.
+    Returns the report written by save_report (paths relative to the raw dir).
+    """
+    from .dataset import _resolve_raw_dir, get_split_files
+
+    raw_dir = _resolve_raw_dir(config)
+    full = {**config, "dataset": {**config.get("dataset", {}), "exclude": None}}
+    train_paths, train_labels = get_split_files(full, "train")
+    val_paths, val_labels = get_split_files(full, "validation")
+    paths = list(train_paths) + list(val_paths)
+    labels = np.concatenate([train_labels, val_labels])
+    in_validation = np.arange(len(paths)) >= len(train_paths)
+
+    hashes = compute_hashes(paths, workers=workers)
+    pairs = find_duplicates(hashes, phash_distance, dhash_distance)
+    groups = group_pairs(pairs, len(paths))
+    excluded, conflicts = exclusion_list(groups, labels, in_validation)
+    class_names = config.get("classes") or []
+    rel = [Path(p).relative_to(raw_dir).as_posix() for p in paths]
+
+    def describe(group):
+        return [{"path": rel[i], "label": class_names[labels[i]] if class_names else int(labels[i]),
+                 "split": "validation" if in_validation[i] else "train"} for i in group]
+
+    return {
+        "settings": {"phash_distance": phash_distance, "dhash_distance": dhash_distance},
+        "num_files": len(paths),
+        "unreadable": [rel[i] for i in np.flatnonzero(~hashes["ok"])],
+        "num_groups": len(groups),
+        "cross_split_groups": sum(1 for g in groups if in_validation[g].any() and not in_validation[g].all()),
+        "label_conflicts": [describe(g) for g in conflicts],
+        "groups": [describe(g) for g in groups],
+        "exclude": [rel[i] for i in excluded],
+    }
+
+
+def save_report(report: dict, path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+
+
+def excluded_files(config: dict) -> set:
+    """Raw-dir-relative paths listed in `dataset.exclude` (empty if unset or the file does not exist)."""
+    from .dataset import _project_root
+
+    exclude = config.get("dataset", {}).get("exclude")
+    if not exclude:
+        return set()
+    path = Path(exclude) if Path(exclude).is_absolute() else _project_root() / exclude
+    if not path.exists():
+        return set()
+    return set(json.loads(path.read_text()).get("exclude", []))
@@ -0,0 +1,227 @@
+"""
+DICOM ingestion for inference: header-only parsing, lazy pixel decode, vectorized rescale + window/level.
+12/16-bit pixel data goes straight to the model input format ((N, H, W, 3) float32 in [0, 1]) without a
+PNG round trip. Requires pydicom (imported lazily; only needed when DICOM data is actually read).
+"""
+import io
+import re
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+DICOM_EXTENSIONS = (".dcm", ".dicom")
+_FRAME_SUFFIX = re.compile(r" \[frame (\d+)\]$")
+
+Source = Union[str, Path, bytes]
+
+
+def _pydicom():
+    try:
+        import pydicom
+    except ImportError as e:
+        raise ImportError("DICOM support requires pydicom: pip install pydicom") from e
+    return pydicom
+
+
+def _as_file(source: Source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source)
+
+
+def is_dicom(data: bytes) -> bool:
+    """True for Part 10 files (128-byte preamble followed by 'DICM')."""
+    return len(data) >= 132 and data[128:132] == b"DICM"
+
+
+def read_header(source: Source):
+    """Parse the DICOM header only; pixel data is not read or decoded."""
+    return _pydicom().dcmread(_as_file(source), stop_before_pixels=True)
+
+
+def num_frames(header) -> int:
+    return int(getattr(header, "NumberOfFrames", 1) or 1)
+
+
+def frame_name(name: str, frame: int) -> str:
+    """Display/slice name for one frame of a multi-frame file."""
+    return f"{name} [frame {frame}]"
+
+
+def parse_frame_name(name: str) -> tuple[str, int]:
+    """Inverse of frame_name: (file name, frame index); frame 0 for single-frame names."""
+    m = _FRAME_SUFFIX.search(name)
+    return (name[: m.start()], int(m.group(1))) if m else (name, 0)
+
+
+def _first(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (list, tuple)) or type(value).__name__ == "MultiValue":
+        value = value[0] if len(value) else None
+    return float(value) if value is not None else None
+
+
+def _functional_group_attr(header, sequence: str, attr: str):
+    """Look up an attribute in the shared functional groups of enhanced (multi-frame) objects."""
+    shared = getattr(header, "SharedFunctionalGroupsSequence", None)
+    if not shared:
+        return None
+    seq = getattr(shared[0], sequence, None)
+    return getattr(seq[0], attr, None) if seq else None
+
+
+def rescale_params(header) -> tuple[float, float]:
+    """(slope, intercept) for stored value -> modality value; (1, 0) when absent (typical for MR)."""
+    slope = _first(getattr(header, "RescaleSlope", None))
+    intercept = _first(getattr(header, "RescaleIntercept", None))
+    if slope is None:
+        slope = _first(_functional_group_attr(header, "PixelValueTransformationSequence", "RescaleSlope"))
+        intercept = _first(_functional_group_attr(header, "PixelValueTransformationSequence", "RescaleIntercept"))
+    return (slope if slope is not None else 1.0, intercept if intercept is not None else 0.0)
+
+
+def window_params(header) -> tuple[Optional[float], Optional[float]]:
+    """(center, width) from the header (first value if several); (None, None) when absent."""
+    center = _first(getattr(header, "WindowCenter", None))
+    width = _first(getattr(header, "WindowWidth", None))
+    if center is None or width is None:
+        center = _first(_functional_group_attr(header, "FrameVOILUTSequence", "WindowCenter"))
+        width = _first(_functional_group_attr(header, "FrameVOILUTSequence", "WindowWidth"))
+    return center, width
+
+
+def apply_rescale(pixels: np.ndarray, slope: float = 1.0, intercept: float = 0.0) -> np.ndarray:
+    """Stored values -> modality values (float32)."""
+    out = pixels.astype(np.float32, copy=False)
+    if slope != 1.0:
+        out = out * np.float32(slope)
+    if intercept != 0.0:
+        out = out + np.float32(intercept)
+    return out
+
+
+def apply_window(pixels: np.ndarray, center: Optional[float] = None, width: Optional[float] = None) -> np.ndarray:
+    """
+    Linear window/level (DICOM PS3.3 C.11.2.1.2) to float32 in [0, 1].
+    Without a window, each frame is min-max scaled. Works on (H, W) or (N, H, W).
+    """
+    pixels = pixels.astype(np.float32, copy=False)
+    if center is None or width is None or width <= 1:
+        axes = tuple(range(pixels.ndim - 2, pixels.ndim))
+        lo = pixels.min(axis=axes, keepdims=True)
+        hi = pixels.max(axis=axes, keepdims=True)
+        return (pixels - lo) / np.maximum(hi - lo, 1e-6)
+    return np.clip((pixels - (center - 0.5)) / (width - 1.0) + 0.5, 0.0, 1.0)
+
+
+def _decode_pixels(source: Source, frames: Optional[Sequence[int]], n_frames: int) -> np.ndarray:
+    """(k, H, W) stored values for the requested frames; decodes only those frames when pydicom supports it."""
+    pydicom = _pydicom()
+    wanted = list(range(n_frames)) if frames is None else list(frames)
+    try:
+        from pydicom.pixels import pixel_array  # pydicom >= 3: per-frame decode
+    except ImportError:
+        pixel_array = None
+    if pixel_array is not None and n_frames > 1 and len(wanted) < n_frames:
+        return np.stack([pixel_array(_as_file(source), index=i) for i in wanted])
+    arr = pydicom.dcmread(_as_file(source)).pixel_array
+    if n_frames == 1:
+        arr = arr[None]
+    return arr[wanted]
+
+
+def decode_frames(
+    source: Source,
+    frames: Optional[Sequence[int]] = None,
+    header=None,
+    window: Optional[tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Decode selected frames (all if None) to (k, H, W) float32 in [0, 1]:
+    rescale slope/intercept, window/level (header or explicit `window`), MONOCHROME1 inversion.
+    Colour (RGB) DICOMs are converted to luminance.
+    """
+    header = header if header is not None else read_header(source)
+    pixels = _decode_pixels(source, frames, num_frames(header))
+    if pixels.ndim == 4:  # (k, H, W, 3) colour
+        pixels = pixels[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    slope, intercept = rescale_params(header)
+    values = apply_rescale(pixels, slope, intercept)
+    center, width = window if window is not None else window_params(header)
+    out = apply_window(values, center, width)
+    if getattr(header, "PhotometricInterpretation", "") == "MONOCHROME1":
+        out = 1.0 - out
+    return out
+
+
+def to_model_input(frames: np.ndarray, target_size=(224, 224), channels: int = 3) -> np.ndarray:
+    """(k, H, W) floats in [0, 1] -> (k, target_H, target_W, channels) float32 (bilinear resize)."""
+    from PIL import Image
+
+    resized = [
+        np.asarray(Image.fromarray(f.astype(np.float32)).resize(tuple(target_size), Image.BILINEAR))
+        for f in frames
+    ]
+    batch = np.stack(resized).astype(np.float32)[..., None]
+    return np.repeat(batch, channels, axis=-1)
+
+
+def load_dicom_for_inference(source: Source, target_size=(224, 224), normalize: bool = True, frame: int = 0) -> np.ndarray:
+    """DICOM counterpart of load_image_for_inference: one frame as a (1, H, W, 3) batch."""
+    batch = to_model_input(decode_frames(source, frames=[frame]), target_size)
+    return batch if normalize else batch * 255.0
+
+
+class DicomSeries:
+    """
+    A set of DICOM files (single- or multi-frame) treated as one ordered series.
+    Headers are parsed up front without pixels; pixel data is decoded only for the slices requested.
+    Slice order follows InstanceNumber, then slice position, then frame index.
+    """
+
+    def __init__(self, sources: Iterable[Source], names: Optional[Sequence[str]] = None):
+        self.sources = list(sources)
+        self.headers = [read_header(s) for s in self.sources]
+        file_names = list(names) if names is not None else [
+            Path(s).name if not isinstance(s, (bytes, bytearray)) else f"slice_{i}" for i, s in enumerate(self.sources)
+        ]
+        entries = []
+        for i, header in enumerate(self.headers):
+            instance = int(getattr(header, "InstanceNumber", 0) or 0)
+            position = getattr(header, "ImagePositionPatient", None)
+            z = float(position[2]) if position is not None and len(position) == 3 else 0.0
+            n = num_frames(header)
+            for f in range(n):
+                name = frame_name(file_names[i], f) if n > 1 else file_names[i]
+                entries.append(((instance, z, f), i, f, name))
+        entries.sort(key=lambda e: e[0])
+        self._index = [(i, f) for _, i, f, _ in entries]
+        self.names = [name for *_, name in entries]
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, Path]) -> "DicomSeries":
+        paths = sorted(p for p in Path(directory).rglob("*") if p.is_file() and p.suffix.lower() in DICOM_EXTENSIONS)
+        return cls(paths)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def frames(self, indices: Optional[Sequence[int]] = None, window: Optional[tuple[float, float]] = None) -> np.ndarray:
+        """(k, H, W) windowed frames in [0, 1] for the selected slice indices (all if None)."""
+        indices = range(len(self)) if indices is None else indices
+        by_file: dict[int, list[tuple[int, int]]] = {}
+        for pos, idx in enumerate(indices):
+            file_idx, frame = self._index[idx]
+            by_file.setdefault(file_idx, []).append((pos, frame))
+        out = [None] * len(indices)
+        for file_idx, wanted in by_file.items():
+            decoded = decode_frames(
+                self.sources[file_idx], frames=[f for _, f in wanted], header=self.headers[file_idx], window=window
+            )
+            for (pos, _), frame in zip(wanted, decoded):
+                out[pos] = frame
+        return np.stack(out) if out else np.zeros((0, 0, 0), dtype=np.float32)
+
+    def load(self, indices: Optional[Sequence[int]] = None, target_size=(224, 224), window=None) -> np.ndarray:
+        """Selected slices as a model-ready (k, H, W, 3) float32 batch."""
+        return to_model_input(self.frames(indices, window=window), target_size)
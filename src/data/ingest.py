@@ -0,0 +1,178 @@
+"""
+Parallel, incremental dataset ingestion and integrity checks.
+
+ingest() copies (or hard-links) <source>/<class>/<image> files into data/raw/<class>/ with a thread pool,
+skipping files whose destination already has the same size and mtime. validate() fully decodes every
+new or changed image (a truncated JPEG fails here instead of mid-epoch) and records size, mtime, shape
+and SHA-256 in a JSON manifest; unchanged files (same size and mtime) are not read again.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_MANIFEST = "data/processed/manifest.json"
+
+
+def _list_images(root: Path, classes: Optional[Sequence[str]] = None) -> list:
+    """Image files under root/<class>/ (sorted), for the given classes or every class folder."""
+    dirs = [root / c for c in classes] if classes else sorted(d for d in root.iterdir() if d.is_dir() and not d.name.startswith("."))
+    return sorted(
+        f for d in dirs if d.is_dir() for f in d.iterdir()
+        if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def _same_file(src: Path, dst: Path) -> bool:
+    if not dst.exists():
+        return False
+    a, b = src.stat(), dst.stat()
+    return a.st_size == b.st_size and int(a.st_mtime) == int(b.st_mtime)
+
+
+def _transfer(src: Path, dst: Path, link: bool) -> str:
+    """Copy or hard-link one file; returns "skipped", "linked" or "copied"."""
+    if _same_file(src, dst):
+        return "skipped"
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    if link:
+        try:
+            tmp.unlink(missing_ok=True)
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return "linked"
+        except OSError:
+            pass  # different filesystem (or no hard-link support): fall back to a copy
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return "copied"
+
+
+def ingest(
+    sources: Sequence,
+    raw_dir,
+    classes: Optional[Sequence[str]] = None,
+    link: bool = False,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Merge <source>/<class>/ image files from every source into raw_dir/<class>/.
+    A name already taken by an earlier source in the same run is prefixed with the source folder name.
+    Returns counts {"copied", "linked", "skipped"}.
+    """
+    raw_dir = Path(raw_dir)
+    plan, taken = [], set()
+    for source in map(Path, sources):
+        for f in _list_images(source, classes):
+            dst = raw_dir / f.parent.name / f.name
+            if dst in taken:
+                dst = dst.with_name(f"{source.name}_{f.name}")
+            taken.add(dst)
+            plan.append((f, dst))
+    counts = {"copied": 0, "linked": 0, "skipped": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(lambda job: _transfer(*job, link), plan):
+            counts[outcome] += 1
+    return counts
+
+
+def verify_image(path) -> dict:
+    """Read and fully decode one image; {"size", "mtime", "sha256", "width", "height", "mode", "error"}."""
+    from PIL import Image
+
+    path = Path(path)
+    stat = path.stat()
+    data = path.read_bytes()
+    entry = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "width": None,
+        "height": None,
+        "mode": None,
+        "error": None,
+    }
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()  # full decode: raises on truncated / corrupt data
+            entry.update(width=img.width, height=img.height, mode=img.mode)
+    except Exception as e:  # PIL raises OSError, SyntaxError, ValueError... for bad files
+        entry["error"] = f"{type(e).__name__}: {e}"
+    return entry
+
+
+def load_manifest(path) -> dict:
+    path = Path(path)
+    return json.loads(path.read_text()).get("files", {}) if path.exists() else {}
+
+
+def save_manifest(files: dict, path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps({"version": 1, "files": files}, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def validate(
+    raw_dir,
+    manifest_path,
+    classes: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    full: bool = False,
+) -> dict:
+    """
+    Verify new or changed images under raw_dir (every image with full=True) and update the manifest.
+    Returns {"total", "checked", "unchanged", "removed", "corrupt": [relative paths], "classes": {class: count}}.
+    """
+    raw_dir = Path(raw_dir)
+    previous = {} if full else load_manifest(manifest_path)
+    files = _list_images(raw_dir, classes)
+    rel = [f.relative_to(raw_dir).as_posix() for f in files]
+
+    todo, manifest = [], {}
+    for f, key in zip(files, rel):
+        old = previous.get(key)
+        stat = f.stat()
+        if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+            manifest[key] = old
+        else:
+            todo.append((f, key))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (_, key), entry in zip(todo, pool.map(lambda job: verify_image(job[0]), todo)):
+            manifest[key] = entry
+    save_manifest(manifest, manifest_path)
+
+    counts = {}
+    for key in rel:
+        counts[key.split("/")[0]] = counts.get(key.split("/")[0], 0) + 1
+    return {
+        "total": len(rel),
+        "checked": len(todo),
+        "unchanged": len(rel) - len(todo),
+        "removed": len(set(previous) - set(manifest)),
+        "corrupt": sorted(k for k, v in manifest.items() if v["error"]),
+        "classes": counts,
+    }
+
+
+def quarantine(raw_dir, relative_paths: Sequence[str], quarantine_dir, manifest_path=None) -> int:
+    """
+    Move files (paths relative to raw_dir) to quarantine_dir/<same relative path>, out of every split,
+    and drop them from the manifest if one is given.
+    """
+    raw_dir, quarantine_dir = Path(raw_dir), Path(quarantine_dir)
+    for key in relative_paths:
+        dst = quarantine_dir / key
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(raw_dir / key), str(dst))
+    if manifest_path is not None:
+        files = load_manifest(manifest_path)
+        save_manifest({k: v for k, v in files.items() if k not in set(relative_paths)}, manifest_path)
+    return len(relative_paths)
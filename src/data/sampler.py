@@ -0,0 +1,133 @@
+"""
+Hard-example mining and class-balanced sampling for the training pipeline (`sampler` in data config).
+
+Each epoch draws training files with replacement, with probability proportional to
+class_weight ** class_balance * ema_loss ** hardness. Per-sample loss and true-class confidence are
+recorded by the loss itself (SampleLoss) and folded into an exponential moving average after every
+batch. Samples predicted with confidence >= skip_confidence for skip_after epochs in a row are left out
+for skip_epochs epochs. The draw for epoch e is seeded by (seed, e), and the statistics are saved with
+resumable checkpoints, so a resumed run samples exactly as an uninterrupted one.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+from tensorflow import keras
+
+DEFAULTS = {
+    "class_balance": 1.0,  # 0 = natural class frequencies, 1 = equal draws per class
+    "hardness": 1.0,  # exponent on the EMA loss (0 = ignore difficulty)
+    "momentum": 0.9,  # EMA of per-sample loss
+    "min_weight": 0.1,  # floor relative to the mean weight, so easy samples are still revisited
+    "skip_confidence": 0.99,
+    "skip_after": 2,
+    "skip_epochs": 2,
+    "epoch_fraction": 1.0,  # draws per epoch / number of training files
+}
+
+
+def sampler_enabled(config: dict) -> bool:
+    cfg = config.get("sampler")
+    return bool(cfg) and cfg.get("enabled", True)
+
+
+class SampleLoss(keras.losses.Loss):
+    """Categorical cross-entropy that also stores the batch's per-sample loss and true-class probability."""
+
+    def __init__(self, record, name="categorical_crossentropy"):
+        super().__init__(name=name)
+        self.record = record
+
+    def call(self, y_true, y_pred):
+        import tensorflow as tf
+
+        loss = keras.losses.categorical_crossentropy(y_true, y_pred)
+        confidence = tf.reduce_sum(y_true * y_pred, axis=-1)
+        if loss.shape[0] == self.record.shape[0]:
+            self.record.assign(tf.stack([loss, confidence], axis=1))
+        return loss
+
+
+class HardExampleSampler(keras.callbacks.Callback):
+    """
+    Weighted streaming sampler over the train split plus the callback that keeps its statistics.
+    Use dataset() as the training data, loss() as the model loss and pass the sampler as a callback.
+    """
+
+    def __init__(self, config: dict, seed: Optional[int] = None):
+        import tensorflow as tf
+        from .dataset import get_split_files
+
+        super().__init__()
+        self.config = config
+        self.settings = {**DEFAULTS, **(config.get("sampler") or {})}
+        self.seed = config.get("splits", {}).get("seed", 42) if seed is None else seed
+        self.paths, self.labels = get_split_files(config, "train")
+        self.num_classes = len(config.get("classes", [])) or 4
+        self.batch_size = int(config.get("batch_size", 32))
+        n = len(self.paths)
+        # Whole batches only, so the loss record always matches one batch
+        self.draws = max(int(math.ceil(n * self.settings["epoch_fraction"] / self.batch_size)), 1) * self.batch_size
+
+        counts = np.bincount(self.labels, minlength=self.num_classes).astype(np.float64)
+        self.class_weight = (n / (self.num_classes * np.maximum(counts, 1.0))) ** self.settings["class_balance"]
+        self.ema_loss = np.full(n, math.log(self.num_classes))
+        self.streak = np.zeros(n, dtype=np.int64)
+        self.skip_until = np.zeros(n, dtype=np.int64)
+        self._confidence = np.full(n, np.nan)
+
+        self.order = tf.Variable(np.zeros(self.draws, dtype=np.int64), trainable=False)
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.record = tf.Variable(np.zeros((self.batch_size, 2), dtype=np.float32), trainable=False)
+        self._order = np.zeros(self.draws, dtype=np.int64)
+        self._pos = 0
+
+    def dataset(self):
+        from .dataset import build_file_dataset
+
+        return build_file_dataset(self.config, self.paths, self.labels, "train", cache=False, seed=self.seed, epoch=self.epoch, sampler=self)
+
+    def loss(self):
+        return SampleLoss(self.record)
+
+    def probabilities(self, epoch: int) -> np.ndarray:
+        w = self.class_weight[self.labels] * np.power(self.ema_loss + 1e-6, self.settings["hardness"])
+        w = np.maximum(w / w.mean(), self.settings["min_weight"])
+        active = self.skip_until <= epoch
+        if active.any():
+            w = np.where(active, w, 0.0)
+        return w / w.sum()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        rng = np.random.default_rng([self.seed, epoch])
+        self._order = rng.choice(len(self.paths), size=self.draws, replace=True, p=self.probabilities(epoch))
+        self.order.assign(self._order)
+        self.epoch.assign(epoch)
+        self._confidence[:] = np.nan
+        self._pos = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        idx = self._order[self._pos:self._pos + self.batch_size]
+        self._pos += self.batch_size
+        record = self.record.numpy()[: len(idx)]
+        m = self.settings["momentum"]
+        self.ema_loss[idx] = m * self.ema_loss[idx] + (1.0 - m) * record[:, 0]
+        self._confidence[idx] = record[:, 1]
+
+    def on_epoch_end(self, epoch, logs=None):
+        seen = ~np.isnan(self._confidence)
+        solved = seen & (self._confidence >= self.settings["skip_confidence"])
+        self.streak = np.where(solved, self.streak + 1, np.where(seen, 0, self.streak))
+        retire = self.streak >= self.settings["skip_after"]
+        self.skip_until[retire] = epoch + 1 + self.settings["skip_epochs"]
+        self.streak[retire] = 0
+        if logs is not None:
+            logs["skipped"] = int((self.skip_until > epoch + 1).sum())
+
+    def state_dict(self) -> dict:
+        return {"ema_loss": self.ema_loss.tolist(), "streak": self.streak.tolist(), "skip_until": self.skip_until.tolist()}
+
+    def load_state_dict(self, state: dict) -> None:
+        self.ema_loss = np.asarray(state["ema_loss"], dtype=np.float64)
+        self.streak = np.asarray(state["streak"], dtype=np.int64)
+        self.skip_until = np.asarray(state["skip_until"], dtype=np.int64)
@@ -0,0 +1,127 @@
+"""
+Multi-slice studies: expand uploaded files / ZIP archives into slices and decode them in parallel.
+Decoding (PIL, pydicom/NumPy) releases the GIL for most of the work, so a thread pool scales with cores.
+DICOM files are slices too; multi-frame DICOMs expand to one slice per frame.
+"""
+import io
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from typing import Iterable, Optional
+
+import numpy as np
+
+from . import dicom
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _natural_key(name: str):
+    """Sort key so slice_2 comes before slice_10."""
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+
+def _is_dicom_entry(name: str, data: bytes) -> bool:
+    return dicom.is_dicom(data) or PurePosixPath(name).suffix.lower() in dicom.DICOM_EXTENSIONS
+
+
+def is_study(files: Iterable[tuple[str, bytes]]) -> bool:
+    """True if (name, bytes) uploads hold more than one slice: several files, a ZIP, or a multi-frame DICOM."""
+    files = list(files)
+    if len(files) != 1:
+        return len(files) > 1
+    name, data = files[0]
+    if name.lower().endswith(".zip") or zipfile.is_zipfile(io.BytesIO(data)):
+        return True
+    return _is_dicom_entry(name, data) and dicom.num_frames(dicom.read_header(data)) > 1
+
+
+def expand_uploads(files: Iterable[tuple[str, bytes]]) -> list[tuple[str, bytes]]:
+    """
+    Flatten (name, bytes) uploads into slices: ZIP archives are expanded, unsupported files skipped.
+    Images are returned in natural filename order; DICOM slices follow in series order
+    (InstanceNumber, file name, frame), with multi-frame files named "<file> [frame i]".
+    Only DICOM headers are parsed here; pixel data is decoded later for the slices actually used.
+    """
+    entries = []
+    for name, data in files:
+        if name.lower().endswith(".zip") or zipfile.is_zipfile(io.BytesIO(data)):
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    member = PurePosixPath(info.filename)
+                    if info.is_dir() or member.name.startswith(".") or "__MACOSX" in member.parts:
+                        continue
+                    entries.append((f"{name}/{info.filename}", zf.read(info)))
+        else:
+            entries.append((name, data))
+
+    images, dicoms = [], []
+    for name, data in entries:
+        if _is_dicom_entry(name, data):
+            header = dicom.read_header(data)
+            instance = int(getattr(header, "InstanceNumber", 0) or 0)
+            n = dicom.num_frames(header)
+            for f in range(n):
+                dicoms.append(((instance, _natural_key(name), f), dicom.frame_name(name, f) if n > 1 else name, data))
+        elif PurePosixPath(name).suffix.lower() in IMAGE_EXTENSIONS:
+            images.append((name, data))
+    images.sort(key=lambda s: _natural_key(s[0]))
+    dicoms.sort(key=lambda d: d[0])
+    return images + [(name, data) for _, name, data in dicoms]
+
+
+def _decode_one(image_bytes: bytes, sizes: list[tuple[int, int]], normalize: bool) -> list[np.ndarray]:
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    out = []
+    for size in sizes:
+        arr = np.asarray(img.resize(size), dtype=np.float32)
+        out.append(arr / 255.0 if normalize else arr)
+    return out
+
+
+def _decode_dicom(data: bytes, frames: list[int], sizes: list[tuple[int, int]], normalize: bool) -> list[list[np.ndarray]]:
+    """Decode the requested frames of one DICOM file once; returns per-frame lists of arrays (one per size)."""
+    decoded = dicom.decode_frames(data, frames=frames)
+    per_size = [dicom.to_model_input(decoded, size) * (1.0 if normalize else 255.0) for size in sizes]
+    return [[batch[k] for batch in per_size] for k in range(len(frames))]
+
+
+def decode_slices(
+    slices: list[tuple[str, bytes]],
+    sizes: Iterable[tuple[int, int]] = ((224, 224),),
+    normalize: bool = True,
+    max_workers: Optional[int] = None,
+) -> dict[tuple[int, int], np.ndarray]:
+    """
+    Decode every slice once and resize to each requested size in a thread pool.
+    Returns {size: (N, H, W, 3) float32} so models with different input sizes share one decode pass.
+    """
+    sizes = [tuple(s) for s in dict.fromkeys(tuple(s) for s in sizes)]
+    # Frames of the same DICOM file are decoded together (one parse per file)
+    jobs, dicom_jobs = [], {}
+    for pos, (name, data) in enumerate(slices):
+        if _is_dicom_entry(name, data):
+            entry = dicom_jobs.setdefault(id(data), (data, []))
+            entry[1].append((pos, dicom.parse_frame_name(name)[1]))
+        else:
+            jobs.append((pos, data))
+    decoded = [None] * len(slices)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        image_futures = [(pos, pool.submit(_decode_one, data, sizes, normalize)) for pos, data in jobs]
+        dicom_futures = [
+            (wanted, pool.submit(_decode_dicom, data, [f for _, f in wanted], sizes, normalize))
+            for data, wanted in dicom_jobs.values()
+        ]
+        for pos, future in image_futures:
+            decoded[pos] = future.result()
+        for wanted, future in dicom_futures:
+            for (pos, _), arrays in zip(wanted, future.result()):
+                decoded[pos] = arrays
+    return {
+        size: np.stack([d[i] for d in decoded]).astype(np.float32) if decoded
+        else np.zeros((0, size[0], size[1], 3), dtype=np.float32)
+        for i, size in enumerate(sizes)
+    }
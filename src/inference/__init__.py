@@ -1,6 +1,7 @@
 from .predict import (
     load_model,
     load_model_and_predict,
+    predict_batch,
     predict_from_bytes,
     MODEL_INPUT_SIZES,
     MODEL_PATHS,
@@ -10,6 +11,7 @@ from .saliency import generate_saliency_map
 __all__ = [
     "load_model",
     "load_model_and_predict",
+    "predict_batch",
     "predict_from_bytes",
     "generate_saliency_map",
     "MODEL_INPUT_SIZES",
@@ -0,0 +1,36 @@
+"""
+CPU latency measurement for loaded models (used by distillation / compression reports and evaluate_models).
+"""
+import time
+from typing import Sequence
+
+import numpy as np
+
+
+def measure_latency(model, input_size: Sequence[int] = (224, 224), batch_size: int = 1, runs: int = 30, warmup: int = 3) -> dict:
+    """
+    Time model.predict_on_batch on random input of shape (batch_size, H, W, 3).
+    Returns milliseconds per batch (mean, p50, p95) and images/s; warm-up calls (graph tracing) are excluded.
+    """
+    h, w = int(input_size[0]), int(input_size[1])
+    x = np.random.default_rng(0).random((batch_size, h, w, 3), dtype=np.float32)
+    for _ in range(warmup):
+        model.predict_on_batch(x)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.predict_on_batch(x)
+        times.append((time.perf_counter() - start) * 1000.0)
+    times = np.asarray(times)
+    mean = float(times.mean())
+    return {
+        "batch_size": batch_size,
+        "mean_ms": mean,
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "images_per_s": batch_size * 1000.0 / mean if mean > 0 else 0.0,
+    }
+
+
+def count_params(model) -> int:
+    return int(sum(np.prod(v.shape) for v in model.weights))
@@ -0,0 +1,87 @@
+"""
+ONNX export of trained models for the ONNX Runtime backend (src.inference.predict.OnnxBackend).
+
+The exported graph takes the normalized (N, H, W, C) float32 batch and returns [probs, embedding] (the
+pooled features used for similar cases), so one session run serves classification and retrieval.
+Grad-CAM needs gradients and stays on the Keras backend. Every export is checked against the Keras model
+on the same inputs before it replaces a previous one.
+Conversion uses tf2onnx (pip install tf2onnx onnx onnxruntime).
+"""
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_OPSET = 17
+
+
+def _tf2onnx():
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("ONNX export requires tf2onnx and onnx: pip install tf2onnx onnx onnxruntime") from e
+    return tf2onnx
+
+
+def serving_model(model):
+    """keras.Model mapping the classifier's input to [probs, embedding] (probs only if it has no pooled embedding)."""
+    from tensorflow import keras
+
+    from .heads import split_model
+
+    try:
+        trunk, head = split_model(model)
+    except ValueError:
+        return keras.Model(model.input, [model.output], name=f"{model.name}_serving")
+    embedding, probs = head(trunk(model.input))
+    return keras.Model(model.input, [probs, embedding], name=f"{model.name}_serving")
+
+
+def export_onnx(model, path, opset: int = DEFAULT_OPSET) -> Path:
+    """
+    Convert a Keras classifier to ONNX at `path` (input "image" with a dynamic batch dimension,
+    outputs [probs, embedding]). Written to a temporary file and renamed into place.
+    """
+    import tensorflow as tf
+
+    tf2onnx = _tf2onnx()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    serving = serving_model(model)
+    spec = (tf.TensorSpec((None, *model.input_shape[1:]), tf.float32, name="image"),)
+
+    @tf.function(input_signature=spec)
+    def serve(image):
+        outputs = serving(image, training=False)
+        return tuple(outputs) if isinstance(outputs, (list, tuple)) else (outputs,)
+
+    tmp = path.with_name(f".{path.name}.tmp")
+    tf2onnx.convert.from_function(serve, input_signature=spec, opset=opset, output_path=str(tmp))
+    os.replace(tmp, path)
+    return path
+
+
+def check_equivalence(model, onnx_path, image_batch: Optional[np.ndarray] = None, atol: float = 1e-4, seed: int = 0) -> dict:
+    """
+    Run the Keras model and the ONNX export on the same batch (random images in [0, 1) if none is given).
+    Returns {"max_abs_diff_probs", "max_abs_diff_embedding", "argmax_agreement", "passed"}; passed requires
+    every probability within atol and identical predicted classes.
+    """
+    from .predict import OnnxBackend
+
+    if image_batch is None:
+        image_batch = np.random.default_rng(seed).random((8, *model.input_shape[1:]), dtype=np.float32)
+    expected = [np.asarray(t) for t in serving_model(model)(image_batch, training=False)]
+    actual = OnnxBackend(onnx_path).forward(image_batch)
+    diff_probs = float(np.abs(expected[0] - actual["probs"]).max())
+    diff_embedding = None
+    if len(expected) > 1 and actual["embedding"] is not None:
+        diff_embedding = float(np.abs(expected[1] - actual["embedding"]).max())
+    agreement = float((expected[0].argmax(axis=-1) == actual["probs"].argmax(axis=-1)).mean())
+    return {
+        "max_abs_diff_probs": diff_probs,
+        "max_abs_diff_embedding": diff_embedding,
+        "argmax_agreement": agreement,
+        "passed": diff_probs <= atol and agreement == 1.0,
+    }
@@ -0,0 +1,92 @@
+"""
+Multi-output wrapper: one forward pass yields class probabilities, the pooled embedding and the last
+conv feature map, so classification, similar-case lookup and Grad-CAM share a single pass.
+The feature map is the input of the global pooling layer (the custom CNN's `gap`, or the pooling layer
+at the end of the Xception / EfficientNet backbone); the embedding is that layer's output.
+TensorFlow is imported lazily to avoid protobuf errors at app startup.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def split_model(model) -> tuple:
+    """
+    (trunk, head) sub-models sharing the classifier's weights: trunk maps the input to the feature map,
+    head maps the feature map to [embedding, probs].
+    """
+    from tensorflow import keras
+
+    names = [layer.name for layer in model.layers]
+    if "gap" in names:
+        gap = model.get_layer("gap")
+        trunk = keras.Model(model.input, gap.input, name="trunk")
+        head_layers = model.layers[names.index("gap"):]
+    else:
+        backbone = next((layer for layer in model.layers if isinstance(layer, keras.Model)), None)
+        if backbone is None:
+            raise ValueError(f"No pooled embedding layer found in {model.name}")
+        pool = backbone.layers[-1]
+        features = keras.Model(backbone.input, pool.input, name=f"{backbone.name}_features")
+        trunk = keras.Model(model.input, features(model.input), name="trunk")
+        head_layers = [pool] + model.layers[names.index(backbone.name) + 1:]
+    # The head is a chain: global pooling -> [dense / dropout ...] -> output
+    inputs = keras.Input(shape=trunk.output.shape[1:], name="features")
+    embedding = head_layers[0](inputs)
+    x = embedding
+    for layer in head_layers[1:]:
+        x = layer(x)
+    return trunk, keras.Model(inputs, [embedding, x], name="head")
+
+
+def multi_output_model(model):
+    """keras.Model mapping the classifier's input to {"probs", "embedding", "features"} (shares its weights)."""
+    from tensorflow import keras
+
+    trunk, head = split_model(model)
+    features = trunk(model.input)
+    embedding, probs = head(features)
+    return keras.Model(
+        model.input,
+        {"probs": probs, "embedding": embedding, "features": features},
+        name=f"{model.name}_heads",
+    )
+
+
+def run_heads(heads, image_batch: np.ndarray, class_idx: Optional[int] = None, gradcam: bool = True) -> dict:
+    """
+    One pass of a multi_output_model over (N, H, W, C) images.
+    Returns {"probs" (N, C), "embedding" (N, D), "gradcam" (N, H, W) in [0, 1] or None}. Grad-CAM weights
+    the feature map by the pooled gradient of the predicted (or class_idx) probability; the gradient
+    only flows back through the head, not the backbone.
+    """
+    import tensorflow as tf
+
+    from src.tracing import span
+
+    model_name = heads.name.removesuffix("_heads")
+    with span("inference", model=model_name, backend="keras", batch=len(image_batch)):
+        images = tf.convert_to_tensor(image_batch, dtype=tf.float32)
+        features = heads.get_layer("trunk")(images, training=False)
+        with tf.GradientTape(watch_accessed_variables=False) as tape:
+            tape.watch(features)
+            embedding, probs = heads.get_layer("head")(features, training=False)
+            idx = tf.argmax(probs, axis=-1) if class_idx is None else tf.fill([tf.shape(probs)[0]], tf.cast(class_idx, tf.int64))
+            score = tf.reduce_sum(tf.gather(probs, idx, axis=1, batch_dims=1))
+        result = {"probs": probs.numpy(), "embedding": embedding.numpy(), "gradcam": None}
+    if gradcam:
+        with span("saliency", model=model_name, method="gradcam"):
+            result["gradcam"] = grad_cam(features, tape.gradient(score, features), image_batch.shape[1:3])
+    return result
+
+
+def grad_cam(features, grads, size) -> np.ndarray:
+    """(N, H, W) Grad-CAM maps from (N, h, w, K) features and their gradients, upsampled to size, each scaled to [0, 1]."""
+    import tensorflow as tf
+
+    weights = tf.reduce_mean(grads, axis=(1, 2), keepdims=True)
+    cam = tf.nn.relu(tf.reduce_sum(weights * features, axis=-1, keepdims=True))
+    cam = tf.image.resize(cam, tuple(size), method="bilinear")[..., 0].numpy()
+    lo = cam.min(axis=(1, 2), keepdims=True)
+    hi = cam.max(axis=(1, 2), keepdims=True)
+    return (cam - lo) / (hi - lo + 1e-8)
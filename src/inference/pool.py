@@ -0,0 +1,419 @@
+"""
+Multi-process inference over ONNX exports, with model weights shared by every process on the node.
+
+share_weights() optimizes an export (scripts/export_onnx.py) with ONNX Runtime and saves it as
+<model>.shared.onnx, a graph whose initializers are ONNX external data in one flat, 64-byte aligned
+<model>.weights file (+ a JSON manifest). shared_session() maps that file read-only and hands each
+initializer to ONNX Runtime as a pre-allocated OrtValue over the mapping. The graph is optimized ahead of
+time and weight prepacking is off, because both rewrite weights into private per-process buffers; this way
+sessions in any number of processes read the same page-cache pages. OnnxBackend uses the layout whenever
+it exists. The optimized graph is specific to the CPU it was written on: run share_weights on each node.
+
+InferencePool runs spawned worker processes that attach this way. Image batches and outputs travel through
+a ring of shared-memory slots: the task / result queues only carry slot numbers and shapes, and a request
+waits for a free slot when every slot is in flight. A worker that exits is restarted; its requests fail. Keras / TensorFlow variables cannot alias external
+memory, so the pool serves ONNX exports only; Grad-CAM stays on the Keras backend in the app process.
+"""
+import atexit
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALIGN = 64
+MIN_SHARED_BYTES = 1024  # smaller initializers (shapes, pads, scalars) stay inline for shape inference
+DEFAULT_POOL = {
+    "workers": 2,
+    "slots": None,  # shared-memory slots in the ring; None = 2 per worker
+    "slot_mb": 32,  # per slot: input batch + outputs (a 16-image 299x299 batch is ~17 MB)
+    "threads": 1,  # ONNX Runtime intra-op threads per worker
+    "start_method": "spawn",  # fork is unsafe once TensorFlow has started its thread pools
+}
+
+
+def _onnx():
+    try:
+        import onnx
+    except ImportError as e:
+        raise ImportError("Sharing weights requires onnx: pip install onnx onnxruntime") from e
+    return onnx
+
+
+def shared_paths(onnx_path) -> tuple:
+    """(graph, weights, manifest) paths of the shared-weights layout for an ONNX export."""
+    onnx_path = Path(onnx_path)
+    stem = onnx_path.with_suffix("")
+    return (
+        stem.with_name(f"{stem.name}.shared.onnx"),
+        stem.with_name(f"{stem.name}.weights"),
+        stem.with_name(f"{stem.name}.weights.json"),
+    )
+
+
+def shared_layout_for(onnx_path) -> Optional[tuple]:
+    """shared_paths(onnx_path) if share_weights() has been run since the export was last written, else None."""
+    paths = shared_paths(onnx_path)
+    if all(p.exists() for p in paths) and paths[0].stat().st_mtime >= Path(onnx_path).stat().st_mtime:
+        return paths
+    return None
+
+
+def share_weights(onnx_path) -> Path:
+    """
+    Write the shared-weights layout of an ONNX export (see module docstring); returns the graph path.
+    The graph also loads on its own in ONNX Runtime, which then reads the external data into memory.
+    """
+    from .predict import _onnxruntime
+
+    ort = _onnxruntime()
+    onnx = _onnx()
+    from onnx import external_data_helper, numpy_helper
+
+    graph_path, weights_path, manifest_path = shared_paths(onnx_path)
+    optimized = graph_path.with_name(f".{graph_path.name}.optimized")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.optimized_model_filepath = str(optimized)
+    options.log_severity_level = 3  # the hardware-specific-graph warning is expected here
+    ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+    model = onnx.load(str(optimized))
+    optimized.unlink()
+    manifest = {}
+    offset = 0
+    tmp = weights_path.with_name(f".{weights_path.name}.tmp")
+    with open(tmp, "wb") as f:
+        for tensor in model.graph.initializer:
+            if tensor.data_type == onnx.TensorProto.STRING:
+                continue
+            array = np.ascontiguousarray(numpy_helper.to_array(tensor))
+            if array.nbytes < MIN_SHARED_BYTES:
+                continue
+            pad = -offset % ALIGN
+            f.write(b"\0" * pad)
+            offset += pad
+            f.write(array.tobytes())
+            tensor.CopyFrom(numpy_helper.from_array(array, tensor.name))
+            external_data_helper.set_external_data(tensor, weights_path.name, offset, array.nbytes)
+            tensor.ClearField("raw_data")
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+            manifest[tensor.name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+    os.replace(tmp, weights_path)
+    tmp = manifest_path.with_name(f".{manifest_path.name}.tmp")
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, manifest_path)
+    tmp = graph_path.with_name(f".{graph_path.name}.tmp")
+    onnx.save(model, str(tmp))
+    os.replace(tmp, graph_path)  # written last: its mtime marks the layout as complete
+    return graph_path
+
+
+def shared_session(onnx_path, options) -> Optional[tuple]:
+    """
+    (session, weights) for an export with a shared-weights layout, None without one. The initializers are
+    OrtValues over a read-only mapping of the weights file; keep `weights` alive as long as the session.
+    """
+    from .predict import _onnxruntime
+
+    layout = shared_layout_for(onnx_path)
+    if layout is None:
+        return None
+    ort = _onnxruntime()
+    graph_path, weights_path, manifest_path = layout
+    mapped = np.memmap(weights_path, dtype=np.uint8, mode="r")
+    weights = []
+    for name, spec in json.loads(manifest_path.read_text()).items():
+        array = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=mapped, offset=spec["offset"])
+        value = ort.OrtValue.ortvalue_from_numpy(array)
+        options.add_initializer(name, value)
+        weights.append(value)
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC  # optimized by share_weights
+    options.add_session_config_entry("session.disable_prepacking", "1")  # prepacked copies would be per-process
+    session = ort.InferenceSession(str(graph_path), options, providers=["CPUExecutionProvider"])
+    return session, (mapped, weights)
+
+
+def process_memory(pid: int) -> dict:
+    """Resident memory of a process in MB: rss, pss (shared pages split between sharers), uss (private), shared."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def _worker(shm_name: str, slot_bytes: int, tasks, results, threads: int) -> None:
+    """Worker loop: run tasks (request id, model path, slot, input shape) on cached sessions."""
+    from .predict import OnnxBackend
+
+    ring = shared_memory.SharedMemory(name=shm_name)
+    models = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request, path, slot, shape = task
+        try:
+            if path not in models:
+                models[path] = OnnxBackend(path, intra_op_threads=threads, inter_op_threads=1)
+            model = models[path]
+            if slot is None:  # describe
+                outputs = [tuple(o.shape[1:]) for o in model.session.get_outputs()]
+                results.put((request, {"input_shape": model.input_shape, "outputs": outputs}, None))
+                continue
+            start = slot * slot_bytes
+            images = np.ndarray(shape, dtype=np.float32, buffer=ring.buf, offset=start)
+            outputs = model.session.run(None, {model.input_name: images})
+            offset = start + images.nbytes
+            shapes = []
+            for out in outputs:
+                out = np.asarray(out, dtype=np.float32)
+                if offset + out.nbytes > start + slot_bytes:
+                    raise ValueError(f"Outputs do not fit in a {slot_bytes >> 20} MB slot")
+                np.ndarray(out.shape, dtype=np.float32, buffer=ring.buf, offset=offset)[...] = out
+                shapes.append(out.shape)
+                offset += out.nbytes
+            del images
+            results.put((request, shapes, None))
+        except Exception as e:
+            results.put((request, None, f"{type(e).__name__}: {e}"))
+    ring.close()
+
+
+class InferencePool:
+    """
+    Worker processes serving ONNX exports (see module docstring). forward(path, batch) splits the batch
+    into slot-sized chunks, which run in parallel across workers; client(path) wraps one model as an
+    OnnxBackend-like object. Each worker attaches a model on its first request for it. Every worker has its
+    own task queue, so when one exits (e.g. OOM-killed) only its requests fail, their slots are reused and
+    the worker is restarted.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        slots: Optional[int] = None,
+        slot_mb: int = 32,
+        threads: int = 1,
+        start_method: str = "spawn",
+    ):
+        self._ctx = mp.get_context(start_method)
+        self._threads = threads
+        self.slot_bytes = int(slot_mb) << 20
+        self.num_slots = int(slots or 2 * workers)
+        self._ring = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_bytes)
+        self._results = self._ctx.Queue()
+        self._free = queue.Queue()
+        for slot in range(self.num_slots):
+            self._free.put(slot)
+        self._pending = {}  # request -> (future, slot, input shape, worker)
+        self._assigned = [set() for _ in range(workers)]  # worker -> requests sent to it
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._closed = False
+        self._tasks = [self._ctx.Queue() for _ in range(workers)]
+        self.workers = [self._start_worker(i) for i in range(workers)]
+        self._collector = threading.Thread(target=self._collect, name="inference-pool-results", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index: int):
+        process = self._ctx.Process(
+            target=_worker,
+            args=(self._ring.name, self.slot_bytes, self._tasks[index], self._results, self._threads),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _check_workers(self) -> None:
+        """Fail the requests of workers that exited, return their slots and start replacements."""
+        with self._restart_lock:
+            for i, process in enumerate(self.workers):
+                if self._closed or process.is_alive():
+                    continue
+                with self._lock:
+                    lost = [self._pending.pop(r) for r in self._assigned[i] if r in self._pending]
+                    self._assigned[i] = set()
+                    self._tasks[i] = self._ctx.Queue()
+                logger.error(
+                    "Inference worker %s exited (code %s); failing %d requests and restarting it",
+                    process.name, process.exitcode, len(lost),
+                )
+                self._fail_pending(lost, RuntimeError(f"Inference worker {process.name} exited"))
+                self.workers[i] = self._start_worker(i)
+
+    def _collect(self) -> None:
+        while True:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if self._closed:
+                    return
+                self._check_workers()
+                continue
+            if message is None:
+                return
+            request, payload, error = message
+            with self._lock:
+                entry = self._pending.pop(request, None)
+                if entry is not None:
+                    self._assigned[entry[3]].discard(request)
+            if entry is None:  # already failed (its worker exited) and its slot returned
+                continue
+            future, slot, input_shape, _ = entry
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            elif slot is None:
+                future.set_result(payload)
+            else:
+                offset = slot * self.slot_bytes + int(np.prod(input_shape)) * 4
+                outputs = []
+                for shape in payload:
+                    out = np.ndarray(shape, dtype=np.float32, buffer=self._ring.buf, offset=offset)
+                    outputs.append(out.copy())
+                    offset += out.nbytes
+                    del out
+                future.set_result(outputs)
+            if slot is not None:
+                self._free.put(slot)
+
+    def _fail_pending(self, entries, error: Exception) -> None:
+        """Fail the futures of (future, slot, shape, worker) entries removed from _pending; their slots are free again."""
+        for future, slot, _, _ in entries:
+            future.set_exception(error)
+            if slot is not None:
+                self._free.put(slot)
+
+    def _submit(self, path: str, batch: Optional[np.ndarray]) -> Future:
+        if self._closed:
+            raise RuntimeError("InferencePool is closed")
+        self._check_workers()
+        future = Future()
+        slot = None
+        if batch is not None:
+            if batch.nbytes > self.slot_bytes:
+                raise ValueError(f"Batch of {batch.nbytes >> 20} MB does not fit in a {self.slot_bytes >> 20} MB slot")
+            slot = self._free.get()  # blocks while every slot is in flight
+            view = np.ndarray(batch.shape, dtype=np.float32, buffer=self._ring.buf, offset=slot * self.slot_bytes)
+            view[...] = batch
+            del view
+        shape = None if batch is None else batch.shape
+        request = next(self._ids)
+        with self._lock:
+            worker = min(range(len(self.workers)), key=lambda i: len(self._assigned[i]))  # least loaded
+            self._pending[request] = (future, slot, shape, worker)
+            self._assigned[worker].add(request)
+            self._tasks[worker].put((request, path, slot, shape))
+        return future
+
+    def describe(self, path) -> dict:
+        """{"input_shape", "outputs"} of a model (as attached by a worker)."""
+        return self._submit(str(path), None).result()
+
+    def forward(self, path, image_batch: np.ndarray, chunk: Optional[int] = None) -> list:
+        """Outputs ([probs, embedding]) for a batch, in chunks of `chunk` images (default: as many as fit a slot)."""
+        batch = np.ascontiguousarray(image_batch, dtype=np.float32)
+        if chunk is None:
+            info = self.describe(path)
+            per_image = 4 * (int(np.prod(batch.shape[1:])) + sum(int(np.prod(s)) for s in info["outputs"]))
+            chunk = max(self.slot_bytes // per_image, 1)
+        futures = [self._submit(str(path), batch[i:i + chunk]) for i in range(0, len(batch), chunk)]
+        parts = [f.result() for f in futures]
+        return [np.concatenate([p[i] for p in parts]) for i in range(len(parts[0]))]
+
+    def client(self, path) -> "PoolBackend":
+        return PoolBackend(self, path)
+
+    def memory(self) -> dict:
+        """process_memory() of the calling process ("parent") and of every worker, by pid."""
+        report = {"parent": process_memory(os.getpid())}
+        for process in self.workers:
+            if process.is_alive():
+                report[process.pid] = process_memory(process.pid)
+        return report
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self.workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join(timeout=5)
+        self._ring.close()
+        self._ring.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoolBackend:
+    """One model served by an InferencePool, with the inference interface of OnnxBackend."""
+
+    def __init__(self, pool: InferencePool, path):
+        self.pool = pool
+        self.path = Path(path)
+        self.name = self.path.stem
+        info = pool.describe(self.path)
+        self.input_shape = tuple(info["input_shape"])
+        self._chunk = max(
+            pool.slot_bytes // (4 * (int(np.prod(self.input_shape[1:])) + sum(int(np.prod(s)) for s in info["outputs"]))),
+            1,
+        )
+
+    def forward(self, image_batch: np.ndarray) -> dict:
+        from src.tracing import span
+
+        with span("inference", model=self.name, backend="pool", batch=len(image_batch)):
+            outputs = self.pool.forward(self.path, image_batch, chunk=self._chunk)
+        return {"probs": outputs[0], "embedding": outputs[1] if len(outputs) > 1 else None, "gradcam": None}
+
+    def predict_on_batch(self, image_batch: np.ndarray) -> np.ndarray:
+        return self.pool.forward(self.path, image_batch, chunk=self._chunk)[0]
+
+    def __call__(self, image_batch, training: bool = False) -> np.ndarray:
+        return self.predict_on_batch(np.asarray(image_batch))
+
+    def predict(self, image_batch: np.ndarray, batch_size: int = 32, verbose=0) -> np.ndarray:
+        return self.predict_on_batch(image_batch)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_pool(settings: Optional[dict] = None) -> InferencePool:
+    """Process-wide InferencePool, started on first use with DEFAULT_POOL overridden by `settings`; closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool(**{**DEFAULT_POOL, **(settings or {})})
+            atexit.register(_pool.close)
+        return _pool
@@ -1,8 +1,12 @@
 """
 Load saved models and run prediction on single or batch images.
 Supports different input sizes per model (224 for custom_cnn/transfer, 299 for Xception).
+Two backends: "keras" (keras.models.load_model) and "onnx" (an ONNX Runtime CPU session over the export
+written by scripts/export_onnx.py, which never imports TensorFlow); "auto" uses ONNX when an up-to-date export exists.
+"pool" serves the export from the worker processes of src.inference.pool (weights shared between processes).
 TensorFlow is imported lazily to avoid protobuf version errors at app startup.
 """
+import os
 from pathlib import Path
 from typing import Optional, Tuple, Union
 
@@ -17,6 +21,7 @@ MODEL_PATHS = {
     "custom_cnn": "models/saved/custom_cnn_best.keras",
     "xception": "models/saved/xception_best.keras",
     "transfer": "models/saved/transfer_best.keras",
+    "distilled": "models/saved/distilled_best.keras",
 }
 
 # Input shape (height, width) per model for preprocessing
@@ -24,12 +29,21 @@ MODEL_INPUT_SIZES = {
     "custom_cnn": (224, 224),
     "xception": (299, 299),
     "transfer": (224, 224),
+    "distilled": (224, 224),
 }
 
 
 def get_model_path(model_name: str, project_root: Optional[Path] = None) -> Optional[Path]:
-    """Resolve path to saved model; returns None if not found."""
+    """
+    Resolve path to saved model: the production version in models/registry (src.inference.registry)
+    if the model has one, else MODEL_PATHS. Returns None if not found.
+    """
+    from .registry import ModelRegistry
+
     root = project_root or _project_root()
+    published = ModelRegistry(root).production_path(model_name)
+    if published is not None:
+        return published
     rel = MODEL_PATHS.get(model_name)
     if not rel:
         return None
@@ -37,13 +51,116 @@ def get_model_path(model_name: str, project_root: Optional[Path] = None) -> Opti
     return path if path.exists() else None
 
 
-def load_model(model_name: str, project_root: Optional[Path] = None):
-    """Load a saved Keras model by name. Returns None if file not found."""
+def _onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("The ONNX backend requires onnxruntime: pip install onnxruntime") from e
+    return onnxruntime
+
+
+def onnx_export_path(model_path: Path) -> Path:
+    """
+    Where the ONNX export of a model file goes: next to a models/saved file (same name, .onnx); for a registry
+    version, whose directory is immutable, models/registry/<name>/exports/<version>.onnx.
+    """
+    from .registry import EXPORTS_DIR, MODEL_FILE, REGISTRY_DIR
+
+    model_path = Path(model_path)
+    if model_path.name == MODEL_FILE and model_path.parents[2].name == Path(REGISTRY_DIR).name:
+        return model_path.parents[1] / EXPORTS_DIR / f"{model_path.parent.name}.onnx"
+    return model_path.with_suffix(".onnx")
+
+
+def onnx_path_for(model_path: Path) -> Optional[Path]:
+    """The ONNX export of a model file (onnx_export_path), if it exists and is not older than the model."""
+    onnx = onnx_export_path(model_path)
+    if onnx.exists() and onnx.stat().st_mtime >= Path(model_path).stat().st_mtime:
+        return onnx
+    return None
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime CPU session for an exported model, created once (all graph optimizations enabled) and reused.
+    Provides the parts of keras.Model used for inference (input_shape, __call__, predict_on_batch, predict)
+    and forward(), which returns probabilities and the pooled embedding from one run.
+    Thread counts default to the TensorFlow budget set by src.runtime (TF_NUM_INTRAOP/INTEROP_THREADS).
+    With a shared-weights layout (src.inference.pool.share_weights) the weights are mapped, not copied.
+    """
+
+    def __init__(self, path, intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None):
+        ort = _onnxruntime()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads or int(os.environ.get("TF_NUM_INTRAOP_THREADS", 0))
+        options.inter_op_num_threads = inter_op_threads or int(os.environ.get("TF_NUM_INTEROP_THREADS", 0))
+        self.path = Path(path)
+        self.name = self.path.stem
+        from .pool import shared_session
+
+        shared = shared_session(path, options)
+        if shared is not None:
+            self.session, self._shared_weights = shared
+        else:
+            self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = (None, *model_input.shape[1:])
+        self.output_names = [o.name for o in self.session.get_outputs()]  # [probs, embedding]
+
+    def forward(self, image_batch: np.ndarray) -> dict:
+        """{"probs" (N, C), "embedding" (N, D) or None, "gradcam": None}; ONNX Runtime computes no gradients."""
+        from src.tracing import span
+
+        with span("inference", model=self.name, backend="onnx", batch=len(image_batch)):
+            outputs = self.session.run(None, {self.input_name: np.asarray(image_batch, dtype=np.float32)})
+        return {"probs": outputs[0], "embedding": outputs[1] if len(outputs) > 1 else None, "gradcam": None}
+
+    def predict_on_batch(self, image_batch: np.ndarray) -> np.ndarray:
+        return self.session.run(self.output_names[:1], {self.input_name: np.asarray(image_batch, dtype=np.float32)})[0]
+
+    def __call__(self, image_batch, training: bool = False) -> np.ndarray:
+        return self.predict_on_batch(np.asarray(image_batch))
+
+    def predict(self, image_batch: np.ndarray, batch_size: int = 32, verbose=0) -> np.ndarray:
+        return np.concatenate([
+            self.predict_on_batch(image_batch[i:i + batch_size]) for i in range(0, len(image_batch), batch_size)
+        ])
+
+
+def open_model(path: Path, backend: str = "keras"):
+    """
+    Load a model file with the given backend: "keras", "onnx" (export required), "pool" (export required;
+    served by src.inference.pool.default_pool) or "auto" (ONNX when onnx_path_for finds an up-to-date export, else Keras).
+    """
+    from src.tracing import span
+
+    if backend not in ("keras", "onnx", "pool", "auto"):
+        raise ValueError(f"Unknown inference backend: {backend} (expected keras, onnx, pool or auto)")
+    if backend != "keras":
+        onnx = onnx_path_for(path)
+        if onnx is not None and backend == "pool":
+            from .pool import default_pool
+
+            with span("model.load", path=str(onnx), backend="pool"):
+                return default_pool().client(onnx)
+        if onnx is not None:
+            with span("model.load", path=str(onnx), backend="onnx"):
+                return OnnxBackend(onnx)
+        if backend in ("onnx", "pool"):
+            raise FileNotFoundError(f"No up-to-date ONNX export for {path}: run scripts/export_onnx.py")
+    with span("model.load", path=str(path), backend="keras"):
+        from tensorflow import keras
+        return keras.models.load_model(str(path))
+
+
+def load_model(model_name: str, project_root: Optional[Path] = None, backend: str = "keras"):
+    """Load a saved model by name with the given backend (see open_model). Returns None if file not found."""
     path = get_model_path(model_name, project_root)
     if path is None:
         return None
-    from tensorflow import keras
-    return keras.models.load_model(str(path))
+    return open_model(path, backend)
 
 
 def load_model_and_predict(
@@ -51,6 +168,7 @@ def load_model_and_predict(
     image_batch: np.ndarray,
     class_names: Optional[list] = None,
     project_root: Optional[Path] = None,
+    tta: Optional[dict] = None,
 ) -> Tuple[Optional[list], Optional[np.ndarray]]:
     """
     Load model by name and return predicted class labels and probabilities.
@@ -59,7 +177,29 @@ def load_model_and_predict(
     model = load_model(model_name, project_root)
     if model is None:
         return None, None
-    probs = model.predict(image_batch, verbose=0)
+    return predict_batch(model, image_batch, class_names, tta=tta)
+
+
+def predict_batch(
+    model,
+    image_batch: np.ndarray,
+    class_names: Optional[list] = None,
+    tta: Optional[dict] = None,
+) -> Tuple[list, np.ndarray]:
+    """
+    Run an already-loaded model on (N, H, W, C) and return (labels, probabilities).
+    tta: `tta` settings (see src.inference.tta); with enabled: true, low-confidence images are
+    re-scored with test-time augmentation.
+    """
+    from src.tracing import span
+
+    with span("inference", model=model.name, batch=len(image_batch)):
+        if tta and tta.get("enabled"):
+            from .tta import predict_with_tta
+
+            probs, _ = predict_with_tta(model, image_batch, tta)
+        else:
+            probs = model.predict(image_batch, verbose=0)
     preds = np.argmax(probs, axis=-1)
     if class_names and len(class_names) > 0:
         pred_labels = [class_names[i] for i in preds]
@@ -73,16 +213,18 @@ def predict_from_bytes(
     image_bytes: bytes,
     class_names: Optional[list] = None,
     project_root: Optional[Path] = None,
+    tta: Optional[dict] = None,
 ) -> Tuple[Optional[str], Optional[float], Optional[np.ndarray]]:
     """
     Preprocess image from bytes, run prediction for one model.
     Returns (predicted_label, confidence, full_probabilities) or (None, None, None) if model missing.
+    tta: optional test-time augmentation settings, applied only below their confidence threshold.
     """
     from src.data.dataset import load_image_from_bytes
 
     size = MODEL_INPUT_SIZES.get(model_name, (224, 224))
     batch = load_image_from_bytes(image_bytes, target_size=size, normalize=True)
-    labels, probs = load_model_and_predict(model_name, batch, class_names, project_root)
+    labels, probs = load_model_and_predict(model_name, batch, class_names, project_root, tta=tta)
     if labels is None or probs is None:
         return None, None, None
     idx = np.argmax(probs[0])
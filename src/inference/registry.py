@@ -0,0 +1,386 @@
+"""
+Versioned model store and a hot-swapping model server.
+
+Layout: models/registry/<name>/<version>/{model.keras, metadata.json}; ONNX exports of versions go to
+models/registry/<name>/exports/<version>.onnx (scripts/export_onnx.py). A version directory is staged under
+a temporary name and renamed into place, and is never modified afterwards. Its metadata records metrics,
+input size, class order and the file's SHA-256. models/registry/<name>/routing.json picks what is served:
+{"production": version, "candidate": version or null, "candidate_percent": 0-100, "mode": "ab" | "shadow"}.
+
+ModelServer polls routing.json and loads and warms new versions in a background thread. Once a version is
+ready, it swaps the served version under a lock, so requests never wait for a reload. A model with no
+registry entry falls back to MODEL_PATHS, versioned by file mtime, so overwriting that file also hot-reloads.
+Traffic is bucketed by a hash of the request key (the upload digest), so a scan always gets the same version.
+In "ab" mode the candidate answers its share of requests. In "shadow" mode it only runs in the background,
+and its agreement with production is appended to models/registry/<name>/shadow.jsonl.
+TensorFlow is imported lazily to avoid protobuf errors at app startup.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = "models/registry"
+MODEL_FILE = "model.keras"
+EXPORTS_DIR = "exports"
+DEFAULT_ROUTING = {"production": None, "candidate": None, "candidate_percent": 0, "mode": "ab"}
+
+
+def _project_root() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def _file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Atomic write (temp file + rename), so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def traffic_bucket(name: str, key: Optional[str]) -> int:
+    """Stable bucket 0-99 for a request key (None -> 99, i.e. production unless candidate_percent is 100)."""
+    if key is None:
+        return 99
+    return int(hashlib.sha256(f"{name}:{key}".encode()).hexdigest()[:8], 16) % 100
+
+
+class ModelRegistry:
+    """Immutable model versions under <root>/models/registry/<name>/ and their routing."""
+
+    def __init__(self, root: Optional[Path] = None, directory: str = REGISTRY_DIR):
+        self.root = Path(root or _project_root()) / directory
+
+    def versions(self, name: str) -> list:
+        """Published versions of a model, oldest first."""
+        model_dir = self.root / name
+        if not model_dir.is_dir():
+            return []
+        return sorted(d.name for d in model_dir.iterdir() if d.is_dir() and (d / "metadata.json").exists())
+
+    def model_path(self, name: str, version: str) -> Path:
+        return self.root / name / version / MODEL_FILE
+
+    def metadata(self, name: str, version: str) -> dict:
+        return json.loads((self.root / name / version / "metadata.json").read_text())
+
+    def publish(
+        self,
+        name: str,
+        model_path,
+        metrics: Optional[dict] = None,
+        class_names: Optional[Sequence[str]] = None,
+        input_size: Optional[Sequence[int]] = None,
+    ) -> str:
+        """
+        Copy a saved model into a new immutable version ("v001", "v002", ...) and return its id.
+        A file whose SHA-256 matches an existing version is not stored twice (that version is returned).
+        input_size defaults to the model's input shape (the model is loaded to read it).
+        """
+        model_path = Path(model_path)
+        sha = _file_sha256(model_path)
+        for version in self.versions(name):
+            if self.metadata(name, version).get("sha256") == sha:
+                return version
+        if input_size is None:
+            from tensorflow import keras
+
+            input_size = keras.models.load_model(str(model_path), compile=False).input_shape[1:3]
+        model_dir = self.root / name
+        model_dir.mkdir(parents=True, exist_ok=True)
+        staging = model_dir / f".staging-{uuid.uuid4().hex[:8]}"
+        staging.mkdir()
+        try:
+            shutil.copy2(model_path, staging / MODEL_FILE)
+            while True:
+                existing = self.versions(name)
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:03d}"
+                (staging / "metadata.json").write_text(json.dumps({
+                    "name": name,
+                    "version": version,
+                    "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "source": str(model_path),
+                    "sha256": sha,
+                    "size_bytes": model_path.stat().st_size,
+                    "input_size": [int(s) for s in input_size],
+                    "class_names": list(class_names) if class_names else None,
+                    "metrics": metrics or {},
+                }, indent=2))
+                try:
+                    os.rename(staging, model_dir / version)  # fails if a concurrent publish took this id
+                    return version
+                except OSError:
+                    if not (model_dir / version).exists():
+                        raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def routing(self, name: str) -> dict:
+        """routing.json merged over DEFAULT_ROUTING."""
+        path = self.root / name / "routing.json"
+        return {**DEFAULT_ROUTING, **(json.loads(path.read_text()) if path.exists() else {})}
+
+    def set_routing(self, name: str, **changes) -> dict:
+        """Update routing.json (production, candidate, candidate_percent, mode); versions must exist."""
+        routing = {**self.routing(name), **changes}
+        for role in ("production", "candidate"):
+            if routing[role] is not None and routing[role] not in self.versions(name):
+                raise ValueError(f"Unknown version for {name}: {routing[role]}")
+        if routing["mode"] not in ("ab", "shadow"):
+            raise ValueError(f"Unknown routing mode: {routing['mode']} (expected ab or shadow)")
+        routing["candidate_percent"] = int(min(max(routing["candidate_percent"], 0), 100))
+        (self.root / name).mkdir(parents=True, exist_ok=True)
+        _write_json(self.root / name / "routing.json", routing)
+        return routing
+
+    def promote(self, name: str, version: str) -> dict:
+        """Serve `version` to all traffic; it stops being the candidate if it was one."""
+        routing = self.routing(name)
+        if routing["candidate"] == version:
+            return self.set_routing(name, production=version, candidate=None, candidate_percent=0)
+        return self.set_routing(name, production=version)
+
+    def routed_versions(self, name: str) -> list:
+        """Production and candidate versions (those a ModelServer loads), production first."""
+        routing = self.routing(name)
+        return [v for v in (routing["production"], routing["candidate"]) if v]
+
+    def production_path(self, name: str) -> Optional[Path]:
+        """Model file of the production version, or None if the model has none."""
+        version = self.routing(name)["production"]
+        return self.model_path(name, version) if version else None
+
+
+class ModelServer:
+    """
+    Process-wide holder of the served model versions. route() picks the version for a request;
+    entry() returns {"model", "heads", "version", "input_size", "metadata", "backend", "warmup"} for it, loaded
+    and warmed (warmup: settings from src.inference.warmup.warmup_settings; default batch size 1 only).
+    backend: "keras", "onnx", "pool" or "auto" (src.inference.predict.open_model); ONNX / pool entries have no heads
+    (no Grad-CAM).
+    """
+
+    def __init__(
+        self, root: Optional[Path] = None, poll_interval: float = 5.0, warmup: Optional[dict] = None, backend: str = "keras"
+    ):
+        self.root = Path(root or _project_root())
+        self.backend = backend
+        self.registry = ModelRegistry(self.root)
+        self.poll_interval = poll_interval
+        self.warmup = {"enabled": True, "batch_sizes": [1], "gradcam_batch_sizes": [1], **(warmup or {})}
+        self._lock = threading.Lock()
+        self._loaded = {}  # (name, version) -> entry
+        self._loading = {}  # (name, version) -> Future
+        self._failed = {}  # (name, version) -> (error, files signature at the failed attempt)
+        self._active = {}  # name -> production version being served
+        self._routing = {}  # name -> last routing read
+        self._checked = {}  # name -> time of the last poll
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._shadow = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-shadow")
+
+    def _read_routing(self, name: str) -> dict:
+        if self.registry.versions(name):
+            return self.registry.routing(name)
+        from .predict import MODEL_PATHS
+
+        path = self.root / MODEL_PATHS.get(name, f"models/saved/{name}_best.keras")
+        version = f"saved-{path.stat().st_mtime_ns}" if path.exists() else None
+        return {**DEFAULT_ROUTING, "production": version}
+
+    def _model_path(self, name: str, version: str) -> Path:
+        if version.startswith("saved-"):
+            from .predict import MODEL_PATHS
+
+            return self.root / MODEL_PATHS.get(name, f"models/saved/{name}_best.keras")
+        return self.registry.model_path(name, version)
+
+    def _files_signature(self, name: str, version: str) -> tuple:
+        """mtimes of a version's model file and ONNX export (None if missing): a failed load is retried when they change."""
+        from .predict import onnx_export_path
+
+        path = self._model_path(name, version)
+        return tuple(p.stat().st_mtime_ns if p.exists() else None for p in (path, onnx_export_path(path)))
+
+    def _load(self, name: str, version: str) -> dict:
+        """Load, warm and register one version; the served production version switches here once ready."""
+        from .heads import multi_output_model
+        from .pool import PoolBackend
+        from .predict import OnnxBackend, open_model
+        from .warmup import warm_up_model
+
+        started = time.perf_counter()
+        model = open_model(self._model_path(name, version), self.backend)
+        input_size = tuple(int(s) for s in model.input_shape[1:3])
+        heads = None
+        if not isinstance(model, (OnnxBackend, PoolBackend)):
+            try:
+                heads = multi_output_model(model)
+            except ValueError:  # no pooled embedding layer: plain classifier only
+                pass
+        load_seconds = time.perf_counter() - started
+        warmup = {"seconds": 0.0, "batch_sizes": [], "gradcam_batch_sizes": []}
+        if self.warmup["enabled"]:
+            warmup = warm_up_model(model, heads, input_size, self.warmup["batch_sizes"], self.warmup["gradcam_batch_sizes"])
+        metadata = {} if version.startswith("saved-") else self.registry.metadata(name, version)
+        entry = {
+            "model": model,
+            "heads": heads,
+            "version": version,
+            "input_size": input_size,
+            "metadata": metadata,
+            "backend": "onnx" if isinstance(model, OnnxBackend) else "pool" if isinstance(model, PoolBackend) else "keras",
+            "warmup": {**warmup, "load_seconds": load_seconds},
+        }
+        with self._lock:
+            self._loaded[(name, version)] = entry
+            self._loading.pop((name, version), None)
+            self._failed.pop((name, version), None)
+            if version == self._routing.get(name, {}).get("production") or name not in self._active:
+                self._active[name] = version
+            self._evict(name)
+        logger.info("Loaded %s %s in %.2fs (warm-up %.2fs)", name, version, load_seconds, warmup["seconds"])
+        return entry
+
+    def _load_in_background(self, name: str, version: str) -> None:
+        def job():
+            try:
+                self._load(name, version)
+            except Exception as e:  # keep serving the current version; retried once its files change
+                logger.error("Loading %s %s failed (not retried until its files change): %s", name, version, e)
+                with self._lock:
+                    self._loading.pop((name, version), None)
+                    self._failed[(name, version)] = (f"{type(e).__name__}: {e}", signature)
+
+        signature = self._files_signature(name, version)
+        with self._lock:
+            if (name, version) in self._loaded or (name, version) in self._loading:
+                return
+            failed = self._failed.get((name, version))
+            if failed is not None and failed[1] == signature:
+                return
+            self._loading[(name, version)] = self._loader.submit(job)
+
+    def _evict(self, name: str) -> None:
+        """Drop versions of `name` that are neither served nor wanted (caller holds the lock)."""
+        routing = self._routing.get(name, {})
+        keep = {self._active.get(name), routing.get("production"), routing.get("candidate")}
+        for key in [k for k in self._loaded if k[0] == name and k[1] not in keep]:
+            del self._loaded[key]
+
+    def refresh(self, name: str, force: bool = False) -> dict:
+        """Re-read routing (at most every poll_interval seconds) and start loading new versions."""
+        now = time.monotonic()
+        if force or now - self._checked.get(name, -self.poll_interval) >= self.poll_interval:
+            self._checked[name] = now
+            routing = self._read_routing(name)
+            with self._lock:
+                self._routing[name] = routing
+                if self._active.get(name) is not None and routing["production"] is None:
+                    self._active.pop(name)  # model removed
+                elif (name, routing["production"]) in self._loaded:
+                    self._active[name] = routing["production"]  # e.g. a warm candidate promoted
+                    self._evict(name)
+            for role in ("production", "candidate"):
+                if routing[role] and name in self._active:
+                    self._load_in_background(name, routing[role])
+        return self._routing[name]
+
+    def route(self, name: str, key: Optional[str] = None) -> Optional[dict]:
+        """
+        {"version", "role": "production" | "candidate", "shadow": candidate version or None} for one request,
+        or None if the model has no version. The first request for a model loads it synchronously
+        (nothing else to serve); later versions are swapped in only once they are warm.
+        """
+        routing = self.refresh(name)
+        if routing["production"] is None:
+            return None
+        if name not in self._active:
+            self.entry(name, routing["production"])
+            self.refresh(name, force=True)  # also starts the candidate
+        with self._lock:
+            active = self._active[name]
+            candidate = routing["candidate"]
+            ready = candidate is not None and candidate != active and (name, candidate) in self._loaded
+        if ready and traffic_bucket(name, key) < routing["candidate_percent"]:
+            if routing["mode"] == "ab":
+                return {"version": candidate, "role": "candidate", "shadow": None}
+            return {"version": active, "role": "production", "shadow": candidate}
+        return {"version": active, "role": "production", "shadow": None}
+
+    def entry(self, name: str, version: str) -> dict:
+        """Loaded entry for a version; loads it in the calling thread if it is not loaded yet."""
+        with self._lock:
+            entry = self._loaded.get((name, version))
+        return entry if entry is not None else self._load(name, version)
+
+    def status(self, name: str) -> dict:
+        """{"routing", "active", "loaded": [versions], "loading": [versions], "failed": {version: error}} for display."""
+        with self._lock:
+            return {
+                "routing": dict(self._routing.get(name, {})),
+                "active": self._active.get(name),
+                "loaded": sorted(v for n, v in self._loaded if n == name),
+                "loading": sorted(v for n, v in self._loading if n == name),
+                "failed": {v: f[0] for (n, v), f in self._failed.items() if n == name},
+            }
+
+    def record_shadow(self, name: str, key: str, version: str, probs: np.ndarray, shadow: str, image_batch: np.ndarray) -> None:
+        """Run the shadow version on the same batch off the request path and log its agreement with production."""
+        def job():
+            try:
+                shadow_probs = np.asarray(self.entry(name, shadow)["model"](image_batch, training=False))
+            except Exception:
+                logger.exception("Shadow run of %s %s failed", name, shadow)
+                return
+            record = {
+                "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "key": key,
+                "production": version,
+                "candidate": shadow,
+                "agree": bool(np.argmax(probs, axis=-1)[0] == np.argmax(shadow_probs, axis=-1)[0]),
+                "production_confidence": float(np.max(probs[0])),
+                "candidate_confidence": float(np.max(shadow_probs[0])),
+                "abs_diff": float(np.abs(np.asarray(probs) - shadow_probs).max()),
+            }
+            path = self.registry.root / name / "shadow.jsonl"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+        self._shadow.submit(job)
+
+
+def shadow_summary(name: str, root: Optional[Path] = None) -> dict:
+    """Agreement per candidate version from shadow.jsonl: {candidate: {"requests", "agreement", "mean_abs_diff"}}."""
+    path = ModelRegistry(root).root / name / "shadow.jsonl"
+    totals = {}
+    if path.exists():
+        for line in path.read_text().splitlines():
+            record = json.loads(line)
+            t = totals.setdefault(record["candidate"], {"requests": 0, "agree": 0, "diff": 0.0})
+            t["requests"] += 1
+            t["agree"] += record["agree"]
+            t["diff"] += record["abs_diff"]
+    return {
+        v: {"requests": t["requests"], "agreement": t["agree"] / t["requests"], "mean_abs_diff": t["diff"] / t["requests"]}
+        for v, t in totals.items()
+    }
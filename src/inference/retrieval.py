@@ -0,0 +1,284 @@
+"""
+Similar-case retrieval: penultimate-layer embeddings of the archive plus a nearest-neighbour index.
+
+Embeddings are the pooled features feeding the classifier head (the custom CNN's `gap` layer, or the
+pooled backbone of Xception / EfficientNet), L2-normalised and stored as a float16 matrix. The index
+supports exact search (blocked matrix products) and an IVF-PQ approximation: k-means coarse cells with
+vectors stored contiguously per cell, so a query scans only the nprobe closest cells, scored from uint8
+product-quantization codes and re-ranked on the float16 vectors. At 100k scans and nprobe=8 of ~300
+cells that is ~3k table lookups per subspace and 64 exact dot products per query.
+TensorFlow is imported lazily (only for embedding extraction).
+"""
+import io
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+EMBEDDINGS_DIR = "data/processed/embeddings"
+_EXACT_BLOCK = 16384
+
+
+def embedding_model(model):
+    """keras.Model mapping the classifier's input to its pooled embedding (shares the classifier's weights)."""
+    from tensorflow import keras
+    from .heads import split_model
+
+    trunk, head = split_model(model)
+    return keras.Model(model.input, head(trunk(model.input))[0], name=f"{model.name}_embedding")
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    return x / (np.linalg.norm(x, axis=-1, keepdims=True) + 1e-12)
+
+
+def extract_embeddings(model, data_config: dict, splits: Sequence[str] = ("train", "validation"), batch_size: int = 64) -> dict:
+    """
+    Embeddings of every file in `splits` (batched, un-augmented passes at the model's input size).
+    Returns {"embeddings": (N, D) float16 L2-normalised, "paths", "labels", "class_names"}.
+    """
+    from src.data.dataset import build_file_dataset, get_split_files
+
+    embed = embedding_model(model)
+    size = tuple(model.input_shape[1:3])
+    cfg = dict(data_config, image={**data_config.get("image", {}), "target_size": list(size)})
+    paths, labels, chunks = [], [], []
+    for split in splits:
+        split_paths, split_labels = get_split_files(cfg, split)
+        ds = build_file_dataset(cfg, split_paths, split_labels, "embed", augment=False, cache=False, batch_size=batch_size)
+        chunks.append(embed.predict(ds.map(lambda x, y: x), verbose=1))
+        paths.extend(split_paths)
+        labels.extend(split_labels.tolist())
+    return {
+        "embeddings": _normalize(np.concatenate(chunks)).astype(np.float16),
+        "paths": np.asarray(paths),
+        "labels": np.asarray(labels, dtype=np.int32),
+        "class_names": np.asarray(data_config.get("classes", [])),
+    }
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 15, seed: int = 0, spherical: bool = True) -> np.ndarray:
+    """k-means centroids for float32 rows of x; spherical (unit-norm centroids, cosine) or Euclidean."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, centroids, spherical)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(x[order], np.concatenate([[0], np.cumsum(counts)[:-1]])[filled])
+        empty = ~filled
+        sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        counts[empty] = 1
+        centroids = _normalize(sums) if spherical else sums / counts[:, None]
+    return centroids
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, spherical: bool = True) -> np.ndarray:
+    """Nearest centroid per row (max inner product, or min Euclidean distance), in blocks."""
+    bias = 0.0 if spherical else 0.5 * np.sum(centroids ** 2, axis=1)
+    return np.concatenate([
+        np.argmax(x[i:i + _EXACT_BLOCK].astype(np.float32) @ centroids.T - bias, axis=1)
+        for i in range(0, len(x), _EXACT_BLOCK)
+    ])
+
+
+class EmbeddingIndex:
+    """
+    Nearest-neighbour index over unit-norm float16 embeddings (cosine similarity).
+    Exact search scans every row. build_ivf() groups rows into k-means cells so a query scans only the
+    nprobe closest cells; build_pq() adds product-quantized uint8 codes, scored with per-query lookup
+    tables, and only the best `rerank` candidates are re-scored against the float16 vectors.
+    `ids` maps rows back to the order the embeddings were given in.
+    """
+
+    def __init__(self, embeddings, paths, labels, class_names=(), centroids=None, offsets=None, ids=None,
+                 codebooks=None, codes=None):
+        self.embeddings = np.asarray(embeddings, dtype=np.float16)
+        self.paths = np.asarray(paths)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.class_names = [str(c) for c in class_names]
+        self.centroids = None if centroids is None else np.asarray(centroids, dtype=np.float32)
+        self.offsets = None if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self.ids = np.arange(len(self.embeddings)) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.codebooks = None if codebooks is None else np.asarray(codebooks, dtype=np.float32)
+        self.codes = None if codes is None else np.asarray(codes, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def build_ivf(self, nlist: Optional[int] = None, train_size: int = 20000, seed: int = 0) -> "EmbeddingIndex":
+        """Cluster into nlist cells (default ~sqrt(N)) and regroup rows by cell."""
+        n = len(self.embeddings)
+        nlist = min(int(nlist or max(int(np.sqrt(n)), 1)), n)
+        rng = np.random.default_rng(seed)
+        sample = self.embeddings[rng.choice(n, size=min(train_size, n), replace=False)].astype(np.float32)
+        self.centroids = _kmeans(sample, nlist, seed=seed)
+        assign = _assign(self.embeddings, self.centroids)
+        order = np.argsort(assign, kind="stable")
+        self.embeddings, self.paths, self.labels = self.embeddings[order], self.paths[order], self.labels[order]
+        self.ids = self.ids[order]
+        if self.codes is not None:
+            self.codes = self.codes[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return self
+
+    def _subvectors(self, x: np.ndarray) -> np.ndarray:
+        """(N, D) -> (N, M, S): zero-padded to M * S dimensions and split into the PQ subspaces."""
+        m, _, sub = self.codebooks.shape
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1)
+        x = np.pad(x, ((0, 0), (0, m * sub - x.shape[1])))
+        return x.reshape(len(x), m, sub)
+
+    def build_pq(self, sub_dim: int = 16, train_size: int = 10000, iters: int = 10, seed: int = 0) -> "EmbeddingIndex":
+        """Product quantization: one byte per `sub_dim` dimensions (256 Euclidean centroids per subspace)."""
+        n, dim = self.embeddings.shape
+        m, ks = -(-dim // sub_dim), min(256, n)
+        self.codebooks = np.zeros((m, ks, sub_dim), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        sample = self._subvectors(self.embeddings[rng.choice(n, size=min(train_size, n), replace=False)])
+        for j in range(m):
+            self.codebooks[j] = _kmeans(np.ascontiguousarray(sample[:, j]), ks, iters=iters, seed=seed + j, spherical=False)
+        self.codes = np.empty((n, m), dtype=np.uint8)
+        for i in range(0, n, _EXACT_BLOCK):
+            block = self._subvectors(self.embeddings[i:i + _EXACT_BLOCK])
+            for j in range(m):
+                self.codes[i:i + len(block), j] = _assign(block[:, j], self.codebooks[j], spherical=False)
+        return self
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, k: int) -> tuple:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def search(self, query, k: int = 5, exact: bool = False, nprobe: int = 8, rerank: int = 64) -> list:
+        """
+        Top-k most similar archived scans for one embedding (cosine similarity).
+        Uses the IVF cells / PQ codes when built (unless exact=True). Returns [{"path", "label", "score", "id"}].
+        """
+        q = _normalize(np.asarray(query).reshape(-1))
+        if exact or (self.centroids is None and self.codes is None):
+            scores = np.concatenate([
+                self.embeddings[i:i + _EXACT_BLOCK].astype(np.float32) @ q
+                for i in range(0, len(self.embeddings), _EXACT_BLOCK)
+            ])
+            rows, scores = self._top_k(scores, np.arange(len(scores)), k)
+        else:
+            if self.centroids is None:
+                rows = np.arange(len(self.embeddings))
+            else:
+                cells = np.argsort(-(self.centroids @ q))[:nprobe]
+                rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+            if self.codes is not None and len(rows) > rerank:
+                # Asymmetric distance: table[j, c] = <q_j, centroid c of subspace j>, summed over the codes
+                table = np.einsum("ms,mks->mk", self._subvectors(q[None])[0], self.codebooks)
+                approx = table[np.arange(table.shape[0]), self.codes[rows]].sum(axis=1)
+                rows = rows[np.argpartition(-approx, rerank - 1)[:rerank]]
+            scores = self.embeddings[rows].astype(np.float32) @ q
+            rows, scores = self._top_k(scores, rows, k)
+        return [
+            {
+                "path": str(self.paths[r]),
+                "label": self.class_names[self.labels[r]] if self.class_names else str(self.labels[r]),
+                "score": float(s),
+                "id": int(self.ids[r]),
+            }
+            for r, s in zip(rows, scores)
+        ]
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {"embeddings": self.embeddings, "paths": self.paths, "labels": self.labels,
+                  "class_names": np.asarray(self.class_names), "ids": self.ids}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, offsets=self.offsets)
+        if self.codes is not None:
+            arrays.update(codebooks=self.codebooks, codes=self.codes)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path) -> "EmbeddingIndex":
+        data = np.load(path, allow_pickle=False)
+        optional = {key: data[key] for key in ("centroids", "offsets", "codebooks", "codes") if key in data}
+        return cls(data["embeddings"], data["paths"], data["labels"], data["class_names"], ids=data["ids"], **optional)
+
+
+def build_index(
+    model,
+    data_config: dict,
+    splits: Sequence[str] = ("train", "validation"),
+    batch_size: int = 64,
+    nlist: Optional[int] = None,
+    pq_sub_dim: Optional[int] = 16,
+    ivf: bool = True,
+) -> EmbeddingIndex:
+    """
+    Embed the archive (see extract_embeddings) and build the index: PQ codes (unless pq_sub_dim is None)
+    and IVF cells (unless ivf=False).
+    """
+    data = extract_embeddings(model, data_config, splits=splits, batch_size=batch_size)
+    index = EmbeddingIndex(data["embeddings"], data["paths"], data["labels"], data["class_names"])
+    if pq_sub_dim:
+        index.build_pq(pq_sub_dim)
+    return index.build_ivf(nlist) if ivf else index
+
+
+def benchmark_index(index: EmbeddingIndex, queries: np.ndarray, k: int = 5, nprobe: int = 8, rerank: int = 64) -> dict:
+    """Mean exact / approximate lookup latency (ms) and approximate recall@k against exact search over `queries`."""
+    import time
+
+    timings = {"exact": [], "approx": []}
+    hits = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        exact = {r["id"] for r in index.search(q, k=k, exact=True)}
+        t1 = time.perf_counter()
+        approx = {r["id"] for r in index.search(q, k=k, nprobe=nprobe, rerank=rerank)}
+        t2 = time.perf_counter()
+        timings["exact"].append(t1 - t0)
+        timings["approx"].append(t2 - t1)
+        hits += len(exact & approx)
+    return {
+        "size": len(index),
+        "dim": int(index.embeddings.shape[1]),
+        "exact_ms": 1000.0 * float(np.mean(timings["exact"])),
+        "approx_ms": 1000.0 * float(np.mean(timings["approx"])),
+        f"recall@{k}": hits / (k * len(queries)),
+    }
+
+
+def index_path(model_name: str, project_root: Optional[Path] = None) -> Path:
+    from .predict import _project_root
+
+    return (project_root or _project_root()) / EMBEDDINGS_DIR / f"{model_name}.npz"
+
+
+def load_index(model_name: str, project_root: Optional[Path] = None) -> Optional[EmbeddingIndex]:
+    """The saved index for a model, or None if scripts/build_embedding_index.py has not been run."""
+    path = index_path(model_name, project_root)
+    return EmbeddingIndex.load(path) if path.exists() else None
+
+
+def similar_cases(embed_model, image_batch: np.ndarray, index: EmbeddingIndex, k: int = 4, nprobe: int = 8) -> list:
+    """Top-k archived scans for the first image of a preprocessed (1, H, W, C) batch; embed_model from embedding_model()."""
+    query = np.asarray(embed_model(image_batch, training=False))[0]
+    return index.search(query, k=k, nprobe=nprobe)
+
+
+def thumbnail(path: str, size: int = 96) -> Optional[bytes]:
+    """PNG thumbnail of an archived scan (JPEG/PNG or DICOM), or None if the file is gone."""
+    from PIL import Image
+
+    try:
+        from src.data.dataset import load_image_for_inference
+
+        arr = load_image_for_inference(path, target_size=(size, size), normalize=False)[0]
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8)).save(buf, format="PNG")
+    return buf.getvalue()
@@ -14,15 +14,18 @@ def generate_saliency_map(model, image_batch, class_idx=None):
     Returns: (H, W) saliency map (absolute gradients, normalized).
     """
     import tensorflow as tf
-    img = tf.Variable(image_batch, dtype=tf.float32)
-    with tf.GradientTape() as tape:
-        tape.watch(img)
-        logits = model(img)
-        if class_idx is not None:
-            score = logits[0, class_idx]
-        else:
-            score = tf.reduce_max(logits[0])
-    grads = tape.gradient(score, img)
-    saliency = tf.reduce_max(tf.abs(grads), axis=-1)[0].numpy()
+    from src.tracing import span
+
+    with span("saliency", model=model.name, method="vanilla_gradient"):
+        img = tf.Variable(image_batch, dtype=tf.float32)
+        with tf.GradientTape() as tape:
+            tape.watch(img)
+            logits = model(img)
+            if class_idx is not None:
+                score = logits[0, class_idx]
+            else:
+                score = tf.reduce_max(logits[0])
+        grads = tape.gradient(score, img)
+        saliency = tf.reduce_max(tf.abs(grads), axis=-1)[0].numpy()
     saliency = (saliency - saliency.min()) / (saliency.max() - saliency.min() + 1e-8)
     return saliency
@@ -0,0 +1,82 @@
+"""
+Study-level (multi-slice) inference: batched per-model prediction and aggregation across slices.
+"""
+from typing import Callable, Optional
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 16
+NORMAL_CLASS = "notumor"
+
+
+def predict_study(
+    model,
+    slices: np.ndarray,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_batch: Optional[Callable[[int, int], None]] = None,
+) -> np.ndarray:
+    """
+    Run model over (N, H, W, C) slices in batches; returns (N, num_classes) probabilities.
+    on_batch(done, total) is called after each batch (e.g. to drive a progress bar).
+    """
+    from src.tracing import span
+
+    total = len(slices)
+    out = []
+    for start in range(0, total, batch_size):
+        with span("inference", model=model.name, batch=len(slices[start:start + batch_size])):
+            out.append(np.asarray(model.predict_on_batch(slices[start:start + batch_size])))
+        if on_batch is not None:
+            on_batch(min(start + batch_size, total), total)
+    if not out:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate(out, axis=0)
+
+
+def aggregate_study(
+    probs: np.ndarray,
+    class_names: list,
+    slice_names: Optional[list] = None,
+    top_k: int = 3,
+    normal_class: str = NORMAL_CLASS,
+) -> dict:
+    """
+    Aggregate per-slice probabilities (N, C) into a study-level summary.
+    - mean pooling: average distribution over slices.
+    - max pooling: per-class maximum over slices; the study is called abnormal if any slice's
+      suspicion (1 - P(normal_class)) reaches 0.5, labelled with the strongest tumor class.
+    - top_k: indices of the most suspicious slices (highest suspicion first).
+    """
+    probs = np.asarray(probs, dtype=np.float32)
+    n = len(probs)
+    if n == 0:
+        raise ValueError("aggregate_study needs at least one slice")
+    slice_names = list(slice_names) if slice_names is not None else [str(i) for i in range(n)]
+    normal_idx = class_names.index(normal_class) if normal_class in class_names else None
+
+    if normal_idx is not None:
+        suspicion = 1.0 - probs[:, normal_idx]
+    else:
+        suspicion = probs.max(axis=1)
+
+    mean_probs = probs.mean(axis=0)
+    max_probs = probs.max(axis=0)
+    if normal_idx is not None:
+        tumor_probs = max_probs.copy()
+        tumor_probs[normal_idx] = -1.0
+        max_label = class_names[int(np.argmax(tumor_probs))] if suspicion.max() >= 0.5 else normal_class
+    else:
+        max_label = class_names[int(np.argmax(max_probs))]
+
+    top = np.argsort(-suspicion, kind="stable")[: max(0, top_k)]
+    return {
+        "slice_names": slice_names,
+        "probs": probs,
+        "labels": [class_names[i] for i in probs.argmax(axis=1)],
+        "suspicion": suspicion,
+        "mean_probs": mean_probs,
+        "mean_label": class_names[int(np.argmax(mean_probs))],
+        "max_probs": max_probs,
+        "max_label": max_label,
+        "top_k": [int(i) for i in top],
+    }
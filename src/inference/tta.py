@@ -0,0 +1,85 @@
+"""
+Test-time augmentation (TTA) for uncertain predictions.
+
+The plain forward pass runs first; only images whose top probability is below `threshold` get TTA.
+Their views (flips, small rotations, centre crops) are stacked into one batch, run in a single
+model(...) call, and averaged with the original prediction. Confident scans cost nothing extra.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_TTA = {
+    "enabled": False,
+    "threshold": 0.9,  # run TTA when the base prediction's confidence is below this
+    "flips": ["horizontal"],  # horizontal and/or vertical
+    "rotations": [-10, 10],  # degrees
+    "crops": [0.9],  # centre crops (fraction of the side), resized back to the input size
+}
+
+
+def tta_settings(config: Optional[dict]) -> dict:
+    """DEFAULT_TTA overridden by `config` (the `tta` section of configs/app.yaml)."""
+    return {**DEFAULT_TTA, **(config or {})}
+
+
+def num_views(config: Optional[dict] = None) -> int:
+    """Augmented views per image (the original is not counted)."""
+    cfg = tta_settings(config)
+    return len(cfg["flips"]) + len(cfg["rotations"]) + len(cfg["crops"])
+
+
+def tta_views(images: np.ndarray, config: Optional[dict] = None):
+    """
+    (V * N, H, W, C) tensor of augmented views of (N, H, W, C) images, ordered view-major
+    (all images' first view, then the second, ...). The original images are not included.
+    """
+    import tensorflow as tf
+
+    cfg = tta_settings(config)
+    images = tf.convert_to_tensor(images, dtype=tf.float32)
+    n, h, w = tf.shape(images)[0], images.shape[1], images.shape[2]
+    views = []
+    for flip in cfg["flips"]:
+        views.append(tf.reverse(images, axis=[2 if flip == "horizontal" else 1]))
+    if cfg["rotations"]:
+        cx, cy = (w - 1) / 2.0, (h - 1) / 2.0
+        transforms = []
+        for degrees in cfg["rotations"]:
+            a = math.radians(degrees)
+            cos, sin = math.cos(a), math.sin(a)
+            transforms.append([cos, -sin, cx - cos * cx + sin * cy, sin, cos, cy - sin * cx - cos * cy, 0.0, 0.0])
+        for t in transforms:
+            views.append(tf.raw_ops.ImageProjectiveTransformV3(
+                images=images,
+                transforms=tf.tile(tf.constant([t], tf.float32), [n, 1]),
+                output_shape=tf.constant([h, w]),
+                fill_value=0.0,
+                interpolation="BILINEAR",
+                fill_mode="REFLECT",
+            ))
+    for scale in cfg["crops"]:
+        m = (1.0 - scale) / 2.0
+        boxes = tf.tile(tf.constant([[m, m, 1.0 - m, 1.0 - m]], tf.float32), [n, 1])
+        views.append(tf.image.crop_and_resize(images, boxes, tf.range(n), (h, w)))
+    return tf.concat(views, axis=0)
+
+
+def predict_with_tta(model, image_batch: np.ndarray, config: Optional[dict] = None, probs: Optional[np.ndarray] = None) -> tuple:
+    """
+    Probabilities for (N, H, W, C) images, averaged over TTA views for the uncertain ones.
+    probs: the images' plain predictions if already computed (e.g. by src.inference.heads.run_heads).
+    Returns (probs (N, num_classes), used_tta bool mask (N,)).
+    """
+    cfg = tta_settings(config)
+    probs = np.asarray(model(image_batch, training=False) if probs is None else probs)
+    uncertain = probs.max(axis=-1) < cfg["threshold"]
+    if not uncertain.any() or num_views(cfg) == 0:
+        return probs, uncertain & False
+    subset = image_batch[uncertain]
+    view_probs = np.asarray(model(tta_views(subset, cfg), training=False))
+    view_probs = view_probs.reshape(num_views(cfg), len(subset), -1)
+    probs = probs.copy()
+    probs[uncertain] = (probs[uncertain] + view_probs.sum(axis=0)) / (num_views(cfg) + 1)
+    return probs, uncertain
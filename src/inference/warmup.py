@@ -0,0 +1,132 @@
+"""
+Service warm-up: load every served model and run dummy batches through each inference path before the
+app reports ready, so the first clinician after a restart does not pay for tracing and memory allocation.
+
+Paths warmed per model (at the model's own input size):
+- predict_on_batch at every configured batch size (study inference). The first two distinct batch
+  shapes also trace Keras' relaxed-shape predict function, which then covers partial last batches.
+- model(...) on the TTA view batch (when TTA is enabled).
+- run_heads (probabilities, embedding, Grad-CAM gradient) at batch 1 and at the study top-k.
+TensorFlow is imported lazily to avoid protobuf errors at app startup.
+"""
+import logging
+import threading
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP = {
+    "enabled": True,
+    "batch_sizes": None,  # None = derived from the app config (1, study.batch_size, TTA views)
+    "gradcam_batch_sizes": None,  # None = 1 and study.top_k
+}
+
+
+def warmup_settings(app_config: Optional[dict]) -> dict:
+    """
+    DEFAULT_WARMUP overridden by the `warmup` section of configs/app.yaml, with the batch sizes
+    resolved from the study and tta sections when not set explicitly.
+    """
+    from .study import DEFAULT_BATCH_SIZE
+    from .tta import num_views, tta_settings
+
+    app_config = app_config or {}
+    cfg = {**DEFAULT_WARMUP, **(app_config.get("warmup") or {})}
+    study = app_config.get("study", {})
+    if cfg["batch_sizes"] is None:
+        sizes = {1, int(study.get("batch_size", DEFAULT_BATCH_SIZE))}
+        tta = tta_settings(app_config.get("tta"))
+        if tta["enabled"] and num_views(tta):
+            sizes.add(num_views(tta))
+        cfg["batch_sizes"] = sorted(sizes)
+    if cfg["gradcam_batch_sizes"] is None:
+        cfg["gradcam_batch_sizes"] = sorted({1, int(study.get("top_k", 3))})
+    return cfg
+
+
+def warm_up_model(
+    model,
+    heads,
+    input_size: Sequence[int],
+    batch_sizes: Sequence[int] = (1,),
+    gradcam_batch_sizes: Sequence[int] = (1,),
+) -> dict:
+    """
+    Run dummy batches through a loaded model (a keras.Model, OnnxBackend or PoolBackend) and its multi_output_model
+    heads, if any.
+    Returns {"seconds", "batch_sizes", "gradcam_batch_sizes"}.
+    """
+    from .heads import run_heads
+
+    started = time.perf_counter()
+    channels = model.input_shape[-1]
+    for batch_size in batch_sizes:
+        dummy = np.zeros((batch_size, *input_size, channels), dtype=np.float32)
+        model.predict_on_batch(dummy)
+        model(dummy, training=False)
+    if heads is not None:
+        for batch_size in gradcam_batch_sizes:
+            run_heads(heads, np.zeros((batch_size, *input_size, channels), dtype=np.float32))
+    elif hasattr(model, "forward"):  # ONNX / pool backend: probabilities + embedding
+        model.forward(np.zeros((1, *input_size, channels), dtype=np.float32))
+    return {
+        "seconds": time.perf_counter() - started,
+        "batch_sizes": list(batch_sizes),
+        "gradcam_batch_sizes": list(gradcam_batch_sizes) if heads is not None else [],
+    }
+
+
+class Warmup:
+    """
+    Loads and warms models_for_inference through a ModelServer in a background thread.
+    `ready` is set only once every model has been loaded and warmed (missing models are skipped);
+    `report` then holds {model_name: {"version", "load_seconds", "seconds", ...}}.
+    """
+
+    def __init__(self, server, model_names: Sequence[str]):
+        self.server = server
+        self.model_names = list(model_names)
+        self.report = {}
+        self.errors = {}
+        self.seconds = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self) -> "Warmup":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        for name in self.model_names:
+            try:
+                routed = self.server.route(name)
+                if routed is None:
+                    logger.warning("Warm-up: %s has no saved model, skipped", name)
+                    continue
+                self.report[name] = self.server.entry(name, routed["version"])["warmup"]
+                logger.info(
+                    "Warm-up: %s %s loaded in %.2fs, warmed in %.2fs (batch sizes %s)",
+                    name, routed["version"], self.report[name]["load_seconds"],
+                    self.report[name]["seconds"], self.report[name]["batch_sizes"],
+                )
+            except Exception as e:  # one broken model must not keep the service from becoming ready
+                logger.exception("Warm-up of %s failed", name)
+                self.errors[name] = f"{type(e).__name__}: {e}"
+        self.seconds = time.perf_counter() - started
+        logger.info("Warm-up finished in %.2fs; service ready", self.seconds)
+        self._ready.set()
+        return self.report
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished (or timeout seconds); returns readiness."""
+        return self._ready.wait(timeout)
@@ -1,5 +1,13 @@
 from .client import get_llm_client
 from .explanations import explain_image
 from .report import build_report
+from .orchestrator import AISectionRunner, build_ai_jobs, generate_ai_section
 
-__all__ = ["get_llm_client", "explain_image", "build_report"]
+__all__ = [
+    "get_llm_client",
+    "explain_image",
+    "build_report",
+    "AISectionRunner",
+    "build_ai_jobs",
+    "generate_ai_section",
+]
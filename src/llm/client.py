@@ -28,16 +28,26 @@ def get_llm_client(provider: str = "gemini", model_id: Optional[str] = None):
     raise ValueError(f"Unknown provider: {provider}")
 
 
+def prepare_image(image_bytes_or_path):
+    """Decode an image path/bytes once so several requests can share it. PIL images pass through."""
+    import PIL.Image
+    if isinstance(image_bytes_or_path, str):
+        img = PIL.Image.open(image_bytes_or_path)
+    elif isinstance(image_bytes_or_path, bytes):
+        img = PIL.Image.open(io.BytesIO(image_bytes_or_path))
+    else:
+        return image_bytes_or_path
+    img.load()
+    return img
+
+
 def generate_with_image(client, image_bytes_or_path, prompt: str, **kwargs):
     """Send image + text prompt to the LLM and return response text."""
+    from src.tracing import span
+
     if hasattr(client, "generate_content"):
-        import PIL.Image
-        if isinstance(image_bytes_or_path, str):
-            img = PIL.Image.open(image_bytes_or_path)
-        elif isinstance(image_bytes_or_path, bytes):
-            img = PIL.Image.open(io.BytesIO(image_bytes_or_path))
-        else:
-            img = image_bytes_or_path
-        response = client.generate_content([prompt, img], generation_config=kwargs)
+        img = prepare_image(image_bytes_or_path)
+        with span("llm", model=getattr(client, "model_name", None)):
+            response = client.generate_content([prompt, img], generation_config=kwargs)
         return response.text if response else ""
     return ""
@@ -0,0 +1,165 @@
+"""
+Concurrent generation of the AI insights section (explanation, report, per-model explanations).
+Requests run on a shared background event loop with bounded concurrency and per-request deadlines,
+so the whole section takes roughly as long as the slowest call instead of the sum of all calls.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from .client import get_llm_client, generate_with_image, prepare_image
+from .explanations import explanation_prompt
+from .report import report_prompt
+
+DEFAULT_MAX_CONCURRENCY = 3
+DEFAULT_TIMEOUT_S = 60.0
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop running in a daemon thread (started on first use)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-fanout", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def build_ai_jobs(
+    results: dict,
+    primary_label: str,
+    primary_conf: float,
+    include_explanation: bool = True,
+    include_report: bool = True,
+    per_model: bool = False,
+    similar_cases: Optional[list] = None,
+) -> dict[str, str]:
+    """
+    Map job key -> prompt for the AI section.
+    results: {model_name: {"label", "confidence", ...}} as produced by the dashboard.
+    Keys: "explanation", "report" and "explanation:<model_name>" for per-model explanations.
+    similar_cases: retrieved archive cases grounding the report's analogous-cases section.
+    """
+    jobs = {}
+    if include_explanation:
+        summary = "; ".join(f"{k}: {v['label']} ({v['confidence']:.0%})" for k, v in results.items())
+        jobs["explanation"] = explanation_prompt(summary)
+    if include_report:
+        jobs["report"] = report_prompt(primary_label, primary_conf, similar_cases)
+    if per_model:
+        for name, r in results.items():
+            jobs[f"explanation:{name}"] = explanation_prompt(f"{name}: {r['label']} ({r['confidence']:.0%})")
+    return jobs
+
+
+async def run_llm_jobs(
+    client,
+    image,
+    jobs: dict[str, str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    on_result: Optional[Callable[[str, dict], None]] = None,
+) -> dict[str, dict]:
+    """
+    Issue all prompts concurrently against one client and one decoded image.
+    At most max_concurrency calls are in flight; each call gets its own deadline of timeout seconds.
+    Returns {key: {"text", "error", "seconds"}}; failures and timeouts are reported per key, not raised.
+    The blocking SDK call runs in a worker thread, so a timed-out call is abandoned rather than interrupted.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _one(key: str, prompt: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                text = await asyncio.wait_for(
+                    asyncio.to_thread(generate_with_image, client, image, prompt), timeout=timeout
+                )
+                result = {"text": text or "", "error": None}
+            except asyncio.TimeoutError:
+                result = {"text": "", "error": f"Timed out after {timeout:g}s"}
+            except Exception as e:
+                result = {"text": "", "error": str(e)}
+            result["seconds"] = time.perf_counter() - start
+        if on_result is not None:
+            on_result(key, result)
+        return key, result
+
+    pairs = await asyncio.gather(*(_one(k, p) for k, p in jobs.items()))
+    return dict(pairs)
+
+
+class AISectionRunner:
+    """
+    Per-session handle for the AI section: at most one fan-out in flight.
+    Submitting again, or cancelling with a different scan key (new upload), cancels the previous run.
+    """
+
+    def __init__(self):
+        self.scan_key: Optional[str] = None
+        self.completed: dict[str, dict] = {}
+        self._future: Optional[Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def submit(
+        self,
+        scan_key: str,
+        image_bytes_or_path,
+        jobs: dict[str, str],
+        provider: str = "gemini",
+        model_id: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> Future:
+        """Start a fan-out for one scan; returns a Future resolving to run_llm_jobs' result dict."""
+        self.cancel()
+        client = get_llm_client(provider=provider, model_id=model_id)
+        image = prepare_image(image_bytes_or_path)
+        self.scan_key = scan_key
+        self.completed = {}
+        coro = run_llm_jobs(
+            client, image, jobs,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            on_result=self.completed.__setitem__,
+        )
+        self._future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+        return self._future
+
+    def cancel(self, scan_key: Optional[str] = None) -> bool:
+        """
+        Cancel the in-flight run. If scan_key is given, only cancel when it belongs to another scan.
+        Returns True if a run was cancelled.
+        """
+        if not self.running:
+            return False
+        if scan_key is not None and scan_key == self.scan_key:
+            return False
+        return self._future.cancel()
+
+
+def generate_ai_section(
+    image_bytes_or_path,
+    jobs: dict[str, str],
+    provider: str = "gemini",
+    model_id: Optional[str] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT_S,
+) -> dict[str, dict]:
+    """Blocking convenience wrapper (scripts, notebooks): run all jobs concurrently and wait."""
+    client = get_llm_client(provider=provider, model_id=model_id)
+    image = prepare_image(image_bytes_or_path)
+    future = asyncio.run_coroutine_threadsafe(
+        run_llm_jobs(client, image, jobs, max_concurrency=max_concurrency, timeout=timeout),
+        _background_loop(),
+    )
+    return future.result()
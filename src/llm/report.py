@@ -1,21 +1,51 @@
 """
 Comprehensive report: model prediction, insights, historical cases, next steps (Challenge 5).
 """
-from typing import Optional
+from typing import Optional, Sequence
 from .client import get_llm_client, generate_with_image
 
 
-def build_report(image_path_or_bytes, prediction: str, confidence: float, provider: str = "gemini", model_id: Optional[str] = None):
-    """Generate a structured report with prediction, insights, analogous cases, and next steps."""
-    prompt = (
+def similar_cases_text(similar_cases: Sequence[dict]) -> str:
+    """One line per retrieved archive case: label and cosine similarity."""
+    return "\n".join(f"- {c['label']} (similarity {c['score']:.2f})" for c in similar_cases)
+
+
+def report_prompt(prediction: str, confidence: float, similar_cases: Optional[Sequence[dict]] = None) -> str:
+    """
+    Prompt used for the structured clinical-style report.
+    similar_cases: retrieved archive cases ({"label", "score"}, see src.inference.retrieval); when given,
+    section 3 discusses them instead of asking the model for hypothetical analogies.
+    """
+    if similar_cases:
+        cases_section = (
+            "3. **Historical/analogous cases**: Discuss the retrieved archive cases listed below "
+            "(labels and embedding similarity); do not invent other cases.\n"
+        )
+        cases_context = f"\n\nMost similar archived scans (nearest neighbours by model embedding):\n{similar_cases_text(similar_cases)}"
+    else:
+        cases_section = "3. **Historical/analogous cases**: One or two short, anonymized analogies (e.g. 'similar appearance to cases that...').\n"
+        cases_context = ""
+    return (
         "You are a medical imaging report assistant. Given this brain MRI scan and the following "
         "AI classification result, generate a concise clinical-style report with these sections:\n"
         "1. **Prediction summary**: Restate the prediction and confidence.\n"
         "2. **Additional insights**: Brief observations about the image (in non-diagnostic language).\n"
-        "3. **Historical/analogous cases**: One or two short, anonymized analogies (e.g. 'similar appearance to cases that...').\n"
-        "4. **Next steps for patient and doctors**: Suggested follow-up (e.g. further imaging, specialist referral).\n"
+        + cases_section
+        + "4. **Next steps for patient and doctors**: Suggested follow-up (e.g. further imaging, specialist referral).\n"
         "Use clear headings and plain language. Do not make a definitive diagnosis.\n\n"
         f"Model prediction: {prediction} (confidence: {confidence:.2%})."
+        + cases_context
     )
+
+
+def build_report(
+    image_path_or_bytes,
+    prediction: str,
+    confidence: float,
+    provider: str = "gemini",
+    model_id: Optional[str] = None,
+    similar_cases: Optional[Sequence[dict]] = None,
+):
+    """Generate a structured report with prediction, insights, analogous (retrieved, if given) cases, and next steps."""
     client = get_llm_client(provider=provider, model_id=model_id)
-    return generate_with_image(client, image_path_or_bytes, prompt)
+    return generate_with_image(client, image_path_or_bytes, report_prompt(prediction, confidence, similar_cases))
@@ -0,0 +1,142 @@
+"""
+TensorFlow runtime settings: thread pools, oneDNN, XLA auto-clustering and CPU affinity.
+
+configure() should run before TensorFlow is first imported. It passes the settings through the
+environment variables TensorFlow reads at import / first op (TF_NUM_INTRAOP_THREADS,
+TF_NUM_INTEROP_THREADS, TF_ENABLE_ONEDNN_OPTS, TF_XLA_FLAGS, OMP_NUM_THREADS), and it pins the process
+to `cpu_affinity`, which TensorFlow's pool threads inherit. If TensorFlow is already imported but has not
+run an op yet (e.g. in the trainer), the thread counts and XLA are set with tf.config instead.
+
+Settings, later overriding earlier: DEFAULT_RUNTIME, the `runtime` section of a YAML config
+(configs/app.yaml for serving, a model config for training), the model's entry in configs/runtime_tuned.yaml
+(written by scripts/tune_runtime.py, used for thread / oneDNN keys left null), then RUNTIME_<KEY> environment
+variables (e.g. RUNTIME_INTRA_OP_THREADS=4, RUNTIME_CPU_AFFINITY=0-3) to give co-located processes
+disjoint core sets.
+"""
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+TUNED_PATH = "configs/runtime_tuned.yaml"
+DEFAULT_RUNTIME = {
+    "intra_op_threads": None,  # None = TensorFlow default (one per core)
+    "inter_op_threads": None,
+    "onednn": None,  # True / False = force oneDNN graph optimizations on / off; None = TensorFlow default
+    "xla": False,  # XLA auto-clustering of TensorFlow graphs
+    "cpu_affinity": None,  # e.g. "0-3,8" or [0, 1, 2, 3]; None = all cores
+    "use_tuned": True,
+}
+TUNED_KEYS = ("intra_op_threads", "inter_op_threads", "onednn")
+
+_applied = None
+
+
+def _project_root() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def parse_cpus(spec) -> Optional[list]:
+    """"0-3,8" / [0, 1] / 2 -> sorted list of CPU ids (None stays None)."""
+    if spec is None or spec == "":
+        return None
+    if isinstance(spec, int):
+        return [spec]
+    if isinstance(spec, (list, tuple)):
+        return sorted({int(c) for c in spec})
+    cpus = set()
+    for part in str(spec).split(","):
+        lo, _, hi = part.strip().partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+
+def _env_value(key: str, raw: str):
+    if key in ("onednn", "xla", "use_tuned"):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if key == "cpu_affinity":
+        return raw
+    return int(raw) if raw.strip() else None
+
+
+def load_tuned(root: Optional[Path] = None) -> dict:
+    """{model_name: tuned settings} from configs/runtime_tuned.yaml (empty if not tuned yet)."""
+    path = (root or _project_root()) / TUNED_PATH
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def runtime_settings(config: Optional[dict] = None, model_name: Optional[str] = None, root: Optional[Path] = None) -> dict:
+    """Resolved settings for a config's `runtime` section (see module docstring for precedence)."""
+    settings = {**DEFAULT_RUNTIME, **((config or {}).get("runtime") or {})}
+    if model_name and settings["use_tuned"]:
+        tuned = load_tuned(root).get(model_name, {})
+        for key in TUNED_KEYS:
+            if settings[key] is None and tuned.get(key) is not None:
+                settings[key] = tuned[key]
+    for key in DEFAULT_RUNTIME:
+        raw = os.environ.get(f"RUNTIME_{key.upper()}")
+        if raw is not None:
+            settings[key] = _env_value(key, raw)
+    return settings
+
+
+def configure(settings: dict) -> dict:
+    """
+    Apply runtime settings once per process (later calls return the first result unchanged).
+    Returns what was applied: {"intra_op_threads", "inter_op_threads", "onednn", "xla", "cpus", "tensorflow_imported"}.
+    """
+    global _applied
+    if _applied is not None:
+        return _applied
+
+    cpus = parse_cpus(settings.get("cpu_affinity"))
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    intra, inter = settings.get("intra_op_threads"), settings.get("inter_op_threads")
+    if intra is None and cpus is not None:
+        intra = len(cpus)  # don't run one thread per core of the whole machine on a pinned subset
+    if intra:
+        os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra)
+        os.environ["OMP_NUM_THREADS"] = str(intra)
+    if inter:
+        os.environ["TF_NUM_INTEROP_THREADS"] = str(inter)
+    if settings.get("onednn") is not None:
+        os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if settings["onednn"] else "0"
+    if settings.get("xla"):
+        flags = os.environ.get("TF_XLA_FLAGS", "")
+        if "--tf_xla_auto_jit" not in flags:
+            os.environ["TF_XLA_FLAGS"] = f"{flags} --tf_xla_auto_jit=2 --tf_xla_cpu_global_jit".strip()
+
+    imported = "tensorflow" in sys.modules
+    if imported:
+        import tensorflow as tf
+
+        try:
+            if intra:
+                tf.config.threading.set_intra_op_parallelism_threads(intra)
+            if inter:
+                tf.config.threading.set_inter_op_parallelism_threads(inter)
+        except RuntimeError:
+            logger.warning("TensorFlow already initialized: thread settings not applied")
+        if settings.get("xla"):
+            tf.config.optimizer.set_jit("autoclustering")
+        if settings.get("onednn") is not None:
+            logger.warning("TensorFlow was imported before configure(): the oneDNN setting may not take effect")
+    _applied = {
+        "intra_op_threads": intra,
+        "inter_op_threads": inter,
+        "onednn": settings.get("onednn"),
+        "xla": bool(settings.get("xla")),
+        "cpus": cpus,
+        "tensorflow_imported": imported,
+    }
+    logger.info("Runtime: %s", _applied)
+    return _applied
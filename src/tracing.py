@@ -0,0 +1,214 @@
+"""
+Request-level tracing: timing spans aggregated into per-stage latency histograms.
+
+span("decode") times a block. Every span is added to its stage's histogram. Spans inside a trace(...)
+(one report / page run) are also recorded with their offsets, so a slow request can be broken down into
+upload read, decode, inference, Grad-CAM, rendering, LLM calls and export. Finished traces are kept in
+memory and, with `tracing.log` set in configs/app.yaml, appended to a JSONL file. serve(port) exposes
+/metrics (Prometheus text format), /metrics.json and /traces over HTTP on localhost.
+Spans in threads outside a trace (e.g. LLM jobs) still reach the histograms.
+"""
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+DEFAULT_TRACING = {
+    "enabled": True,
+    "log": None,  # JSONL file for finished traces, e.g. data/processed/traces.jsonl
+    "port": None,  # serve /metrics on 127.0.0.1:<port>
+    "debug_panel": False,  # per-stage latency panel in the app sidebar
+    "keep": 50,  # finished traces kept in memory
+}
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Histogram:
+    """Latency histogram (milliseconds) with fixed buckets; quantiles are bucket-interpolated."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        i = next((i for i, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS_MS[i - 1] if i else 0.0
+                hi = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / c, self.max)
+            seen += c
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.sum / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": self.max,
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "+Inf"], self.counts)),
+        }
+
+
+class Tracer:
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = {**DEFAULT_TRACING, **(settings or {})}
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._traces = deque(maxlen=self.settings["keep"])
+        self._server = None
+
+    def configure(self, settings: Optional[dict]) -> "Tracer":
+        """Apply the `tracing` section of configs/app.yaml (starts the metrics endpoint if a port is set)."""
+        self.settings = {**DEFAULT_TRACING, **(settings or {})}
+        with self._lock:
+            self._traces = deque(self._traces, maxlen=self.settings["keep"])
+        if self.settings["port"] and self._server is None:
+            self.serve(int(self.settings["port"]))
+        return self
+
+    def record(self, stage: str, ms: float) -> None:
+        with self._lock:
+            self._histograms.setdefault(stage, Histogram()).add(ms)
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a block as `stage`; attrs (e.g. model="xception") are kept on the trace's span."""
+        if not self.settings["enabled"]:
+            yield
+            return
+        current = _current.get()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000.0
+            self.record(stage, ms)
+            if current is not None:
+                current["spans"].append({
+                    "stage": stage,
+                    "start_ms": round((start - current["_start"]) * 1000.0, 3),
+                    "ms": round(ms, 3),
+                    **attrs,
+                })
+
+    def start_trace(self, name: str, **attrs) -> Optional[dict]:
+        """Begin a request trace in this context (replacing an unfinished one); end it with end_trace."""
+        if not self.settings["enabled"]:
+            return None
+        trace = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name,
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "_start": time.perf_counter(),
+            "spans": [],
+            **attrs,
+        }
+        _current.set(trace)
+        return trace
+
+    def end_trace(self, trace: Optional[dict]) -> Optional[dict]:
+        """Finish a trace: record its total, keep it in memory and append it to the JSONL log."""
+        if trace is None or "total_ms" in trace:
+            return trace
+        if _current.get() is trace:
+            _current.set(None)
+        trace["total_ms"] = round((time.perf_counter() - trace.pop("_start")) * 1000.0, 3)
+        self.record(f"trace.{trace['name']}", trace["total_ms"])
+        with self._lock:
+            self._traces.append(trace)
+        if self.settings["log"]:
+            path = Path(self.settings["log"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(path, "a") as f:
+                f.write(json.dumps(trace, default=str) + "\n")
+        return trace
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        trace = self.start_trace(name, **attrs)
+        try:
+            yield trace
+        finally:
+            self.end_trace(trace)
+
+    def snapshot(self) -> dict:
+        """{stage: Histogram.summary()} for every stage seen so far."""
+        with self._lock:
+            return {stage: h.summary() for stage, h in sorted(self._histograms.items())}
+
+    def recent_traces(self, n: Optional[int] = None) -> list:
+        with self._lock:
+            traces = list(self._traces)
+        return traces[-n:] if n else traces
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP stage_latency_ms Latency of instrumented stages in milliseconds",
+            "# TYPE stage_latency_ms histogram",
+        ]
+        for stage, s in self.snapshot().items():
+            cumulative = 0
+            for le, count in s["buckets"].items():
+                cumulative += count
+                lines.append(f'stage_latency_ms_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'stage_latency_ms_sum{{stage="{stage}"}} {s["mean_ms"] * s["count"]:.3f}')
+            lines.append(f'stage_latency_ms_count{{stage="{stage}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics, /metrics.json and /traces from a daemon thread."""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                routes = {
+                    "/metrics": ("text/plain; version=0.0.4", lambda: tracer.prometheus_text()),
+                    "/metrics.json": ("application/json", lambda: json.dumps(tracer.snapshot(), indent=1)),
+                    "/traces": ("application/json", lambda: json.dumps(tracer.recent_traces(), default=str, indent=1)),
+                }
+                if self.path not in routes:
+                    self.send_error(404)
+                    return
+                content_type, render = routes[self.path]
+                body = render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return self._server
+
+
+tracer = Tracer()
+span = tracer.span
+trace = tracer.trace
+start_trace = tracer.start_trace
+end_trace = tracer.end_trace
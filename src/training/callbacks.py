@@ -1,6 +1,11 @@
 """
-Custom callbacks (optional: logging, metrics export).
+Custom callbacks (optional: logging, metrics export) and resumable checkpointing.
 """
+import json
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
 from tensorflow import keras
 
 
@@ -18,3 +23,144 @@ class MetricsLogger(keras.callbacks.Callback):
         if self.log_path:
             with open(self.log_path, "a") as f:
                 f.write(str(logs) + "\n")
+
+
+# Counters that make up each callback's progress (restored on resume)
+_CALLBACK_STATE = {
+    "EarlyStopping": ("wait", "best", "best_epoch", "stopped_epoch"),
+    "ReduceLROnPlateau": ("wait", "best", "cooldown_counter"),
+    "ModelCheckpoint": ("best",),
+}
+STATE_FILE = "state.json"
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return float(value)
+
+
+def callback_state(cb) -> dict:
+    """Counters listed in _CALLBACK_STATE, plus state_dict() for callbacks that provide one (e.g. samplers)."""
+    state = {attr: _jsonable(getattr(cb, attr)) for attr in _CALLBACK_STATE.get(type(cb).__name__, ()) if hasattr(cb, attr)}
+    if hasattr(cb, "state_dict"):
+        state["state"] = cb.state_dict()
+    return state
+
+
+def restore_callback_state(cb, saved: dict, best_model_path=None) -> None:
+    """
+    Apply a callback_state() to a callback (after its on_train_begin has reset it). An EarlyStopping with
+    restore_best_weights gets its best weights back from best_model_path, if that file exists.
+    """
+    saved = dict(saved)
+    if "state" in saved and hasattr(cb, "load_state_dict"):
+        cb.load_state_dict(saved.pop("state"))
+    for attr, value in saved.items():
+        setattr(cb, attr, value)
+    if isinstance(cb, keras.callbacks.EarlyStopping) and cb.restore_best_weights and best_model_path:
+        if Path(best_model_path).exists():
+            cb.best_weights = keras.models.load_model(best_model_path, compile=False).get_weights()
+
+
+def _seed_generator_states(model) -> list:
+    """Dropout / random-layer RNG counters; .keras files do not include them."""
+    return [v for v in model.variables if "seed_generator_state" in v.path]
+
+
+def load_resume_state(directory) -> Optional[dict]:
+    """The state written by ResumableCheckpoint in `directory`, or None if there is nothing to resume."""
+    path = Path(directory) / STATE_FILE
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text())
+    return state if (Path(directory) / state["checkpoint"]).exists() else None
+
+
+class ResumableCheckpoint(keras.callbacks.Callback):
+    """
+    Per-epoch checkpoint that can resume training exactly: a full .keras model (weights + optimizer
+    slots, learning rate, iteration count) plus state.json with the epoch, best metric, the layers'
+    RNG states and the counters of the tracked callbacks (EarlyStopping, ReduceLROnPlateau, ModelCheckpoint,
+    and the state_dict() of any tracked callback that has one).
+    Keeps the last `keep_last` checkpoints plus the best one; older files are deleted.
+    Put it last in the callback list: on resume it restores the tracked callbacks' counters after
+    their own on_train_begin has reset them. It also sets `data_epoch` (see get_dataset) each epoch.
+    """
+
+    def __init__(
+        self,
+        directory,
+        monitor: str = "val_accuracy",
+        mode: str = "max",
+        keep_last: int = 3,
+        tracked: Sequence = (),
+        data_epoch=None,
+        resume_state: Optional[dict] = None,
+    ):
+        super().__init__()
+        self.directory = Path(directory)
+        self.monitor = monitor
+        self.mode = mode
+        self.keep_last = max(int(keep_last), 1)
+        self.tracked = list(tracked)
+        self.data_epoch = data_epoch
+        state = resume_state or {}
+        self.checkpoints = list(state.get("checkpoints", []))
+        self.best = state.get("best")
+        self.best_checkpoint = state.get("best_checkpoint")
+        self._resume_callbacks = state.get("callbacks")
+        self._resume_rng = state.get("rng")
+
+    def _improved(self, value) -> bool:
+        if self.best is None:
+            return True
+        return value > self.best if self.mode == "max" else value < self.best
+
+    def on_train_begin(self, logs=None):
+        if self._resume_rng:
+            for var, value in zip(_seed_generator_states(self.model), self._resume_rng):
+                var.assign(value)
+            self._resume_rng = None
+        if not self._resume_callbacks:
+            return
+        best_path = self.directory / self.best_checkpoint if self.best_checkpoint else None
+        for i, cb in enumerate(self.tracked):
+            restore_callback_state(cb, self._resume_callbacks.get(f"{i}:{type(cb).__name__}", {}), best_path)
+        self._resume_callbacks = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if self.data_epoch is not None:
+            self.data_epoch.assign(epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"epoch_{epoch + 1:02d}.keras"
+        tmp = self.directory / f".{name}.tmp.keras"
+        self.model.save(tmp)
+        os.replace(tmp, self.directory / name)
+        self.checkpoints = [c for c in self.checkpoints if c != name] + [name]
+
+        value = logs.get(self.monitor)
+        if value is not None and self._improved(float(value)):
+            self.best, self.best_checkpoint = float(value), name
+
+        keep = set(self.checkpoints[-self.keep_last:]) | {self.best_checkpoint}
+        for old in [c for c in self.checkpoints if c not in keep]:
+            (self.directory / old).unlink(missing_ok=True)
+        self.checkpoints = [c for c in self.checkpoints if c in keep]
+
+        state = {
+            "epoch": epoch + 1,
+            "checkpoint": name,
+            "checkpoints": self.checkpoints,
+            "monitor": self.monitor,
+            "best": self.best,
+            "best_checkpoint": self.best_checkpoint,
+            "rng": [v.numpy().tolist() for v in _seed_generator_states(self.model)],
+            "callbacks": {f"{i}:{type(cb).__name__}": callback_state(cb) for i, cb in enumerate(self.tracked)},
+        }
+        tmp_state = self.directory / f".{STATE_FILE}.tmp"
+        tmp_state.write_text(json.dumps(state, indent=2))
+        os.replace(tmp_state, self.directory / STATE_FILE)
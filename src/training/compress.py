@@ -0,0 +1,199 @@
+"""
+Slim-architecture search and pruning for the custom CNN.
+
+Trains every combination of `search` (width multiplier, depthwise-separable blocks, input resolution),
+prunes the candidates that clear `target_accuracy` (models.pruning, then fine-tunes), and measures each
+model's validation accuracy, CPU latency (src.inference.benchmark) and parameter count. The result is a
+Pareto table (accuracy up, latency down, params down) plus the fastest model that meets the target.
+Finished candidates are recorded in output_dir/results.json and skipped when the search is rerun.
+"""
+import copy
+import itertools
+import json
+from pathlib import Path
+from typing import Optional
+
+
+def candidate_configs(base_config: dict, search: dict) -> list:
+    """(tag, config) for each point of the width x separable x input_size grid."""
+    widths = search.get("width_multiplier", [1.0])
+    separables = search.get("separable", [False])
+    sizes = search.get("input_size", [base_config["model"].get("input_shape", [224])[0]])
+    out = []
+    for width, separable, size in itertools.product(widths, separables, sizes):
+        cfg = copy.deepcopy(base_config)
+        model = cfg["model"]
+        model.update(width_multiplier=width, separable=separable, input_shape=[size, size, 3])
+        if search.get("epochs"):
+            cfg.setdefault("training", {})["epochs"] = search["epochs"]
+        tag = f"w{width:g}_{'sep' if separable else 'conv'}_{size}"
+        out.append((tag, cfg))
+    return out
+
+
+def _set_paths(config: dict, output_dir: Path, tag: str) -> dict:
+    config["paths"] = {
+        "checkpoint_dir": str(output_dir / tag),
+        "save_best": str(output_dir / f"{tag}_best.keras"),
+        "save_final": str(output_dir / f"{tag}_final.keras"),
+    }
+    return config
+
+
+def measure(model, val_ds, input_size, bench: Optional[dict] = None) -> dict:
+    """Validation accuracy, CPU latency and parameter count of a compiled model."""
+    from src.inference.benchmark import count_params, measure_latency
+
+    bench = bench or {}
+    accuracy = model.evaluate(val_ds, verbose=0, return_dict=True)["accuracy"]
+    lat = measure_latency(model, input_size, batch_size=bench.get("batch_size", 1), runs=bench.get("runs", 30))
+    return {
+        "accuracy": float(accuracy),
+        "p50_ms": lat["p50_ms"],
+        "p95_ms": lat["p95_ms"],
+        "params": count_params(model),
+    }
+
+
+def pareto_front(rows: list) -> list:
+    """Mark rows not dominated on (accuracy max, p50_ms min, params min) with pareto=True."""
+    for r in rows:
+        r["pareto"] = not any(
+            o is not r
+            and o["accuracy"] >= r["accuracy"] and o["p50_ms"] <= r["p50_ms"] and o["params"] <= r["params"]
+            and (o["accuracy"] > r["accuracy"] or o["p50_ms"] < r["p50_ms"] or o["params"] < r["params"])
+            for o in rows
+        )
+    return rows
+
+
+def fastest_passing(rows: list, target: float) -> Optional[dict]:
+    """Lowest-latency row with accuracy >= target, or None."""
+    passing = [r for r in rows if r["accuracy"] >= target]
+    return min(passing, key=lambda r: r["p50_ms"]) if passing else None
+
+
+def _pruned_tag(parent_tag: str, method: str, ratio: float) -> str:
+    return f"{parent_tag}_{'p' if method == 'structured' else 'm'}{int(round(ratio * 100))}"
+
+
+def _prune_and_finetune(parent: dict, cfg: dict, pruning: dict, ratio: float, datasets, output_dir: Path, bench: dict) -> dict:
+    from tensorflow import keras
+    from models.pruning import MagnitudeMask, magnitude_masks, prune_filters, sparsity
+    from src.training.train import run_training
+
+    method = pruning.get("method", "structured")
+    tag = _pruned_tag(parent["tag"], method, ratio)
+    model = keras.models.load_model(parent["path"])
+    callbacks = []
+    if method == "structured":
+        model = prune_filters(model, ratio)
+    elif method == "magnitude":
+        callbacks.append(MagnitudeMask(magnitude_masks(model, ratio)))
+    else:
+        raise ValueError(f"Unknown pruning method: {method}")
+
+    ft = _set_paths(copy.deepcopy(cfg), output_dir, tag)
+    train_cfg = ft.setdefault("training", {})
+    train_cfg["epochs"] = pruning.get("finetune_epochs", 10)
+    train_cfg["learning_rate"] = pruning.get("finetune_learning_rate", train_cfg.get("learning_rate", 1e-3) * 0.2)
+    size = tuple(cfg["model"]["input_shape"][:2])
+    batch_size = train_cfg.get("batch_size", 32)
+    run_training(
+        model, datasets.get("train", size, batch_size), datasets.get("validation", size, batch_size), ft,
+        callbacks=callbacks, data_epoch=datasets.epoch,
+    )
+    best = keras.models.load_model(ft["paths"]["save_best"])
+    row = {**parent, "tag": tag, "path": ft["paths"]["save_best"], "pruning": method, "prune_ratio": ratio}
+    row.update(measure(best, datasets.get("validation", size, batch_size), size, bench))
+    if method == "magnitude":
+        row["sparsity"] = sparsity(best)
+    return row
+
+
+def run_search(search_config: dict, data_config: dict, root: Optional[Path] = None) -> list:
+    """
+    Run the grid + pruning search described by search_config (see configs/compress.yaml).
+    Returns the result rows (with pareto flags); writes results.json and pareto.csv to output_dir.
+    """
+    from tensorflow import keras
+    from src.training.train import DatasetCache, _project_root, parse_config, train_from_config
+
+    root = root or _project_root()
+    base = search_config.get("base", "configs/custom_cnn.yaml")
+    base_config = parse_config(str(base if Path(base).is_absolute() else root / base))
+    output_dir = Path(search_config.get("output_dir", "models/checkpoints/compress"))
+    output_dir = output_dir if output_dir.is_absolute() else root / output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_path = output_dir / "results.json"
+    done = {r["tag"]: r for r in json.loads(results_path.read_text())} if results_path.exists() else {}
+    target = search_config.get("target_accuracy", 0.98)
+    bench = search_config.get("benchmark", {})
+    pruning = search_config.get("pruning", {})
+    datasets = DatasetCache(data_config)
+
+    def record(row):
+        done[row["tag"]] = row
+        results_path.write_text(json.dumps(list(done.values()), indent=2))
+        print(f"[{row['tag']}] accuracy {row['accuracy'] * 100:.2f}%  p50 {row['p50_ms']:.1f} ms  params {row['params']:,d}")
+
+    candidates = candidate_configs(base_config, search_config.get("search", {}))
+    for tag, cfg in candidates:
+        if tag in done:
+            continue
+        print(f"=== Candidate {tag} ===")
+        _set_paths(cfg, output_dir, tag)
+        train_from_config(cfg, data_config, datasets)
+        size = tuple(cfg["model"]["input_shape"][:2])
+        batch_size = cfg.get("training", {}).get("batch_size", 32)
+        model = keras.models.load_model(cfg["paths"]["save_best"])
+        row = {
+            "tag": tag,
+            "path": cfg["paths"]["save_best"],
+            "width_multiplier": cfg["model"]["width_multiplier"],
+            "separable": cfg["model"]["separable"],
+            "input_size": size[0],
+            "pruning": None,
+            "prune_ratio": 0.0,
+        }
+        row.update(measure(model, datasets.get("validation", size, batch_size), size, bench))
+        record(row)
+
+    # Prune the candidates that already meet the target (or the most accurate one if none does)
+    trained = [done[tag] for tag, _ in candidates if tag in done]
+    parents = [r for r in trained if r["accuracy"] >= target] or sorted(trained, key=lambda r: -r["accuracy"])[:1]
+    configs = dict(candidates)
+    method = pruning.get("method", "structured")
+    for parent in parents:
+        for ratio in pruning.get("ratios", []):
+            if _pruned_tag(parent["tag"], method, ratio) in done:
+                continue
+            print(f"=== Pruning {parent['tag']} ({method}, {ratio:.0%}) ===")
+            record(_prune_and_finetune(parent, configs[parent["tag"]], pruning, ratio, datasets, output_dir, bench))
+
+    rows = pareto_front(list(done.values()))
+    results_path.write_text(json.dumps(rows, indent=2))
+    write_table(rows, output_dir / "pareto.csv")
+    print_table(rows, target)
+    return rows
+
+
+def write_table(rows: list, path: Path) -> None:
+    import csv
+
+    fields = ["tag", "width_multiplier", "separable", "input_size", "pruning", "prune_ratio", "accuracy", "p50_ms", "p95_ms", "params", "pareto", "path"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(sorted(rows, key=lambda r: r["p50_ms"]))
+
+
+def print_table(rows: list, target: float) -> None:
+    print(f"\n{'candidate':28} {'val acc':>8} {'p50 ms':>8} {'params':>11}  pareto")
+    for r in sorted(rows, key=lambda r: r["p50_ms"]):
+        print(f"{r['tag']:28} {r['accuracy'] * 100:7.2f}% {r['p50_ms']:8.1f} {r['params']:11,d}  {'*' if r.get('pareto') else ''}")
+    best = fastest_passing(rows, target)
+    if best:
+        print(f"\nFastest model at >= {target:.0%}: {best['tag']} ({best['p50_ms']:.1f} ms) -> {best['path']}")
+    else:
+        print(f"\nNo candidate reached {target:.0%} validation accuracy.")
@@ -0,0 +1,201 @@
+"""
+Knowledge distillation: train a small student (custom CNN) on soft targets from the saved teacher models.
+
+Teacher probabilities are computed once per split (un-augmented images, each teacher at its own input
+size) and cached as .npz next to the processed data; the cache is reused until the file list or a
+teacher model file changes. The student loss mixes hard-label cross-entropy with the temperature-scaled
+KL divergence to the teacher ensemble (Hinton et al.), on targets concat([one-hot, teacher probs]).
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from tensorflow import keras
+
+DEFAULT_TEMPERATURE = 4.0
+DEFAULT_ALPHA = 0.3
+
+
+class DistillationLoss(keras.losses.Loss):
+    """
+    alpha * CE(labels, student) + (1 - alpha) * T^2 * KL(teacher_T || student_T).
+    y_true: (B, 2C) = concat([one-hot, teacher probabilities]); y_pred: student probabilities (B, C).
+    Probabilities are turned into logits with log(), which is exact up to a per-row constant.
+    """
+
+    def __init__(self, num_classes: int, temperature: float = DEFAULT_TEMPERATURE, alpha: float = DEFAULT_ALPHA, name="distillation"):
+        super().__init__(name=name)
+        self.num_classes = num_classes
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def call(self, y_true, y_pred):
+        import tensorflow as tf
+
+        c, t = self.num_classes, self.temperature
+        hard, teacher = y_true[:, :c], y_true[:, c:]
+        eps = keras.backend.epsilon()
+        student_logits = tf.math.log(tf.clip_by_value(y_pred, eps, 1.0))
+        teacher_logits = tf.math.log(tf.clip_by_value(teacher, eps, 1.0))
+        ce = keras.losses.categorical_crossentropy(hard, y_pred)
+        soft_teacher = tf.nn.softmax(teacher_logits / t)
+        kl = tf.reduce_sum(
+            soft_teacher * (tf.math.log(soft_teacher + eps) - tf.nn.log_softmax(student_logits / t)), axis=-1
+        )
+        return self.alpha * ce + (1.0 - self.alpha) * (t ** 2) * kl
+
+    def get_config(self):
+        return {"num_classes": self.num_classes, "temperature": self.temperature, "alpha": self.alpha, "name": self.name}
+
+
+def hard_label_accuracy(num_classes: int):
+    """Accuracy against the one-hot half of distillation targets (reported as `accuracy`)."""
+    def accuracy(y_true, y_pred):
+        return keras.metrics.categorical_accuracy(y_true[:, :num_classes], y_pred)
+
+    return keras.metrics.MeanMetricWrapper(accuracy, name="accuracy")
+
+
+def _cache_key(paths: Sequence[str], teachers: dict) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(p.encode())
+    for name, path in sorted(teachers.items()):
+        stat = Path(path).stat()
+        h.update(f"{name}:{path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return h.hexdigest()[:16]
+
+
+def teacher_probabilities(
+    data_config: dict,
+    split: str,
+    teachers: Sequence[str],
+    cache_dir,
+    root: Optional[Path] = None,
+    batch_size: int = 32,
+) -> dict:
+    """
+    Per-file teacher probabilities for a split, computed once and cached in cache_dir.
+    Returns {"paths", "labels", "probs": {teacher: (N, C)}, "ensemble": (N, C) mean}.
+    """
+    from src.data.dataset import build_file_dataset, get_split_files
+    from src.inference.predict import MODEL_INPUT_SIZES, get_model_path, load_model
+
+    paths, labels = get_split_files(data_config, split)
+    teacher_files = {}
+    for name in teachers:
+        path = get_model_path(name, root)
+        if path is None:
+            raise FileNotFoundError(f"Teacher model '{name}' not found; train it first")
+        teacher_files[name] = path
+
+    cache_dir = Path(cache_dir)
+    cache_file = cache_dir / f"{split}_{'+'.join(teachers)}_{_cache_key(paths, teacher_files)}.npz"
+    if cache_file.exists():
+        data = np.load(cache_file)
+        probs = {name: data[name] for name in teachers}
+    else:
+        probs = {}
+        for name in teachers:
+            size = MODEL_INPUT_SIZES.get(name, (224, 224))
+            cfg = dict(data_config, image={**data_config.get("image", {}), "target_size": list(size)})
+            ds = build_file_dataset(cfg, paths, labels, "teacher", augment=False, cache=False, batch_size=batch_size)
+            model = load_model(name, root)
+            probs[name] = model.predict(ds.map(lambda x, y: x), verbose=1).astype(np.float32)
+            print(f"[{name}] accuracy on {split}: {np.mean(probs[name].argmax(-1) == labels):.4f}")
+            del model
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(cache_file, **probs)
+    return {
+        "paths": paths,
+        "labels": labels,
+        "probs": probs,
+        "ensemble": np.mean([probs[name] for name in teachers], axis=0),
+    }
+
+
+def distillation_report(teacher_val: dict, student, student_acc: float, root: Optional[Path] = None, input_size=(224, 224)) -> list:
+    """
+    Accuracy / latency / size rows for each teacher, the teacher ensemble and the student.
+    Latency is batch-1 predict_on_batch time on this machine; the ensemble pays the sum of its teachers.
+    """
+    from src.inference.benchmark import count_params, measure_latency
+    from src.inference.predict import MODEL_INPUT_SIZES, load_model
+
+    labels = teacher_val["labels"]
+    rows, ens_ms, ens_params = [], 0.0, 0
+    for name, probs in teacher_val["probs"].items():
+        model = load_model(name, root)
+        lat = measure_latency(model, MODEL_INPUT_SIZES.get(name, (224, 224)))
+        params = count_params(model)
+        ens_ms, ens_params = ens_ms + lat["p50_ms"], ens_params + params
+        rows.append({"model": name, "accuracy": float(np.mean(probs.argmax(-1) == labels)), "p50_ms": lat["p50_ms"], "params": params})
+        del model
+    rows.append({
+        "model": "ensemble",
+        "accuracy": float(np.mean(teacher_val["ensemble"].argmax(-1) == labels)),
+        "p50_ms": ens_ms,
+        "params": ens_params,
+    })
+    lat = measure_latency(student, input_size)
+    rows.append({"model": "student", "accuracy": float(student_acc), "p50_ms": lat["p50_ms"], "params": count_params(student)})
+    return rows
+
+
+def print_report(rows: list) -> None:
+    print(f"\n{'model':12} {'val acc':>8} {'p50 ms':>9} {'params':>12}")
+    for r in rows:
+        print(f"{r['model']:12} {r['accuracy'] * 100:7.2f}% {r['p50_ms']:9.1f} {r['params']:12,d}")
+
+
+def train_distilled(config: dict, data_config: dict, root: Optional[Path] = None):
+    """
+    Distil the `distillation.teachers` into the configured student model and report the trade-off.
+    Saved best/final models are re-compiled with plain cross-entropy, so they load like any other model.
+    """
+    import tensorflow as tf
+    from models.factory import build_model, model_input_size
+    from src.data.dataset import build_file_dataset
+    from src.training.train import _project_root, resolve_paths, run_training, save_plain
+
+    root = root or _project_root()
+    resolve_paths(config, root)
+    dcfg = config.get("distillation", {})
+    teachers = list(dcfg.get("teachers", ["xception", "transfer"]))
+    cache_dir = Path(dcfg.get("teacher_cache", "data/processed/teacher_cache"))
+    cache_dir = cache_dir if cache_dir.is_absolute() else root / cache_dir
+    num_classes = config["model"].get("num_classes", 4)
+
+    train_t = teacher_probabilities(data_config, "train", teachers, cache_dir, root)
+    val_t = teacher_probabilities(data_config, "validation", teachers, cache_dir, root)
+
+    size = model_input_size(config["model"])
+    batch_size = config.get("training", {}).get("batch_size", data_config.get("batch_size", 32))
+    cfg = dict(data_config, image={**data_config.get("image", {}), "target_size": list(size)}, batch_size=batch_size)
+    epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+    train_ds = build_file_dataset(cfg, train_t["paths"], train_t["labels"], "train", epoch=epoch, soft_targets=train_t["ensemble"])
+    val_ds = build_file_dataset(cfg, val_t["paths"], val_t["labels"], "validation", soft_targets=val_t["ensemble"])
+
+    if config.get("training", {}).get("seed") is not None:
+        keras.utils.set_random_seed(config["training"]["seed"])
+    student = build_model(config["model"])
+    loss = DistillationLoss(num_classes, dcfg.get("temperature", DEFAULT_TEMPERATURE), dcfg.get("alpha", DEFAULT_ALPHA))
+    history = run_training(
+        student, train_ds, val_ds, config, data_epoch=epoch, loss=loss, metrics=[hard_label_accuracy(num_classes)]
+    )
+
+    # Export: plain compile so the app / evaluate scripts load the student without custom objects
+    paths = config.get("paths", {})
+    save_plain(config)
+    best = keras.models.load_model(paths["save_best"]) if paths.get("save_best") and Path(paths["save_best"]).exists() else student
+    probs = best.predict(val_ds.map(lambda x, y: x), verbose=0)
+    student_acc = float(np.mean(probs.argmax(-1) == val_t["labels"]))
+
+    rows = distillation_report(val_t, best, student_acc, root, input_size=size)
+    print_report(rows)
+    report_path = Path(paths.get("checkpoint_dir") or root / "models" / "checkpoints") / "distillation_report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(rows, indent=2))
+    return history
@@ -0,0 +1,272 @@
+"""
+Multi-worker data-parallel training on CPU nodes (tf.distribute.MultiWorkerMirroredStrategy).
+
+Every worker runs the same command with its own TF_CONFIG (cluster spec + task index); see
+scripts/launch_workers.py for a local multi-process launcher. Each worker reads only its shard of the
+files, `training.batch_size` is the per-worker batch, and the learning rate is scaled to the global batch.
+The chief (worker 0) writes checkpoints, final models and the training state (weights, optimizer, epoch and
+callback counters) under paths.checkpoint_dir/state. Saving is collective, so the other workers write a throwaway
+copy to a temporary directory, as with Keras' BackupAndRestore. On restart every worker restores the chief's
+state, which needs checkpoint_dir on storage shared by all nodes. Workers therefore resume at the same epoch
+even after a worker was replaced on a fresh node.
+
+The loop is a custom strategy.run step rather than model.fit: Keras 3's fit cannot reduce its
+first-batch and log values across MultiWorkerMirroredStrategy workers. The usual config-driven
+callbacks (checkpoint, early stopping, LR reduction) still run through a CallbackList.
+"""
+import json
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_LR_SCALING = "linear"
+
+
+def cluster_info() -> dict:
+    """Task type/index, number of workers and chief flag from TF_CONFIG (single worker if unset)."""
+    tf_config = json.loads(os.environ.get("TF_CONFIG") or "{}")
+    cluster = tf_config.get("cluster", {})
+    task = tf_config.get("task", {})
+    task_type = task.get("type", "worker")
+    task_index = int(task.get("index", 0))
+    num_workers = len(cluster.get("worker", [])) + len(cluster.get("chief", []))
+    is_chief = task_type == "chief" or (task_type == "worker" and task_index == 0 and not cluster.get("chief"))
+    return {
+        "task_type": task_type,
+        "task_index": task_index,
+        "num_workers": max(num_workers, 1),
+        "is_chief": is_chief,
+    }
+
+
+def make_tf_config(hosts: list, index: int) -> str:
+    """TF_CONFIG JSON for worker `index` of a cluster of `hosts` ("host:port" strings)."""
+    return json.dumps({"cluster": {"worker": list(hosts)}, "task": {"type": "worker", "index": index}})
+
+
+def get_strategy(communication: str = "auto"):
+    """
+    MultiWorkerMirroredStrategy from TF_CONFIG. Must be created before any other TensorFlow op.
+    communication: "auto", "ring" (gRPC, the CPU choice) or "nccl" (GPUs).
+    """
+    import tensorflow as tf
+
+    implementation = {
+        "auto": tf.distribute.experimental.CommunicationImplementation.AUTO,
+        "ring": tf.distribute.experimental.CommunicationImplementation.RING,
+        "nccl": tf.distribute.experimental.CommunicationImplementation.NCCL,
+    }[communication.lower()]
+    return tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(implementation=implementation)
+    )
+
+
+def scale_learning_rate(learning_rate: float, num_replicas: int, rule: str = DEFAULT_LR_SCALING) -> float:
+    """Learning rate for a global batch num_replicas times the per-worker batch: linear, sqrt or none."""
+    if rule == "linear":
+        return learning_rate * num_replicas
+    if rule == "sqrt":
+        return learning_rate * math.sqrt(num_replicas)
+    if rule in ("none", None):
+        return learning_rate
+    raise ValueError(f"Unknown lr_scaling rule: {rule}")
+
+
+def distributed_dataset(strategy, data_config: dict, split: str, per_worker_batch: int, seed: Optional[int] = None):
+    """
+    Per-worker input pipelines: each worker reads and decodes only its shard of the split's files.
+    Returns (distributed dataset, steps per epoch); the dataset repeats so every worker runs the
+    same number of steps even when shards differ by a file.
+    """
+    import tensorflow as tf
+    from src.data.dataset import build_file_dataset, get_split_files
+
+    paths, labels = get_split_files(data_config, split)
+    global_batch = per_worker_batch * strategy.num_replicas_in_sync
+    steps = max(math.ceil(len(paths) / global_batch), 1)
+    base_seed = data_config.get("splits", {}).get("seed", 42) if seed is None else seed
+
+    def dataset_fn(input_context):
+        ds = build_file_dataset(
+            data_config,
+            paths,
+            labels,
+            split,
+            shard=(input_context.num_input_pipelines, input_context.input_pipeline_id),
+            batch_size=input_context.get_per_replica_batch_size(global_batch),
+            seed=base_seed + input_context.input_pipeline_id,
+        )
+        return ds.repeat()
+
+    options = tf.distribute.InputOptions(experimental_fetch_to_device=False)
+    return strategy.distribute_datasets_from_function(dataset_fn, options), steps
+
+
+CALLBACKS_FILE = "callbacks.json"
+
+
+def state_dir(config: dict) -> Path:
+    """The chief's training-state directory under paths.checkpoint_dir, restored by every worker."""
+    root = Path(config.get("paths", {}).get("checkpoint_dir") or "models/checkpoints")
+    return root / "state"
+
+
+def _save_state(ckpt, manager, directory: Path, callbacks, epoch: int, stopped: bool, is_chief: bool) -> None:
+    """
+    Save the training state (collective: every worker calls this). The chief keeps its checkpoint and writes
+    the callback counters for it; other workers save to a temporary directory that is removed again.
+    """
+    from src.training.callbacks import callback_state
+
+    if not is_chief:
+        tmp = tempfile.mkdtemp(prefix="worker_state_")
+        try:
+            ckpt.write(os.path.join(tmp, "ckpt"))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return
+    manager.save()
+    state = {
+        "epoch": epoch,
+        "stopped": stopped,
+        "callbacks": {type(cb).__name__: state for cb in callbacks if (state := callback_state(cb))},
+    }
+    tmp = directory / f".{CALLBACKS_FILE}.tmp"
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, directory / CALLBACKS_FILE)
+
+
+def _make_steps(strategy, model, optimizer, global_batch: int):
+    """tf.functions running one distributed train / eval step each, plus the metric objects they update."""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    loss_fn = keras.losses.CategoricalCrossentropy(reduction="none")
+    with strategy.scope():
+        metrics = {
+            "loss": keras.metrics.Mean(),
+            "accuracy": keras.metrics.CategoricalAccuracy(),
+            "val_loss": keras.metrics.Mean(),
+            "val_accuracy": keras.metrics.CategoricalAccuracy(),
+        }
+
+    def train_replica(x, y):
+        with tf.GradientTape() as tape:
+            pred = model(x, training=True)
+            per_example = loss_fn(y, pred)
+            loss = tf.nn.compute_average_loss(per_example, global_batch_size=global_batch)
+            if model.losses:
+                loss += tf.nn.scale_regularization_loss(tf.add_n(model.losses))
+        grads = tape.gradient(loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(grads, model.trainable_variables))
+        metrics["loss"].update_state(per_example)
+        metrics["accuracy"].update_state(y, pred)
+
+    def eval_replica(x, y):
+        pred = model(x, training=False)
+        metrics["val_loss"].update_state(loss_fn(y, pred))
+        metrics["val_accuracy"].update_state(y, pred)
+
+    @tf.function
+    def train_step(iterator):
+        strategy.run(train_replica, args=next(iterator))
+
+    @tf.function
+    def eval_step(iterator):
+        strategy.run(eval_replica, args=next(iterator))
+
+    return train_step, eval_step, metrics
+
+
+def train_distributed(config: dict, data_config: dict, strategy=None):
+    """
+    Train the configured model with MultiWorkerMirroredStrategy. Model and optimizer are created under
+    the strategy scope; `distributed` config section: lr_scaling (linear | sqrt | none), communication.
+    Returns the keras History of this run (resumed epochs only).
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+    from models.factory import build_model, model_input_size
+    from src.training.train import build_callbacks, build_optimizer, resolve_paths
+
+    strategy = strategy or get_strategy(config.get("distributed", {}).get("communication", "auto"))
+    info = cluster_info()
+    resolve_paths(config)
+
+    train_cfg = config.setdefault("training", {})
+    per_worker_batch = int(train_cfg.get("batch_size", data_config.get("batch_size", 32)))
+    replicas = strategy.num_replicas_in_sync
+    global_batch = per_worker_batch * replicas
+    rule = config.get("distributed", {}).get("lr_scaling", DEFAULT_LR_SCALING)
+    train_cfg["learning_rate"] = scale_learning_rate(train_cfg.get("learning_rate", 1e-3), replicas, rule)
+    epochs = train_cfg.get("epochs", 50)
+
+    data_config = dict(data_config, image={**data_config.get("image", {}), "target_size": list(model_input_size(config["model"]))})
+    train_ds, train_steps = distributed_dataset(strategy, data_config, "train", per_worker_batch)
+    val_ds, val_steps = distributed_dataset(strategy, data_config, "validation", per_worker_batch)
+
+    with strategy.scope():
+        model = build_model(config["model"])
+        optimizer = build_optimizer(train_cfg)
+        model.compile(optimizer=optimizer, loss="categorical_crossentropy", metrics=["accuracy"])
+        epoch_var = tf.Variable(0, dtype=tf.int64, trainable=False)
+    train_step, eval_step, metrics = _make_steps(strategy, model, optimizer, global_batch)
+
+    # Resume: every worker restores the chief's last state, so all of them run the same epochs and steps
+    directory = state_dir(config)
+    ckpt = tf.train.Checkpoint(model=model, optimizer=optimizer, epoch=epoch_var)
+    manager = None
+    if info["is_chief"]:
+        directory.mkdir(parents=True, exist_ok=True)
+        manager = tf.train.CheckpointManager(ckpt, str(directory), max_to_keep=1)
+    latest = tf.train.latest_checkpoint(str(directory)) if directory.exists() else None
+    if latest:
+        ckpt.restore(latest)
+        print(f"[{info['task_type']} {info['task_index']}] resumed after epoch {int(epoch_var.numpy())}")
+    initial_epoch = int(epoch_var.numpy())
+    saved = json.loads((directory / CALLBACKS_FILE).read_text()) if latest and (directory / CALLBACKS_FILE).exists() else {}
+    if saved.get("epoch") != initial_epoch:
+        saved = {}  # counters from a different epoch than the restored weights: start them fresh
+    if saved.get("stopped"):
+        initial_epoch = epochs  # early stopping had already ended this run
+    print(
+        f"[{info['task_type']} {info['task_index']}] {replicas} replicas, global batch {global_batch}, "
+        f"lr {train_cfg['learning_rate']:g}, {train_steps} steps/epoch"
+    )
+
+    from src.training.callbacks import restore_callback_state
+
+    callback_objects = build_callbacks(config, is_chief=info["is_chief"])
+    callbacks = keras.callbacks.CallbackList(
+        callback_objects, add_history=True, model=model, epochs=epochs, steps=train_steps, verbose=0,
+    )
+    train_iter, val_iter = iter(train_ds), iter(val_ds)
+    callbacks.on_train_begin()
+    for cb in callback_objects:  # after on_train_begin, which resets them
+        if type(cb).__name__ in saved.get("callbacks", {}):
+            restore_callback_state(cb, saved["callbacks"][type(cb).__name__], config.get("paths", {}).get("save_best"))
+    for epoch in range(initial_epoch, epochs):
+        callbacks.on_epoch_begin(epoch)
+        for m in metrics.values():
+            m.reset_state()
+        for _ in range(train_steps):
+            train_step(train_iter)
+        for _ in range(val_steps):
+            eval_step(val_iter)
+        logs = {name: float(m.result()) for name, m in metrics.items()}
+        print(f"[{info['task_type']} {info['task_index']}] epoch {epoch + 1}/{epochs} " + " ".join(f"{k}={v:.4f}" for k, v in logs.items()))
+        callbacks.on_epoch_end(epoch, logs)
+        epoch_var.assign(epoch + 1)
+        _save_state(ckpt, manager, directory, callback_objects, epoch + 1, bool(model.stop_training), info["is_chief"])
+        if model.stop_training:
+            break
+    callbacks.on_train_end()
+
+    paths = config.get("paths", {})
+    if info["is_chief"] and paths.get("save_final"):
+        Path(paths["save_final"]).parent.mkdir(parents=True, exist_ok=True)
+        model.save(paths["save_final"])
+    return model.history
@@ -0,0 +1,257 @@
+"""
+Hyperparameter search: random or TPE sampling with successive-halving / Hyperband early stopping.
+
+Trials are training runs of a base config with sampled overrides (dotted keys such as
+`training.learning_rate`), executed in a spawn-based process pool. Every trial reads the same decoded
+dataset: the tf.data file cache under `cache_dir` is written once by the parent before any trial starts.
+A trial promoted to a larger epoch budget resumes from its own checkpoint (training.resume) instead of
+starting over. Results are appended to output_dir/trials.jsonl; the best config is written to best.yaml.
+"""
+import copy
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import yaml
+
+
+def _to_unit(spec: dict, value) -> float:
+    low, high = spec["low"], spec["high"]
+    if spec["type"] == "loguniform":
+        return (math.log(value) - math.log(low)) / (math.log(high) - math.log(low))
+    return (value - low) / (high - low)
+
+
+def _from_unit(spec: dict, u: float):
+    u = min(max(u, 0.0), 1.0)
+    low, high = spec["low"], spec["high"]
+    if spec["type"] == "loguniform":
+        return float(math.exp(math.log(low) + u * (math.log(high) - math.log(low))))
+    if spec["type"] == "int":
+        return int(round(low + u * (high - low)))
+    return float(low + u * (high - low))
+
+
+def sample_random(space: dict, rng) -> dict:
+    """Independent draw per parameter: uniform / loguniform / int ranges or `choice` values."""
+    return {
+        key: spec["values"][rng.integers(len(spec["values"]))] if spec["type"] == "choice" else _from_unit(spec, rng.random())
+        for key, spec in space.items()
+    }
+
+
+def sample_tpe(space: dict, history: list, rng, gamma: float = 0.25, n_candidates: int = 24, n_startup: int = 5) -> dict:
+    """
+    Tree-structured Parzen estimator (Bergstra et al., 2011), one dimension at a time: split history
+    into the top `gamma` fraction and the rest, draw candidates around good points and keep the one
+    maximising l(x) / g(x). Falls back to random sampling for the first n_startup trials.
+    """
+    if len(history) < n_startup:
+        return sample_random(space, rng)
+    ranked = sorted(history, key=lambda h: h["score"], reverse=True)
+    n_good = max(1, int(math.ceil(gamma * len(ranked))))
+    good, bad = ranked[:n_good], ranked[n_good:]
+    params = {}
+    for key, spec in space.items():
+        if spec["type"] == "choice":
+            values = spec["values"]
+            l = np.array([1.0 + sum(h["params"][key] == v for h in good) for v in values])
+            g = np.array([1.0 + sum(h["params"][key] == v for h in bad) for v in values])
+            l, g = l / l.sum(), g / g.sum()
+            idx = rng.choice(len(values), size=n_candidates, p=l)
+            params[key] = values[int(idx[np.argmax(l[idx] / g[idx])])]
+            continue
+        good_u = np.array([_to_unit(spec, h["params"][key]) for h in good])
+        bad_u = np.array([_to_unit(spec, h["params"][key]) for h in bad]) if bad else np.array([0.5])
+        bw = max(float(np.std(good_u)) if len(good_u) > 1 else 0.2, 0.05)
+        cand = np.clip(rng.choice(good_u, n_candidates) + rng.normal(0.0, bw, n_candidates), 0.0, 1.0)
+
+        def density(points, x):
+            # Parzen mixture plus a uniform prior component so unexplored regions keep some mass
+            return (np.exp(-0.5 * ((x[:, None] - points[None, :]) / bw) ** 2).sum(axis=1) / (bw * 2.5066) + 1.0) / (len(points) + 1)
+
+        params[key] = _from_unit(spec, float(cand[np.argmax(density(good_u, cand) / density(bad_u, cand))]))
+    return params
+
+
+def apply_params(config: dict, params: dict) -> dict:
+    """Deep copy of config with dotted-key overrides applied (e.g. `model.dropout`)."""
+    config = copy.deepcopy(config)
+    for key, value in params.items():
+        node = config
+        *parents, leaf = key.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return config
+
+
+def brackets(scheduler: dict, num_trials: int) -> list:
+    """
+    [(num_trials, [epoch budget per rung])] per bracket.
+    successive_halving: one bracket from min_epochs, keeping the top 1/eta at each rung;
+    hyperband: Li et al.'s brackets trading trial count against starting budget; none: full budget.
+    """
+    scheme = scheduler.get("scheme", "successive_halving")
+    eta = scheduler.get("eta", 3)
+    max_epochs = scheduler.get("max_epochs", 18)
+    min_epochs = scheduler.get("min_epochs", 2)
+    if scheme == "none":
+        return [(num_trials, [max_epochs])]
+    s_max = max(int(math.floor(math.log(max_epochs / min_epochs, eta) + 1e-9)), 0)
+    rungs = lambda s: [max(int(round(max_epochs * eta ** (i - s))), 1) for i in range(s + 1)]
+    if scheme == "successive_halving":
+        return [(num_trials, rungs(s_max))]
+    if scheme == "hyperband":
+        return [(int(math.ceil((s_max + 1) / (s + 1) * eta ** s)), rungs(s)) for s in range(s_max, -1, -1)]
+    raise ValueError(f"Unknown scheduler scheme: {scheme}")
+
+
+def _init_worker(threads: int) -> None:
+    # Runs in a fresh (spawned) interpreter before TensorFlow is imported there
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "2"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+
+def run_trial(config: dict, data_config: dict, epochs: int) -> dict:
+    """Train one trial config up to `epochs` (resuming from its checkpoint); returns the best monitored value."""
+    from src.training.train import DatasetCache, train_from_config
+
+    config = copy.deepcopy(config)
+    config.setdefault("training", {})["epochs"] = epochs
+    start = time.perf_counter()
+    history = train_from_config(config, data_config, DatasetCache(data_config))
+    monitor = config["training"].get("early_stopping_monitor", "val_accuracy")
+    values = history.history.get(monitor, [])
+    best = (min(values) if "loss" in monitor else max(values)) if values else None
+    return {"metric": best, "time_s": time.perf_counter() - start}
+
+
+def _trial_config(base_config: dict, params: dict, trial_dir: Path, seed: int) -> dict:
+    config = apply_params(base_config, params)
+    train_cfg = config.setdefault("training", {})
+    train_cfg.update(resume=True, keep_checkpoints=1, verbose=0)
+    train_cfg.setdefault("seed", seed)
+    config["paths"] = {"checkpoint_dir": str(trial_dir), "save_best": str(trial_dir / "best.keras")}
+    return config
+
+
+def _warm_cache(base_config: dict, data_config: dict, space: dict) -> None:
+    """Decode the train / validation splits once into the shared file cache, for every batch size in the space."""
+    from models.factory import model_input_size
+    from src.training.train import DatasetCache
+
+    sizes = space.get("training.batch_size", {}).get("values") or [
+        base_config.get("training", {}).get("batch_size", data_config.get("batch_size", 32))
+    ]
+    datasets = DatasetCache(data_config)
+    for batch_size in sizes:
+        for split in ("train", "validation"):
+            for _ in datasets.get(split, model_input_size(base_config["model"]), batch_size):
+                pass
+
+
+def run_search(hpo_config: dict, data_config: dict, root: Optional[Path] = None) -> dict:
+    """
+    Run the search described by hpo_config (see configs/hpo.yaml). Returns the best trial record
+    ({"trial", "params", "score", "epochs", ...}) and writes output_dir/best.yaml.
+    """
+    from src.training.train import _project_root, parse_config
+
+    root = root or _project_root()
+    base = hpo_config.get("base", "configs/xception.yaml")
+    base_config = parse_config(str(base if Path(base).is_absolute() else root / base))
+    space = hpo_config["space"]
+    output_dir = Path(hpo_config.get("output_dir", "models/checkpoints/hpo"))
+    output_dir = output_dir if output_dir.is_absolute() else root / output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(hpo_config.get("cache_dir", "data/processed/hpo_cache"))
+    data_config = copy.deepcopy(data_config)
+    data_config.setdefault("dataset", {})["cache"] = str(cache_dir if cache_dir.is_absolute() else root / cache_dir)
+
+    monitor = base_config.get("training", {}).get("early_stopping_monitor", "val_accuracy")
+    sign = -1.0 if "loss" in monitor else 1.0
+    sampler = hpo_config.get("sampler", "tpe")
+    seed = hpo_config.get("seed", 0)
+    rng = np.random.default_rng(seed)
+    workers = hpo_config.get("workers", 2)
+    threads = hpo_config.get("threads_per_worker") or max((os.cpu_count() or 1) // workers, 1)
+    keep_pruned = hpo_config.get("keep_pruned", False)
+
+    log_path = output_dir / "trials.jsonl"
+    records = [json.loads(line) for line in log_path.read_text().splitlines() if line.strip()] if log_path.exists() else []
+    next_id = max((r["trial"] for r in records), default=-1) + 1
+    history = {}  # trial -> latest record (highest rung), the sampler's observations
+    for r in records:
+        history[r["trial"]] = r
+
+    print(f"Warming shared dataset cache in {data_config['dataset']['cache']}")
+    _warm_cache(base_config, data_config, space)
+
+    def log(record):
+        history[record["trial"]] = record
+        with open(log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        metric = f"{record['metric']:.4f}" if record["metric"] is not None else "n/a"
+        print(f"[trial {record['trial']}] rung {record['rung']} ({record['epochs']} epochs) {monitor}={metric} {record['params']}")
+
+    def submit(pool, trial, params, rung, epochs):
+        cfg = _trial_config(base_config, params, output_dir / f"trial_{trial}", seed)
+        future = pool.submit(run_trial, cfg, data_config, epochs)
+        return future, {"trial": trial, "params": params, "rung": rung, "epochs": epochs}
+
+    def finish(future, meta):
+        result = future.result()
+        score = sign * result["metric"] if result["metric"] is not None else -math.inf
+        previous = history.get(meta["trial"])
+        if previous and previous["score"] > score:
+            # A resumed run reports only its new epochs; the trial's best so far still counts
+            result["metric"], score = previous["metric"], previous["score"]
+        log({**meta, **result, "score": score})
+        return history[meta["trial"]]
+
+    import multiprocessing as mp
+
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"), initializer=_init_worker, initargs=(threads,)) as pool:
+        for b, (n, budgets) in enumerate(brackets(hpo_config.get("scheduler", {}), hpo_config.get("trials", 12))):
+            print(f"=== Bracket {b}: {n} trials, epoch budgets {budgets} ===")
+            # Rung 0: sample lazily so the TPE sampler sees every result finished so far
+            rung, pending, launched = [], {}, 0
+            while launched < n or pending:
+                while launched < n and len(pending) < workers:
+                    observations = [h for h in history.values() if h["score"] > -math.inf]
+                    params = sample_tpe(space, observations, rng) if sampler == "tpe" else sample_random(space, rng)
+                    future, meta = submit(pool, next_id, params, 0, budgets[0])
+                    pending[future] = meta
+                    next_id, launched = next_id + 1, launched + 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rung.append(finish(future, pending.pop(future)))
+            # Later rungs: promote the top 1/eta, continuing each from its checkpoint
+            eta = hpo_config.get("scheduler", {}).get("eta", 3)
+            for k, epochs in enumerate(budgets[1:], start=1):
+                rung.sort(key=lambda r: r["score"], reverse=True)
+                keep = max(len(rung) // eta, 1)
+                for r in rung[keep:]:
+                    if not keep_pruned:
+                        shutil.rmtree(output_dir / f"trial_{r['trial']}", ignore_errors=True)
+                jobs = [submit(pool, r["trial"], r["params"], k, epochs) for r in rung[:keep]]
+                rung = [finish(future, meta) for future, meta in jobs]
+
+    finished = [h for h in history.values() if h["score"] > -math.inf]
+    if not finished:
+        raise RuntimeError("No trial produced a result")
+    best = max(finished, key=lambda r: (r["epochs"], r["score"]))
+    best_config = apply_params(base_config, best["params"])
+    with open(output_dir / "best.yaml", "w") as f:
+        f.write(f"# Best of {len(finished)} trials ({monitor} = {best['metric']:.4f} after {best['epochs']} epochs)\n")
+        yaml.safe_dump(best_config, f, sort_keys=False)
+    print(f"Best trial {best['trial']}: {monitor} = {best['metric']:.4f} {best['params']} -> {output_dir / 'best.yaml'}")
+    return best
@@ -0,0 +1,84 @@
+"""
+Phased training schedules: progressive resolution and staged unfreezing for transfer models.
+
+Each entry of `schedule.phases` overrides input size, unfreezing depth (trainable_layers), epochs,
+learning rate and batch size. Typical use: train the head on a frozen backbone at reduced resolution,
+then unfreeze more of the backbone while stepping the resolution up to model.input_shape.
+The model is rebuilt for every phase and the previous phase's weights are copied over (pooled heads
+make weights resolution-independent). Every phase checkpoints into its own subdirectory, so an
+interrupted schedule resumes in the phase it stopped in.
+"""
+import copy
+from pathlib import Path
+
+# Per-phase keys that override `training.*`
+_TRAINING_KEYS = ("epochs", "learning_rate", "batch_size", "optimizer", "weight_decay")
+
+
+def schedule_enabled(config: dict) -> bool:
+    sched = config.get("schedule") or {}
+    return bool(sched.get("enabled", False)) and bool(sched.get("phases"))
+
+
+def schedule_phases(config: dict) -> list:
+    """
+    Expand `schedule.phases` into full per-phase configs. The last phase trains at model.input_shape
+    unless it sets input_size; only the last phase writes paths.save_best / save_final. Earlier phases keep
+    their best model in <checkpoint_dir>/phase_N/best.keras (no best-model file without checkpoint_dir).
+    """
+    phases = config["schedule"]["phases"]
+    target = list(config["model"].get("input_shape", [224, 224, 3]))
+    checkpoint_dir = config.get("paths", {}).get("checkpoint_dir")
+    out = []
+    for i, phase in enumerate(phases):
+        last = i == len(phases) - 1
+        cfg = copy.deepcopy(config)
+        cfg.pop("schedule", None)
+        size = phase.get("input_size") or target[:2]
+        cfg["model"]["input_shape"] = [int(size[0]), int(size[1]), target[2] if len(target) > 2 else 3]
+        if "trainable_layers" in phase:
+            cfg["model"]["trainable_layers"] = phase["trainable_layers"]
+        if i > 0:
+            cfg["model"]["weights"] = None  # weights come from the previous phase
+        for key in _TRAINING_KEYS:
+            if key in phase:
+                cfg["training"][key] = phase[key]
+        paths = {} if not last else dict(cfg.get("paths", {}))
+        if checkpoint_dir:
+            paths["checkpoint_dir"] = str(Path(checkpoint_dir) / f"phase_{i + 1}")
+            if not last:
+                paths["save_best"] = str(Path(paths["checkpoint_dir"]) / "best.keras")
+        cfg["paths"] = paths
+        cfg["phase"] = {"index": i + 1, "count": len(phases), "name": phase.get("name", f"phase_{i + 1}")}
+        out.append(cfg)
+    return out
+
+
+def train_with_schedule(config: dict, data_config: dict, datasets=None):
+    """
+    Run every phase in order on a DatasetCache (pipelines sized per phase). Returns the list of
+    per-phase keras History objects.
+    """
+    from models.factory import build_model, copy_weights, model_input_size
+    from src.training.train import DatasetCache, run_training
+
+    datasets = datasets or DatasetCache(data_config)
+    histories = []
+    model = None
+    for cfg in schedule_phases(config):
+        phase = cfg["phase"]
+        size = model_input_size(cfg["model"])
+        batch_size = cfg["training"].get("batch_size", data_config.get("batch_size", 32))
+        print(
+            f"--- {phase['name']} ({phase['index']}/{phase['count']}): {size[0]}x{size[1]}, "
+            f"trainable_layers={cfg['model'].get('trainable_layers')}, batch {batch_size}, "
+            f"lr {cfg['training'].get('learning_rate')}, {cfg['training'].get('epochs')} epochs ---"
+        )
+        next_model = build_model(cfg["model"])
+        if model is not None:
+            copy_weights(model, next_model)
+        model = next_model
+        train_ds = datasets.get("train", size, batch_size)
+        val_ds = datasets.get("validation", size, batch_size)
+        histories.append(run_training(model, train_ds, val_ds, cfg, data_epoch=datasets.epoch))
+    return histories
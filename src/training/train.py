@@ -1,33 +1,58 @@
 """
-Training loop with callbacks (checkpoint, early stopping, LR reduction).
+Training loop with callbacks (checkpoint, early stopping, LR reduction), plus the unified
+config-driven entry point used by all training scripts:
+
+    python -m src.training.train --config configs/custom_cnn.yaml [--config configs/xception.yaml ...]
+
+Several configs train sequentially in one process, sharing TensorFlow startup and cached datasets.
 """
 import argparse
+import copy
 from pathlib import Path
+from typing import Optional, Sequence
 
 import yaml
 from tensorflow import keras
 
 
-def run_training(model, train_ds, val_ds, config: dict):
-    """Run training with config-driven callbacks."""
-    train_cfg = config.get("training", {})
-    paths = config.get("paths", {})
+def _project_root() -> Path:
+    return Path(__file__).resolve().parents[2]
 
-    model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=train_cfg.get("learning_rate", 1e-3)),
-        loss="categorical_crossentropy",
-        metrics=["accuracy"],
-    )
 
-    callbacks = [
-        keras.callbacks.ModelCheckpoint(
-            paths.get("save_best", "best.keras"),
-            monitor=train_cfg.get("early_stopping_monitor", "val_accuracy"),
-            save_best_only=True,
-            verbose=1,
-        ),
+def build_optimizer(train_cfg: dict):
+    """Optimizer from `training.optimizer` (adam, adamw, sgd) and learning_rate / weight_decay."""
+    name = str(train_cfg.get("optimizer", "adam")).lower()
+    lr = train_cfg.get("learning_rate", 1e-3)
+    if name == "adamw":
+        return keras.optimizers.AdamW(learning_rate=lr, weight_decay=train_cfg.get("weight_decay", 0.004))
+    if name == "sgd":
+        return keras.optimizers.SGD(learning_rate=lr, momentum=train_cfg.get("momentum", 0.9), nesterov=True)
+    if name != "adam":
+        raise ValueError(f"Unknown optimizer: {name}")
+    return keras.optimizers.Adam(learning_rate=lr)
+
+
+def build_callbacks(
+    config: dict,
+    is_chief: bool = True,
+    data_epoch=None,
+    resume_state: Optional[dict] = None,
+    extra: Sequence = (),
+) -> list:
+    """
+    Checkpoint / early-stopping / LR callbacks from config, after any `extra` callbacks; checkpoints
+    are written by the chief only, the best model only when paths.save_best is set. With paths.checkpoint_dir, a ResumableCheckpoint (last) keeps the
+    newest training.keep_checkpoints epochs plus the best one and, given resume_state, restores the
+    other callbacks' counters (and the state_dict() of extras that have one).
+    """
+    train_cfg = config.get("training", {})
+    paths = config.get("paths", {})
+    monitor = train_cfg.get("early_stopping_monitor", "val_accuracy")
+    mode = "min" if "loss" in monitor else "max"
+    callbacks = list(extra) + [
         keras.callbacks.EarlyStopping(
-            monitor=train_cfg.get("early_stopping_monitor", "val_accuracy"),
+            monitor=monitor,
+            mode=mode,
             patience=train_cfg.get("early_stopping_patience", 10),
             restore_best_weights=True,
         ),
@@ -38,34 +63,281 @@ def run_training(model, train_ds, val_ds, config: dict):
             min_lr=1e-6,
         ),
     ]
+    if not is_chief:
+        return callbacks
+    if paths.get("save_best"):
+        callbacks.insert(len(extra), keras.callbacks.ModelCheckpoint(
+            paths["save_best"],
+            monitor=monitor,
+            mode=mode,
+            save_best_only=True,
+            verbose=1,
+        ))
     if paths.get("checkpoint_dir"):
-        Path(paths["checkpoint_dir"]).mkdir(parents=True, exist_ok=True)
-        callbacks.append(
-            keras.callbacks.ModelCheckpoint(
-                str(Path(paths["checkpoint_dir"]) / "epoch_{epoch:02d}.keras"),
-                save_freq="epoch",
-            )
+        from src.training.callbacks import ResumableCheckpoint
+
+        callbacks.append(ResumableCheckpoint(
+            paths["checkpoint_dir"],
+            monitor=monitor,
+            mode=mode,
+            keep_last=train_cfg.get("keep_checkpoints", 3),
+            tracked=list(callbacks),
+            data_epoch=data_epoch,
+            resume_state=resume_state,
+        ))
+    return callbacks
+
+
+def run_training(
+    model,
+    train_ds,
+    val_ds,
+    config: dict,
+    callbacks: Optional[list] = None,
+    is_chief: bool = True,
+    steps_per_epoch: Optional[int] = None,
+    validation_steps: Optional[int] = None,
+    data_epoch=None,
+    loss=None,
+    metrics: Optional[list] = None,
+):
+    """
+    Run training with config-driven callbacks (plus any extra `callbacks`).
+    Under a distribution strategy call this inside strategy.scope(); only the chief (is_chief) saves models.
+    If paths.checkpoint_dir holds a resumable checkpoint (and training.resume is not false), training
+    continues from it: weights, optimizer state, callback counters and epoch; a run that early stopping had
+    already ended trains no further (its best weights are loaded, existing saved models are kept). data_epoch is the epoch
+    variable of a train dataset built with get_dataset(..., epoch=...), for an identical data stream.
+    loss / metrics override the default categorical cross-entropy / accuracy (e.g. distillation).
+    """
+    from src.training.callbacks import load_resume_state
+
+    train_cfg = config.get("training", {})
+    paths = config.get("paths", {})
+
+    model.compile(
+        optimizer=build_optimizer(train_cfg),
+        loss=loss or "categorical_crossentropy",
+        metrics=metrics or ["accuracy"],
+    )
+
+    resume_state = None
+    if paths.get("checkpoint_dir") and train_cfg.get("resume", True):
+        resume_state = load_resume_state(paths["checkpoint_dir"])
+    initial_epoch = 0
+    stopped = False
+    if resume_state:
+        model.optimizer.build(model.trainable_variables)
+        model.load_weights(str(Path(paths["checkpoint_dir"]) / resume_state["checkpoint"]))
+        initial_epoch = resume_state["epoch"]
+        stopped = any(
+            key.endswith(":EarlyStopping") and (state.get("stopped_epoch") or 0) > 0
+            for key, state in (resume_state.get("callbacks") or {}).items()
         )
+        if stopped:  # early stopping had already ended this run: keep its best weights, train no further
+            if resume_state.get("best_checkpoint"):
+                model.load_weights(str(Path(paths["checkpoint_dir"]) / resume_state["best_checkpoint"]))
+            initial_epoch = train_cfg.get("epochs", 50)
+            print(f"{resume_state['checkpoint']}: early stopping had already ended this run, nothing to resume")
+        else:
+            print(f"Resuming from {resume_state['checkpoint']} after epoch {initial_epoch}")
 
     history = model.fit(
         train_ds,
         validation_data=val_ds,
         epochs=train_cfg.get("epochs", 50),
-        callbacks=callbacks,
+        initial_epoch=initial_epoch,
+        callbacks=build_callbacks(
+            config, is_chief=is_chief, data_epoch=data_epoch, resume_state=resume_state, extra=callbacks or ()
+        ),
+        steps_per_epoch=steps_per_epoch,
+        validation_steps=validation_steps,
+        verbose=train_cfg.get("verbose", "auto"),
     )
-    if paths.get("save_final"):
+    if is_chief and paths.get("save_final") and not (stopped and Path(paths["save_final"]).exists()):
         Path(paths["save_final"]).parent.mkdir(parents=True, exist_ok=True)
         model.save(paths["save_final"])
     return history
 
 
+def save_plain(config: dict) -> None:
+    """
+    Re-save paths.save_best / save_final compiled with plain cross-entropy, so models trained with a custom loss
+    (distillation, sampler weighting) load in the app and evaluate scripts without custom objects.
+    """
+    paths = config.get("paths", {})
+    for key in ("save_best", "save_final"):
+        if paths.get(key) and Path(paths[key]).exists():
+            model = keras.models.load_model(paths[key], compile=False)
+            model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
+            model.save(paths[key])
+
+
 def parse_config(config_path: str) -> dict:
     with open(config_path) as f:
         return yaml.safe_load(f)
 
 
+def resolve_paths(config: dict, root: Optional[Path] = None) -> dict:
+    """Make `paths.*` absolute (relative to project root) in place; returns config."""
+    root = root or _project_root()
+    paths = config.setdefault("paths", {})
+    for key in ("save_best", "save_final", "checkpoint_dir"):
+        if paths.get(key) and not Path(paths[key]).is_absolute():
+            paths[key] = str(root / paths[key])
+    return config
+
+
+class DatasetCache:
+    """
+    In-process cache of train/val datasets keyed by (split, input size, batch size).
+    Configs in one sweep that share a pipeline shape reuse the same dataset objects
+    (and, with `dataset.cache` set, the same decoded data).
+    """
+
+    def __init__(self, data_config: dict):
+        import tensorflow as tf
+
+        self.data_config = data_config
+        self._datasets = {}
+        # Current epoch, set by ResumableCheckpoint; seeds the train split's shuffle and augmentation
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+
+    def config(self, target_size: tuple, batch_size: int) -> dict:
+        """Copy of the data config with the pipeline's input size and batch size."""
+        cfg = copy.deepcopy(self.data_config)
+        cfg.setdefault("image", {})["target_size"] = list(target_size)
+        cfg["batch_size"] = int(batch_size)
+        return cfg
+
+    def get(self, split: str, target_size: tuple, batch_size: int):
+        from src.data.dataset import get_dataset
+
+        key = (split, tuple(target_size), int(batch_size))
+        if key not in self._datasets:
+            cfg = self.config(target_size, batch_size)
+            self._datasets[key] = get_dataset(cfg, split, epoch=self.epoch if split == "train" else None)
+        return self._datasets[key]
+
+
+def train_from_config(config: dict, data_config: dict, datasets: Optional[DatasetCache] = None):
+    """
+    Build the configured model (models.factory) and train it on a pipeline sized for it:
+    input size from model.input_shape, batch size from training.batch_size.
+    With `schedule.enabled`, trains the phases of src.training.schedule instead (returns the last phase's history);
+    with a `distillation` section, trains the model as a student of the saved teachers (src.training.distill).
+    With `sampler.enabled` in the data config, the train split is drawn by src.data.sampler (hard / minority examples first).
+    """
+    from models.factory import build_model, model_input_size
+    from src.data.sampler import sampler_enabled
+    from src.training.schedule import schedule_enabled, train_with_schedule
+
+    datasets = datasets or DatasetCache(data_config)
+    resolve_paths(config)
+    if config.get("training", {}).get("seed") is not None:
+        keras.utils.set_random_seed(config["training"]["seed"])
+    if schedule_enabled(config):
+        return train_with_schedule(config, data_config, datasets)[-1]
+    if config.get("distillation"):
+        from src.training.distill import train_distilled
+
+        return train_distilled(config, data_config)
+    size = model_input_size(config["model"])
+    batch_size = config.get("training", {}).get("batch_size", data_config.get("batch_size", 32))
+    val_ds = datasets.get("validation", size, batch_size)
+    model = build_model(config["model"])
+    if sampler_enabled(data_config):
+        from src.data.sampler import HardExampleSampler
+
+        sampler = HardExampleSampler(datasets.config(size, batch_size), seed=config.get("training", {}).get("seed"))
+        history = run_training(model, sampler.dataset(), val_ds, config, callbacks=[sampler], loss=sampler.loss())
+        save_plain(config)  # SampleLoss holds the sampler's weights variable and is not serializable
+        return history
+    train_ds = datasets.get("train", size, batch_size)
+    return run_training(model, train_ds, val_ds, config, data_epoch=datasets.epoch)
+
+
+def publish_best(config: dict, data_config: dict, metrics: dict) -> Optional[str]:
+    """
+    Publish paths.save_best to the model registry (src.inference.registry) under the model's serving name
+    (the file name without "_best", e.g. custom_cnn). The first version of a model becomes production;
+    later ones wait for scripts/models_registry.py promote / candidate. Returns the version id.
+    """
+    from src.inference.registry import ModelRegistry
+
+    best = Path(config.get("paths", {}).get("save_best", ""))
+    if not best.is_file():
+        return None
+    name = best.stem.removesuffix("_best")
+    registry = ModelRegistry(_project_root())
+    version = registry.publish(name, best, metrics=metrics, class_names=data_config.get("classes"))
+    if registry.routing(name)["production"] is None:
+        registry.promote(name, version)
+    print(f"Published {name} {version}")
+    return version
+
+
+def main(argv=None, default_config: Optional[str] = None):
+    parser = argparse.ArgumentParser(description="Train one or more models from YAML configs.")
+    parser.add_argument(
+        "--config", type=str, action="append",
+        help="Model config (repeat to sweep several configs in one process)",
+    )
+    parser.add_argument("--data-config", type=str, default=str(_project_root() / "configs" / "data.yaml"))
+    parser.add_argument("--cache", type=str, default=None, help="Dataset cache: memory or a directory")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore resumable checkpoints in paths.checkpoint_dir")
+    parser.add_argument(
+        "--distributed", action="store_true",
+        help="Multi-worker data-parallel training; cluster from TF_CONFIG (see scripts/launch_workers.py)",
+    )
+    parser.add_argument(
+        "--publish", action="store_true",
+        help="Publish each paths.save_best as a new version in models/registry (production if the model has none yet)",
+    )
+    args = parser.parse_args(argv)
+    config_paths = args.config or ([default_config] if default_config else None)
+    if not config_paths:
+        parser.error("--config is required")
+
+    from src.runtime import configure, runtime_settings
+
+    # Before the first TensorFlow op: thread pools, XLA and affinity from the first config's `runtime` section
+    configure(runtime_settings(parse_config(config_paths[0])))
+    data_config = parse_config(args.data_config)
+    if args.cache:
+        data_config.setdefault("dataset", {})["cache"] = args.cache
+    strategy = None
+    if args.distributed:
+        from src.training.distributed import get_strategy, train_distributed
+
+        # The strategy must exist before any other TensorFlow op runs in this process
+        strategy = get_strategy(parse_config(config_paths[0]).get("distributed", {}).get("communication", "auto"))
+    datasets = DatasetCache(data_config) if strategy is None else None
+
+    results = []
+    for path in config_paths:
+        config = parse_config(path)
+        if args.no_resume:
+            config.setdefault("training", {})["resume"] = False
+        print(f"=== Training {config['model'].get('name')} ({path}) ===")
+        if strategy is not None:
+            history = train_distributed(config, data_config, strategy)
+        else:
+            history = train_from_config(config, data_config, datasets)
+        monitor = config.get("training", {}).get("early_stopping_monitor", "val_accuracy")
+        values = history.history.get(monitor, [])
+        best = min if "loss" in monitor else max  # same rule as the callbacks' mode in build_callbacks
+        results.append((path, monitor, best(values) if values else None))
+        if args.publish:
+            publish_best(config, data_config, {monitor: results[-1][2]})
+
+    if len(results) > 1:
+        print("\n=== Sweep summary ===")
+        for path, monitor, best in results:
+            best_str = f"{best:.4f}" if best is not None else "n/a"
+            print(f"  {Path(path).name:24} best {monitor} = {best_str}")
+    return 0
+
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--config", type=str, required=True)
-    args = parser.parse_args()
-    parse_config(args.config)
+    main()